@@ -0,0 +1,278 @@
+'''Benchmarks of every strategy on fixed Subtract Square and Tippy positions.
+
+Run python benchmark.py to time suggest_move on each position and write
+the results as JSON. Pass --compare with an earlier file to list, and exit
+with status 1 on, the cases that searched more nodes, or got slower or
+used more memory by more than --threshold.
+
+Each case is timed in --repeat samples, after a warm-up run, without
+tracemalloc. A sample runs suggest_move again and again until the runs
+add up to MIN_SAMPLE_S, so that cases of a millisecond are timed over as
+long as slow ones, and is their mean latency. The case is then run once
+more under tracemalloc for its peak memory. The strategy is new and
+random is seeded alike for every run. Latencies of one case differ from
+run to run by up to 75% on a busy machine, so by default only latencies
+more than twice the baseline count as regressions; node counts are
+deterministic and any growth in them counts. Nodes are the states moved
+into by push or apply_trusted_move, plus the leaves estimated by
+next_rough_outcomes. The solved-position tables are switched off, so
+every strategy searches.
+
+>>> results = run(repeat=1, names=['StrategyRandom'])
+>>> sorted(results[0])
+['case', 'game', 'latency_max_s', 'latency_min_s', 'latency_s', 'nodes', 'nodes_per_s', 'peak_bytes', 'strategy']
+>>> compare(results, results)
+[]
+'''
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from subtract_square_state import SubtractSquareState
+from tippy_square_state import TippyGameState
+from strategy_minimax import StrategyMinimax
+from strategy_minimax_memoize import StrategyMinimaxMemoize
+from strategy_minimax_myopic import StrategyMinimaxMyopic
+from strategy_minimax_pruning import StrategyMinimaxPruning
+from strategy_random import StrategyRandom
+from move_ordering import MoveOrdering
+
+SEED = 2016
+# least seconds of runs averaged in each latency sample
+MIN_SAMPLE_S = 0.1
+# name -> function making a new strategy
+STRATEGIES = {
+    'StrategyMinimax': StrategyMinimax,
+    'StrategyMinimaxMemoize': StrategyMinimaxMemoize,
+    'StrategyMinimaxMyopic': lambda: StrategyMinimaxMyopic(depth=3),
+    'StrategyMinimaxPruning': lambda: StrategyMinimaxPruning(
+        ordering=MoveOrdering(), max_entries=1 << 16),
+    'StrategyMinimaxPruningPVS': lambda: StrategyMinimaxPruning(
+        ordering=MoveOrdering(), max_entries=1 << 16, driver='pvs'),
+    'StrategyMinimaxPruningMTDF': lambda: StrategyMinimaxPruning(
+        ordering=MoveOrdering(), max_entries=1 << 16, driver='mtdf'),
+    'StrategyRandom': StrategyRandom,
+}
+SUBTRACT_SQUARE_TOTALS = (15, 25, 35)
+# (board size, cells left empty)
+TIPPY_BOARDS = ((3, 7), (4, 8), (5, 8))
+
+
+def counting(cls):
+    ''' (type) -> type
+
+    Return a subclass of the GameState class cls whose states count the
+    nodes searched from them in its attribute nodes.
+    '''
+    class Counting(cls):
+        nodes = 0
+
+        def push(self, move):
+            Counting.nodes += 1
+            cls.push(self, move)
+
+        def apply_trusted_move(self, move):
+            Counting.nodes += 1
+            return cls.apply_trusted_move(self, move)
+
+        def next_rough_outcomes(self):
+            outcomes = cls.next_rough_outcomes(self)
+            Counting.nodes += len(outcomes)
+            return outcomes
+
+    Counting.__name__ = cls.__name__
+    return Counting
+
+
+def cases():
+    ''' () -> list of (str, str, function)
+
+    Return the game, name and a function making a new, counting start
+    state of every benchmark position. The Tippy boards are reached by
+    random moves seeded by SEED, keeping the first that is not over.
+    '''
+    found = []
+    subtract_square, tippy = (counting(SubtractSquareState),
+                              counting(TippyGameState))
+    for total in SUBTRACT_SQUARE_TOTALS:
+        found.append(('SubtractSquare', 'total {}'.format(total),
+                      lambda total=total: subtract_square(
+                          'p1', current_total=total)))
+    for board_size, empty in TIPPY_BOARDS:
+        r = random.Random('{} {} {}'.format(SEED, board_size, empty))
+        while True:
+            s = TippyGameState('p1', board_size=board_size)
+            while bin(s.empty_mask).count('1') > empty and not s.over:
+                s.push(r.choice(s.possible_next_moves()))
+            if not s.over:
+                break
+        found.append(('Tippy', '{0}x{0}, {1} empty'.format(board_size, empty),
+                      lambda s=s: tippy(s.next_player,
+                                        current_board=s.current_board)))
+    return found
+
+
+def run_case(make_strategy, make_state, repeat):
+    ''' (function, function, int) -> dict
+
+    Return the median, fastest and slowest of repeat samples of the
+    latency of suggest_move, in seconds, its nodes, nodes per second and
+    peak bytes traced. A first, untimed run warms up imports and caches
+    shared across strategies.
+    '''
+    nodes = _timed_run(make_strategy, make_state)[1]
+    times = []
+    for i in range(repeat):
+        total, runs = 0.0, 0
+        while total < MIN_SAMPLE_S:
+            total += _timed_run(make_strategy, make_state)[0]
+            runs += 1
+        times.append(total / runs)
+    strategy, state = make_strategy(), make_state()
+    random.seed(SEED)
+    tracemalloc.start()
+    try:
+        strategy.suggest_move(state)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    times.sort()
+    latency = times[len(times) // 2]
+    return {'latency_s': latency, 'latency_min_s': times[0],
+            'latency_max_s': times[-1], 'nodes': nodes,
+            'nodes_per_s': nodes / times[0] if times[0] else 0.0,
+            'peak_bytes': peak}
+
+
+def _timed_run(make_strategy, make_state):
+    ''' (function, function) -> (float, int)
+
+    Return the seconds suggest_move of a new strategy takes on a new state,
+    and the nodes it searches.
+    '''
+    strategy, state = make_strategy(), make_state()
+    random.seed(SEED)
+    type(state).nodes = 0
+    start = time.perf_counter()
+    strategy.suggest_move(state)
+    return time.perf_counter() - start, type(state).nodes
+
+
+def run(repeat=3, names=None, log=None):
+    ''' (int, list of str, file) -> list of dict
+
+    Return the results of every case for the strategies named in names,
+    by default all of STRATEGIES, writing a line to log, if given, as each
+    case finishes.
+    '''
+    results = []
+    solved = SubtractSquareState.TABLE, TippyGameState.TABLE
+    SubtractSquareState.TABLE = TippyGameState.TABLE = None
+    try:
+        for name in names or sorted(STRATEGIES):
+            for game, case, make_state in cases():
+                result = {'strategy': name, 'game': game, 'case': case}
+                result.update(run_case(STRATEGIES[name], make_state, repeat))
+                results.append(result)
+                if log is not None:
+                    print('{strategy:26} {game:15} {case:16} '
+                          '{latency_s:9.4f} s {nodes:9} nodes '
+                          '{peak_bytes:11} B'.format(**result), file=log)
+    finally:
+        SubtractSquareState.TABLE, TippyGameState.TABLE = solved
+    return results
+
+
+def compare(baseline, results, threshold=1.0, floor=0.0005):
+    ''' (list of dict, list of dict, float, float) -> list of str
+
+    Return a description of each case of results that searched more nodes
+    than the same case of baseline, or is worse than it by more than
+    threshold, as a fraction, in peak memory or fastest latency. For
+    latency the bound is widened to the spread between the fastest and
+    slowest samples of either run, if that is more, and the latency must
+    also grow by more than floor seconds.
+
+    >>> old = [{'strategy': 's', 'game': 'g', 'case': 'c',
+    ...         'latency_min_s': 1.0, 'latency_max_s': 1.1,
+    ...         'peak_bytes': 100, 'nodes': 10}]
+    >>> compare(old, [dict(old[0], latency_min_s=1.4, latency_max_s=2.2)])
+    []
+    >>> compare(old, [dict(old[0], latency_min_s=2.5, latency_max_s=2.6, nodes=11)])
+    ['s g c: latency_min_s 1 -> 2.5 (+150%)', 's g c: nodes 10 -> 11 (+10%)']
+    '''
+    old = {(r['strategy'], r['game'], r['case']): r for r in baseline}
+    regressions = []
+    for r in results:
+        key = (r['strategy'], r['game'], r['case'])
+        if key not in old:
+            continue
+        for measure in ('latency_min_s', 'peak_bytes', 'nodes'):
+            before, after = old[key][measure], r[measure]
+            if measure == 'nodes':  # deterministic, so any growth counts
+                bound = 0.0
+            elif measure == 'latency_min_s':
+                if after - before <= floor:
+                    continue
+                bound = max(threshold, _spread(old[key]), _spread(r))
+            else:
+                bound = threshold
+            if after > before * (1 + bound):
+                change = (after / before - 1) * 100 if before else float('inf')
+                regressions.append(
+                    '{} {} {}: {} {:g} -> {:g} (+{:.0f}%)'.format(
+                        key[0], key[1], key[2], measure, before, after,
+                        change))
+    return regressions
+
+
+def _spread(result):
+    ''' (dict) -> float
+
+    Return how much slower the slowest latency sample of result is than
+    its fastest, as a fraction, or 0.0 for results without samples.
+    '''
+    fastest = result['latency_min_s']
+    slowest = result.get('latency_max_s', fastest)
+    return slowest / fastest - 1 if fastest else 0.0
+
+
+def main(argv=None):
+    ''' (list of str) -> int
+
+    Run the benchmarks as the command line argv asks, and return the exit
+    status: 1 if a comparison found regressions, and 0 otherwise.
+    '''
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--out', default='benchmark.json',
+                        help='file to write the results to')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='results file to compare against')
+    parser.add_argument('--threshold', type=float, default=1.0,
+                        help='fraction slower or larger that counts as a '
+                        'regression')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='latency samples of each case')
+    parser.add_argument('--strategy', action='append', choices=STRATEGIES,
+                        help='strategy to run, by default all of them')
+    args = parser.parse_args(argv)
+    results = run(args.repeat, args.strategy, sys.stderr)
+    with open(args.out, 'w') as f:
+        json.dump({'python': platform.python_version(),
+                   'machine': platform.platform(), 'seed': SEED,
+                   'results': results}, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f)['results'], results,
+                                  args.threshold)
+        for regression in regressions:
+            print(regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,340 @@
+'''A server of many games at once, over TCP, with one JSON object per line.
+
+Run python game_server.py --port 8765 to serve on localhost. Each line a
+client sends is a request with an id, which the server echoes in its
+reply, and an op:
+
+    new    -- start a session of game, with the state options and a
+              strategy with strategy_options: {"id": 1, "op": "new",
+              "game": "tippy", "options": {"board_size": 4},
+              "strategy": "StrategyMinimaxPruning"}
+    move   -- make the move at index move of the moves listed for session
+    think  -- have the strategy of session make the next move, giving up
+              after deadline_ms milliseconds, if given
+    cancel -- stop the think request whose id is target
+    close  -- end session
+
+Replies to new, move and think describe the state of the session: str of
+the state, next_player, over, winner and the legal moves, by str, in the
+order move indexes them. A reply to think also has the move made, the
+seconds it took and the nodes searched. A request that fails is answered
+with ok false and an error.
+
+A connection may hold any number of sessions, and may send requests
+before the replies to earlier ones arrive. Requests of one session are
+handled one at a time. suggest_move runs in a pool of threads, so the
+event loop goes on serving while it searches, and at most max_pending
+searches may be running or waiting at once. Searches are given a
+CancellableStats, which stops them at their deadline or once cancelled,
+and every search of a connection that closes is cancelled. Strategies
+should not be given workers here.
+
+>>> async def demo():
+...     server = GameServer()
+...     port = (await server.start()).sockets[0].getsockname()[1]
+...     reader, writer = await asyncio.open_connection('127.0.0.1', port)
+...     started = await call(reader, writer, {
+...         'op': 'new', 'game': 'subtract_square',
+...         'options': {'current_total': 5}, 'strategy': 'StrategyMinimax'})
+...     moved = await call(reader, writer, {
+...         'op': 'move', 'session': started['session'], 'move': 0})
+...     thought = await call(reader, writer, {
+...         'op': 'think', 'session': started['session']})
+...     writer.close()
+...     await server.stop()
+...     return started['moves'], moved['state'], thought['move'], thought['winner']
+>>> started_moves, moved_state, thought_move, winner = asyncio.run(demo())
+>>> started_moves, moved_state
+(['Remove 4', 'Remove 1'], 'Current total: 1; next player: p2')
+>>> thought_move, winner
+('Remove 1', 'p2')
+'''
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from search_stats import CancellableStats, SearchCancelled
+from tournament import GAMES, STRATEGIES
+
+
+class RequestError(Exception):
+    ''' Raised for a request the server cannot carry out. '''
+
+
+class Session:
+    ''' One game being played on a GameServer.
+
+    state: GameState     -- state of the game
+    strategy: Strategy   -- suggests the moves of think requests
+    lock: asyncio.Lock   -- held while a request of the session is handled
+    '''
+
+    def __init__(self, state, strategy):
+        ''' (Session, GameState, Strategy) -> NoneType
+
+        Create a new Session of state played by strategy.
+        '''
+        self.state, self.strategy = state, strategy
+        self.lock = asyncio.Lock()
+
+    def describe(self):
+        ''' (Session) -> dict
+
+        Return the state of self, as sent to clients.
+        '''
+        state = self.state
+        if not state.over:
+            winner = None
+        elif state.winner('p1'):
+            winner = 'p1'
+        elif state.winner('p2'):
+            winner = 'p2'
+        else:
+            winner = None
+        return {'state': str(state), 'next_player': state.next_player,
+                'over': bool(state.over), 'winner': winner,
+                'moves': [str(m) for m in state.possible_next_moves()]}
+
+
+class GameServer:
+    ''' Serves sessions of the games of tournament.GAMES against the
+    strategies of tournament.STRATEGIES.
+
+    executor: ThreadPoolExecutor  -- threads suggest_move runs in
+    max_pending: int  -- most searches running or waiting for a thread
+    pending: int      -- searches running or waiting now
+    server: asyncio.Server  -- the server started by start, or None
+    '''
+
+    def __init__(self, workers=4, max_pending=64):
+        ''' (GameServer, int, int) -> NoneType
+
+        Create a new GameServer searching in workers threads, refusing
+        think requests once max_pending searches are running or waiting.
+        '''
+        self.executor = ThreadPoolExecutor(workers)
+        self.max_pending = max_pending
+        self.pending = 0
+        self.server = None
+        self._session_ids = itertools.count(1)
+        self._connections = {}  # task of each connection -> its writer
+
+    async def start(self, host='127.0.0.1', port=0):
+        ''' (GameServer, str, int) -> asyncio.Server
+
+        Start serving on host and port, by default a free port of
+        localhost, and return the server.
+        '''
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server
+
+    async def stop(self):
+        ''' (GameServer) -> NoneType
+
+        Stop serving: close every connection, cancelling its searches,
+        and wait for them to stop.
+        '''
+        if self.server is not None:
+            self.server.close()
+        for writer in self._connections.values():
+            writer.close()
+        if self._connections:
+            await asyncio.gather(*self._connections, return_exceptions=True)
+        self.executor.shutdown()
+
+    async def handle(self, reader, writer):
+        ''' (GameServer, asyncio.StreamReader, asyncio.StreamWriter)
+            -> NoneType
+
+        Serve the requests of one connection until it closes.
+        '''
+        sessions = {}
+        searches = {}  # id of each think request running -> its Event
+        tasks = set()
+        connection = asyncio.current_task()
+        self._connections[connection] = writer
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(
+                    self.respond(line, writer, sessions, searches))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except ConnectionError:
+            pass
+        finally:
+            for cancelled in searches.values():
+                cancelled.set()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+            del self._connections[connection]
+
+    async def respond(self, line, writer, sessions, searches):
+        ''' (GameServer, bytes, asyncio.StreamWriter, dict of int to
+             Session, dict) -> NoneType
+
+        Carry out the request in line and write the reply to writer.
+        '''
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise RequestError('a request must be a JSON object')
+            request_id = request.get('id')
+            reply = await self.request(request, sessions, searches)
+            reply['ok'] = True
+        except (RequestError, SearchCancelled) as error:
+            reply = {'ok': False, 'error': str(error)}
+        except (ValueError, TypeError, KeyError) as error:
+            reply = {'ok': False,
+                     'error': 'bad request: {!r}'.format(error)}
+        except Exception as error:  # a bug, which must not stop the server
+            reply = {'ok': False,
+                     'error': 'internal error: {!r}'.format(error)}
+        reply['id'] = request_id
+        writer.write((json.dumps(reply) + '\n').encode())
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def request(self, request, sessions, searches):
+        ''' (GameServer, dict, dict of int to Session, dict) -> dict
+
+        Return the reply to request, made on a connection with sessions
+        and the think requests running in searches.
+        '''
+        op = request.get('op')
+        if op == 'new':
+            if request.get('game') not in GAMES:
+                raise RequestError('unknown game {!r}'.format(
+                    request.get('game')))
+            if request.get('strategy') not in STRATEGIES:
+                raise RequestError('unknown strategy {!r}'.format(
+                    request.get('strategy')))
+            state = GAMES[request['game']]('p1', **request.get('options', {}))
+            strategy = STRATEGIES[request['strategy']](
+                **request.get('strategy_options', {}))
+            session_id = next(self._session_ids)
+            sessions[session_id] = Session(state, strategy)
+            reply = sessions[session_id].describe()
+            reply['session'] = session_id
+            return reply
+        elif op == 'cancel':
+            if request.get('target') in searches:
+                searches[request['target']].set()
+            return {}
+        session = sessions.get(request.get('session'))
+        if session is None:
+            raise RequestError('no session {!r}'.format(
+                request.get('session')))
+        if op == 'close':
+            del sessions[request['session']]
+            return {}
+        async with session.lock:
+            if session.state.over:
+                raise RequestError('the game is over')
+            if op == 'move':
+                moves = session.state.possible_next_moves()
+                index = request.get('move')
+                if not isinstance(index, int) or not 0 <= index < len(moves):
+                    raise RequestError('no move {!r}'.format(index))
+                session.state = session.state.apply_move(moves[index])
+                return session.describe()
+            elif op == 'think':
+                return await self.think(session, request, searches)
+        raise RequestError('unknown op {!r}'.format(op))
+
+    async def think(self, session, request, searches):
+        ''' (GameServer, Session, dict, dict) -> dict
+
+        Make the move suggested by the strategy of session, searching in
+        self.executor, and return the reply to request.
+        '''
+        if self.pending >= self.max_pending:
+            raise RequestError('busy')
+        cancelled = threading.Event()
+        deadline = request.get('deadline_ms')
+        if deadline is not None:
+            deadline = time.perf_counter() + deadline / 1000
+        strategy = session.strategy
+        strategy.collect_stats = True
+        strategy.stats_factory = lambda: CancellableStats(deadline, cancelled)
+        searches[request.get('id')] = cancelled
+        self.pending += 1
+        try:
+            move = await asyncio.get_running_loop().run_in_executor(
+                self.executor, strategy.suggest_move, session.state)
+        finally:
+            self.pending -= 1
+            searches.pop(request.get('id'), None)
+        session.state = session.state.apply_move(move)
+        reply = session.describe()
+        reply['move'] = str(move)
+        if strategy.last_stats is not None:
+            reply['seconds'] = strategy.last_stats.seconds
+            reply['nodes'] = strategy.last_stats.nodes
+        return reply
+
+
+async def call(reader, writer, request):
+    ''' (asyncio.StreamReader, asyncio.StreamWriter, dict) -> dict
+
+    Send request on a connection to a GameServer and return the next
+    reply, for clients that wait for each reply before the next request.
+    '''
+    writer.write((json.dumps(request) + '\n').encode())
+    await writer.drain()
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError('the server closed the connection')
+    return json.loads(line)
+
+
+async def serve(host, port, workers, max_pending):
+    ''' (str, int, int, int) -> NoneType
+
+    Serve on host and port until cancelled, after printing the address
+    served on.
+    '''
+    server = GameServer(workers, max_pending)
+    started = await server.start(host, port)
+    host, port = started.sockets[0].getsockname()[:2]
+    print('listening on {} {}'.format(host, port), flush=True)
+    try:
+        await started.serve_forever()
+    finally:
+        await server.stop()
+
+
+def main(argv=None):
+    ''' (list of str) -> int
+
+    Serve as the command line argv asks, and return the exit status.
+    '''
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765,
+                        help='port to serve on, or 0 for any free one')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='threads to search in')
+    parser.add_argument('--max-pending', type=int, default=64,
+                        help='most searches running or waiting at once')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers,
+                          args.max_pending))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
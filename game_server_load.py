@@ -0,0 +1,185 @@
+'''Load on a GameServer from many clients at once, and its move latency.
+
+Run python game_server_load.py --clients 32 --game tippy --option
+board_size=4 --strategy StrategyMinimaxMyopic --strategy-option depth=2 to
+start a server on a free port of localhost, in a process of its own, and
+play from 32 clients at once against it. Pass --port to load a server
+already running instead. Each client plays --games games, choosing its own
+moves at random and asking the server for the others. The latency of a
+move is the time from sending a think request to reading its reply. The
+50th and 99th percentiles are printed at the end.
+
+>>> async def demo():
+...     server = GameServer()
+...     port = (await server.start()).sockets[0].getsockname()[1]
+...     try:
+...         return await load('127.0.0.1', port, 4, 2, 'subtract_square',
+...                           {'current_total': 20}, 'StrategyMinimaxMemoize')
+...     finally:
+...         await server.stop()
+>>> result = asyncio.run(demo())
+>>> result['games'], result['errors'], result['p50_s'] <= result['p99_s']
+(8, 0, True)
+'''
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from game_server import GameServer, call
+from tournament import GAMES, STRATEGIES, SEED, parse_options
+
+
+def percentile(values, q):
+    ''' (list of float, float) -> float
+
+    Return the q-th percentile of values, by nearest rank, or 0.0 if there
+    are none.
+
+    >>> percentile([4, 1, 3, 2], 50), percentile(list(range(1, 101)), 99)
+    (2, 99)
+    '''
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))  # rounded up
+    return ordered[int(rank) - 1]
+
+
+async def client(host, port, games, game, options, strategy,
+                 strategy_options, deadline_ms, r, latencies):
+    ''' (str, int, int, str, dict, str, dict, int, random.Random, list)
+        -> int
+
+    Play games games against the server at host and port, choosing our
+    moves by r, which also chooses who moves first. Add the latency of
+    each move of the server to latencies, and return the number of
+    requests that failed.
+    '''
+    reader, writer = await asyncio.open_connection(host, port)
+    errors = 0
+    try:
+        for i in range(games):
+            reply = await call(reader, writer, {
+                'id': 0, 'op': 'new', 'game': game, 'options': options,
+                'strategy': strategy, 'strategy_options': strategy_options})
+            if not reply['ok']:
+                return errors + 1
+            session, ours = reply['session'], r.choice(['p1', 'p2'])
+            request_id = 0
+            while not reply['over']:
+                request_id += 1
+                request = {'id': request_id, 'session': session}
+                if reply['next_player'] == ours:
+                    request.update(op='move',
+                                   move=r.randrange(len(reply['moves'])))
+                    reply = await call(reader, writer, request)
+                else:
+                    request.update(op='think', deadline_ms=deadline_ms)
+                    start = time.perf_counter()
+                    reply_after = await call(reader, writer, request)
+                    latencies.append(time.perf_counter() - start)
+                    if not reply_after['ok']:  # play on with a random move
+                        errors += 1
+                        reply_after = await call(reader, writer, {
+                            'id': request_id, 'op': 'move',
+                            'session': session,
+                            'move': r.randrange(len(reply['moves']))})
+                    reply = reply_after
+                if not reply['ok']:
+                    return errors + 1
+            await call(reader, writer, {'id': 0, 'op': 'close',
+                                        'session': session})
+    finally:
+        writer.close()
+    return errors
+
+
+async def load(host, port, clients, games, game, options, strategy,
+               strategy_options=None, deadline_ms=None, seed=SEED):
+    ''' (str, int, int, int, str, dict, str, dict, int, int) -> dict
+
+    Return the moves, failed requests, seconds taken, moves per second
+    and latency percentiles of clients clients playing games games each
+    at once against the server at host and port.
+    '''
+    latencies = []
+    start = time.perf_counter()
+    errors = await asyncio.gather(*[
+        client(host, port, games, game, options, strategy,
+               strategy_options or {}, deadline_ms,
+               random.Random('{} {}'.format(seed, i)), latencies)
+        for i in range(clients)])
+    seconds = time.perf_counter() - start
+    return {'clients': clients, 'games': clients * games,
+            'moves': len(latencies), 'errors': sum(errors),
+            'seconds': seconds, 'moves_per_s': len(latencies) / seconds,
+            'p50_s': percentile(latencies, 50),
+            'p99_s': percentile(latencies, 99),
+            'max_s': max(latencies, default=0.0)}
+
+
+def start_server(workers):
+    ''' (int) -> (subprocess.Popen, int)
+
+    Start a GameServer of workers threads in a new process, on a free
+    port of localhost, and return the process and the port.
+    '''
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(__file__),
+                                      'game_server.py'),
+         '--port', '0', '--workers', str(workers)],
+        stdout=subprocess.PIPE, universal_newlines=True)
+    line = server.stdout.readline()  # listening on HOST PORT
+    if not line:
+        raise RuntimeError('the server did not start')
+    return server, int(line.split()[-1])
+
+
+def main(argv=None):
+    ''' (list of str) -> int
+
+    Load a server as the command line argv asks, and return the exit
+    status.
+    '''
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int,
+                        help='port of a running server, by default start one')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='threads of the server started')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--games', type=int, default=4,
+                        help='games each client plays')
+    parser.add_argument('--game', choices=GAMES, default='subtract_square')
+    parser.add_argument('--option', action='append', metavar='NAME=VALUE',
+                        help='keyword argument of the starting state')
+    parser.add_argument('--strategy', choices=STRATEGIES,
+                        default='StrategyMinimaxPruning')
+    parser.add_argument('--strategy-option', action='append',
+                        metavar='NAME=VALUE',
+                        help='keyword argument of the strategy')
+    parser.add_argument('--deadline-ms', type=int,
+                        help='deadline of each think request')
+    args = parser.parse_args(argv)
+    server, port = None, args.port
+    if port is None:
+        server, port = start_server(args.workers)
+    try:
+        result = asyncio.run(load(
+            args.host, port, args.clients, args.games, args.game,
+            parse_options(args.option), args.strategy,
+            parse_options(args.strategy_option), args.deadline_ms))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    print(json.dumps(result, indent=1))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -13,9 +13,13 @@ class GameState:
     WIN: float          -- class constant indicating next player has won
     LOSE: float         -- class constant indicating next player has lost
     DRAW: float         -- class constant indicating next player tied
+    IN_PLACE: bool      -- class constant indicating whether push and pop
+                           are implemented, so a search may move one state
+                           in place instead of calling apply_move
     '''
     # assign class constants
     WIN, LOSE, DRAW = 1.0, -1.0, 0.0
+    IN_PLACE = False
 
     def __init__(self, p, interactive=False):
         '''(GameState, str, bool) -> NoneType
@@ -57,6 +61,163 @@ class GameState:
         '''
         raise NotImplementedError('Method must be implemented in a subclass')
 
+    def is_legal(self, move):
+        '''(GameState, Move) -> bool
+
+        Return whether move is legal from state self. Subclasses that can
+        tell without listing every move should override this.
+        '''
+        return move in self.possible_next_moves()
+
+    def apply_trusted_move(self, move):
+        '''(GameState, Move) -> GameState
+
+        Return the new game state reached by applying move to state self,
+        skipping any check that move is legal. Searches use this for moves
+        taken from possible_next_moves.
+
+        Assume: move is in self.possible_next_moves()
+        '''
+        return self.apply_move(move)
+
+    def push(self, move):
+        '''(GameState, Move) -> NoneType
+
+        Apply move to state self in place, remembering how to undo it.
+
+        Assume: move is in self.possible_next_moves()
+        '''
+        raise NotImplementedError('Implemented in a subclass with IN_PLACE')
+
+    def pop(self):
+        '''(GameState) -> NoneType
+
+        Undo the most recent push on state self that has not been undone.
+        '''
+        raise NotImplementedError('Implemented in a subclass with IN_PLACE')
+
+    def next_state(self, move):
+        '''(GameState, Move) -> GameState
+
+        Return the state reached by move for a search: self itself moved by
+        push if IN_PLACE, which undo_next_state must then undo, and
+        otherwise a new state.
+
+        Assume: move is in self.possible_next_moves()
+
+        >>> from subtract_square_state import SubtractSquareState
+        >>> from subtract_square_move import SubtractSquareMove
+        >>> s = SubtractSquareState('p1', current_total=5)
+        >>> s.next_state(SubtractSquareMove(4)) is s, s.current_total
+        (True, 1)
+        >>> s.undo_next_state()
+        >>> s.current_total
+        5
+        '''
+        if self.IN_PLACE:
+            self.push(move)
+            return self
+        return self.apply_trusted_move(move)
+
+    def undo_next_state(self):
+        '''(GameState) -> NoneType
+
+        Undo the latest next_state of self that has not been undone, if it
+        moved self in place.
+        '''
+        if self.IN_PLACE:
+            self.pop()
+
+    def hash_key(self):
+        '''(GameState) -> int
+
+        Return an integer key for state self, for use in transposition
+        tables. Equal states have equal keys; unequal states are expected,
+        but not guaranteed, to have different keys.
+        '''
+        raise NotImplementedError('Method must be implemented in a subclass')
+
+    def move_index(self, move):
+        '''(GameState, Move) -> int
+
+        Return a small non-negative int identifying move among the moves
+        of this game, for tables indexed by move.
+        '''
+        raise NotImplementedError('Method must be implemented in a subclass')
+
+    def canonical(self):
+        '''(GameState) -> GameState
+
+        Return the state chosen to stand for every state equivalent to self
+        under the symmetries of the game. Games without symmetries return
+        self.
+        '''
+        return self
+
+    def canonical_key(self):
+        '''(GameState) -> int
+
+        Return a key shared by every state equivalent to self under the
+        symmetries of the game, by default the hash_key of self.canonical().
+        '''
+        return self.canonical().hash_key()
+
+    def distinct_next_moves(self):
+        ''' (GameState) -> list of Move
+
+        Return the legal moves from self, dropping moves that lead to states
+        symmetric to the state reached by an earlier move. Games without
+        symmetries return possible_next_moves().
+        '''
+        return self.possible_next_moves()
+
+    def solved_move(self):
+        ''' (GameState) -> Move
+
+        Return a best move for state self looked up in a table of solved
+        states, or None if there is no such table or self is not in it.
+        Strategies try this before searching.
+        '''
+        return None
+
+    def next_rough_outcomes(self):
+        ''' (GameState) -> list of float
+
+        Return the rough_outcome of the state reached by each of
+        possible_next_moves(), in the same order. Games that can estimate
+        them all at once override this.
+        '''
+        return [self.apply_trusted_move(m).rough_outcome()
+                for m in self.possible_next_moves()]
+
+    def next_over_count(self):
+        ''' (GameState) -> int
+
+        Return how many of the states reached by possible_next_moves() are
+        over. Games that can tell without making each state override this.
+
+        >>> from subtract_square_state import SubtractSquareState
+        >>> SubtractSquareState('p1', current_total=4).next_over_count()
+        1
+        '''
+        return len([m for m in self.possible_next_moves()
+                    if self.apply_trusted_move(m).over])
+
+    def random_playout(self, r):
+        ''' (GameState, random.Random) -> float
+
+        Return the outcome, for self.next_player, of playing on from self
+        to the end of the game by moves chosen at random by r. self is
+        left as it was. Games that can play faster than move by move
+        override this.
+        '''
+        state, sign = self, 1
+        while not state.over:
+            state = state.apply_trusted_move(
+                r.choice(state.possible_next_moves()))
+            sign = -sign
+        return sign * state.outcome()
+
     def winner(self, player):
         ''' (GameState, str) -> bool
 
@@ -30,7 +30,7 @@ class GameView:
         while not self.state.over:
             if self.state.next_player == 'p1':
                 m = self.state.get_move()
-                while not m in self.state.possible_next_moves():
+                while not self.state.is_legal(m):
                     # The move was illegal.
                     print('Illegal move: {}\nPlease try again.\n'.format(m))
                     print(self.state.instructions)
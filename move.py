@@ -4,4 +4,6 @@ class Move:
     zero-sum, perfect-information game.
     '''
 
-    # There is nothing to define here!
+    # There is nothing to define here, not even a __dict__, so that
+    # subclasses can be small __slots__ objects
+    __slots__ = ()
@@ -0,0 +1,97 @@
+class MoveOrdering:
+    ''' Order the moves of an alpha-beta search so that likely cutoffs are
+    searched first: the best move stored in the transposition table, then
+    the killer moves of the ply, then the rest by history score.
+
+    Moves are identified by GameState.move_index.
+
+    killers: list of list of int  -- for each ply, the latest moves that
+                                     caused a cutoff there, newest first
+    history: dict of int to int   -- for each move, the sum of depth**2
+                                     over the cutoffs it caused
+    use_tt, use_killers, use_history: bool  -- which stages are on
+    '''
+    KILLER_SLOTS = 2
+
+    def __init__(self, use_tt=True, use_killers=True, use_history=True):
+        ''' (MoveOrdering, bool, bool, bool) -> NoneType
+
+        Create a new MoveOrdering with the given stages turned on.
+        '''
+        self.use_tt = use_tt
+        self.use_killers = use_killers
+        self.use_history = use_history
+        self.killers = []
+        self.history = {}
+
+    def new_search(self):
+        ''' (MoveOrdering) -> NoneType
+
+        Prepare self for a search from a new root: forget the killer moves,
+        which belong to the plies of the old root, and halve the history
+        scores so that recent cutoffs count the most.
+        '''
+        self.killers = []
+        for i in self.history:
+            self.history[i] //= 2
+
+    def order(self, state, moves, ply, tt_move=-1):
+        ''' (MoveOrdering, GameState, list of Move, int, int) -> list of Move
+
+        Return moves, the legal moves from state at the given ply, in the
+        order to search them. tt_move is the move index of the best move
+        stored for state, or -1. Moves that tie keep their order.
+
+        >>> from subtract_square_state import SubtractSquareState
+        >>> s = SubtractSquareState('p1', current_total=10)
+        >>> o = MoveOrdering()
+        >>> o.cutoff(s, s.possible_next_moves()[2], 0, 3)
+        >>> o.cutoff(s, s.possible_next_moves()[1], 1, 2)
+        >>> o.order(s, s.possible_next_moves(), 1, 9)
+        [SubtractSquareMove(9), SubtractSquareMove(4), SubtractSquareMove(1)]
+        >>> o.order(s, s.possible_next_moves(), 2)
+        [SubtractSquareMove(1), SubtractSquareMove(4), SubtractSquareMove(9)]
+        '''
+        if self.use_killers and ply < len(self.killers):
+            killers = self.killers[ply]
+        else:
+            killers = []
+        history = self.history if self.use_history else {}
+        if not self.use_tt:
+            tt_move = -1
+        if tt_move < 0 and not killers and not history:
+            return moves
+        ranks = []
+        for m in moves:
+            i = state.move_index(m)
+            if i == tt_move:
+                ranks.append((2, 0))
+            elif i in killers:
+                ranks.append((1, -killers.index(i)))
+            else:
+                ranks.append((0, history.get(i, 0)))
+        order = sorted(range(len(moves)), key=ranks.__getitem__, reverse=True)
+        return [moves[j] for j in order]
+
+    def cutoff(self, state, move, ply, depth):
+        ''' (MoveOrdering, GameState, Move, int, int) -> NoneType
+
+        Record that move from state, at the given ply and with depth moves
+        left to search below it, caused a beta cutoff.
+        '''
+        i = state.move_index(move)
+        if self.use_killers:
+            while len(self.killers) <= ply:
+                self.killers.append([])
+            killers = self.killers[ply]
+            if i in killers:
+                killers.remove(i)
+            killers.insert(0, i)
+            del killers[MoveOrdering.KILLER_SLOTS:]
+        if self.use_history:
+            self.history[i] = self.history.get(i, 0) + depth * depth
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,60 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# number of workers -> ProcessPoolExecutor, shared by every strategy
+_POOLS = {}
+# a forked child does not own the pools it inherits, so it must start its own
+os.register_at_fork(after_in_child=_POOLS.clear)
+
+
+def get_pool(workers):
+    ''' (int) -> ProcessPoolExecutor
+
+    Return the pool of workers processes, starting it on first use and
+    reusing it for every later search.
+    '''
+    if workers not in _POOLS:
+        _POOLS[workers] = ProcessPoolExecutor(workers)
+    return _POOLS[workers]
+
+
+def map_children(workers, fn, state, moves, *args):
+    ''' (int, function, GameState, list of Move, ...) -> list
+
+    Return [fn(state.apply_trusted_move(m), *args) for m in moves], with
+    each call run in a process of the pool of workers processes. fn must be
+    a module-level function, so that it can be sent to the workers.
+
+    >>> from subtract_square_state import SubtractSquareState
+    >>> s = SubtractSquareState('p1', current_total=10)
+    >>> map_children(2, str, s, s.possible_next_moves()[:2])
+    ['Current total: 1; next player: p2', 'Current total: 6; next player: p2']
+    '''
+    pool = get_pool(workers)
+    try:
+        futures = [pool.submit(fn, state.apply_trusted_move(m), *args)
+                   for m in moves]
+        try:
+            return [f.result() for f in futures]
+        finally:
+            for f in futures:  # stop what is left after an error
+                f.cancel()
+    except BrokenProcessPool:
+        del _POOLS[workers]  # start a fresh pool next time
+        raise
+
+
+def shutdown():
+    ''' () -> NoneType
+
+    Shut down every pool started by get_pool.
+    '''
+    for pool in _POOLS.values():
+        pool.shutdown()
+    _POOLS.clear()
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
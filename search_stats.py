@@ -0,0 +1,186 @@
+'''Counts of what a search did, to find out why a move took long.
+
+Every minimax_move takes an optional SearchStats, stats, and the ply of
+its state below the root, and adds to stats as it searches. A
+suggest_move fills one in when its strategy asks for it; see
+Strategy.start_stats. With stats None, a state costs one comparison more.
+A CancellableStats also stops the search it is given to.
+
+>>> from subtract_square_state import SubtractSquareState
+>>> from strategy_minimax import minimax_move
+>>> stats = SearchStats()
+>>> minimax_move(SubtractSquareState('p1', current_total=5), stats)
+-1.0
+>>> stats.nodes, stats.terminal_leaves, stats.max_depth
+(9, 3, 5)
+'''
+import time
+
+
+class SearchStats:
+    ''' What one search, or one suggest_move, did.
+
+    nodes: int             -- states searched, counting one found in a cache
+    terminal_leaves: int   -- states scored by outcome, the game being over
+    heuristic_leaves: int  -- states estimated by rough_outcome
+    cutoffs: int           -- alpha-beta cutoffs
+    tt_hits: int           -- lookups that found their state in a cache
+    tt_misses: int         -- lookups that did not
+    max_depth: int         -- most moves below the root searched
+    root_moves: list of (Move, float)  -- each move from the root and the
+                                          seconds spent searching it, in
+                                          the order searched
+    iterations: list of (int, float)   -- depth and seconds of each search
+                                          of an iterative deepening
+    seconds: float         -- wall time from the start to finish
+    '''
+
+    def __init__(self):
+        ''' (SearchStats) -> NoneType
+
+        Create a new, empty SearchStats and start its clock.
+        '''
+        self.nodes = self.terminal_leaves = self.heuristic_leaves = 0
+        self.cutoffs = self.tt_hits = self.tt_misses = self.max_depth = 0
+        self.root_moves = []
+        self.iterations = []
+        self.seconds = 0.0
+        self._start = time.perf_counter()
+
+    def __repr__(self):
+        ''' (SearchStats) -> str
+
+        Return a summary of self.
+
+        >>> SearchStats()
+        SearchStats(nodes=0, terminal_leaves=0, heuristic_leaves=0, cutoffs=0, tt_hits=0, tt_misses=0, max_depth=0, seconds=0)
+        '''
+        return 'SearchStats({})'.format(', '.join(
+            '{}={:g}'.format(name, getattr(self, name)) for name in
+            ('nodes', 'terminal_leaves', 'heuristic_leaves', 'cutoffs',
+             'tt_hits', 'tt_misses', 'max_depth', 'seconds')))
+
+    def node(self, ply):
+        ''' (SearchStats, int) -> NoneType
+
+        Record a state searched ply moves below the root.
+        '''
+        self.nodes += 1
+        if ply > self.max_depth:
+            self.max_depth = ply
+
+    def effective_branching_factor(self):
+        ''' (SearchStats) -> float
+
+        Return the number of children a state would need for a full tree
+        of max_depth to hold nodes states, nodes ** (1 / max_depth), or
+        0.0 before the first move below the root.
+
+        >>> stats = SearchStats()
+        >>> stats.nodes, stats.max_depth = 1000, 3
+        >>> round(stats.effective_branching_factor(), 6)
+        10.0
+        '''
+        if self.max_depth == 0:
+            return 0.0
+        return self.nodes ** (1 / self.max_depth)
+
+    def finish(self):
+        ''' (SearchStats) -> NoneType
+
+        Stop the clock of self, setting seconds.
+        '''
+        self.seconds = time.perf_counter() - self._start
+
+    def merge(self, other, move=None):
+        ''' (SearchStats, SearchStats, Move) -> NoneType
+
+        Add the counts of other, a finished search, to self, and its
+        seconds as the time spent on move from the root, if given.
+        '''
+        for name in ('nodes', 'terminal_leaves', 'heuristic_leaves',
+                     'cutoffs', 'tt_hits', 'tt_misses'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.max_depth = max(self.max_depth, other.max_depth)
+        if move is not None:
+            self.root_moves.append((move, other.seconds))
+
+    def as_dict(self):
+        ''' (SearchStats) -> dict
+
+        Return self as a dict that json can write, with moves as their
+        str.
+        '''
+        return {'nodes': self.nodes, 'terminal_leaves': self.terminal_leaves,
+                'heuristic_leaves': self.heuristic_leaves,
+                'cutoffs': self.cutoffs, 'tt_hits': self.tt_hits,
+                'tt_misses': self.tt_misses, 'max_depth': self.max_depth,
+                'effective_branching_factor':
+                    self.effective_branching_factor(),
+                'root_moves': [[str(m), s] for m, s in self.root_moves],
+                'iterations': [list(i) for i in self.iterations],
+                'seconds': self.seconds}
+
+
+class SearchCancelled(Exception):
+    ''' Raised by CancellableStats to stop a search. '''
+
+
+class CancellableStats(SearchStats):
+    ''' SearchStats that stop their search, by raising SearchCancelled at
+    the next state searched, once cancelled is set or deadline passes.
+    Either may be set from another thread.
+
+    deadline: float            -- time.perf_counter() to stop at, or None
+    cancelled: threading.Event -- set to stop the search
+
+    >>> from subtract_square_state import SubtractSquareState
+    >>> from strategy_minimax import minimax_move
+    >>> minimax_move(SubtractSquareState('p1', current_total=50),
+    ...              CancellableStats(time.perf_counter()))
+    Traceback (most recent call last):
+    ...
+    search_stats.SearchCancelled: deadline passed
+    '''
+
+    def __init__(self, deadline=None, cancelled=None):
+        ''' (CancellableStats, float, threading.Event) -> NoneType
+
+        Create a new, empty CancellableStats to stop at deadline, if
+        given, or once cancelled, if given, is set.
+        '''
+        SearchStats.__init__(self)
+        self.deadline = deadline
+        self.cancelled = cancelled
+
+    def node(self, ply):
+        ''' (CancellableStats, int) -> NoneType
+
+        Record a state searched ply moves below the root, or raise
+        SearchCancelled if the search is to stop.
+
+        Overrides SearchStats.node
+        '''
+        if self.cancelled is not None and self.cancelled.is_set():
+            raise SearchCancelled('cancelled')
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchCancelled('deadline passed')
+        SearchStats.node(self, ply)
+
+
+def collected(state, fn, *args):
+    ''' (GameState, function, ...) -> (object, SearchStats)
+
+    Return fn(state, *args) searched as a child of the root, with a new
+    SearchStats, and that SearchStats, finished. For searches in worker
+    processes, whose stats are sent back with their result.
+    '''
+    stats = SearchStats()
+    result = fn(state, *args, stats=stats, ply=1)
+    stats.finish()
+    return result, stats
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
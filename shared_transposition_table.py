@@ -0,0 +1,262 @@
+import struct
+import sys
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+from transposition_table import TranspositionTable
+
+# name -> SharedTranspositionTable attached to by this process: only the
+# latest, so that blocks freed by their owners are not kept mapped
+_ATTACHED = {}
+
+
+class SharedTranspositionTable(TranspositionTable):
+    ''' A TranspositionTable kept in shared memory, so that searches in
+    several processes can use one another's results.
+
+    Each slot is three 64-bit words: a check word, the score, and an info
+    word packing a used bit, the flag, the depth and the move index. The
+    check word is the key XORed with the other two, so a slot torn by two
+    processes storing at once reads as a miss instead of a wrong score,
+    and no locks are needed.
+
+    name: str  -- name of the shared memory block, for attaching to it
+    '''
+    SLOT_BYTES = 3 * 8
+
+    def __init__(self, max_entries=None, max_bytes=None, name=None):
+        ''' (SharedTranspositionTable, int, int, str) -> NoneType
+
+        Create an empty SharedTranspositionTable sized as for
+        TranspositionTable, or attach to the existing one called name, in
+        which case the size must be the same as it was created with.
+
+        >>> t = SharedTranspositionTable(max_entries=8)
+        >>> u = SharedTranspositionTable(max_entries=8, name=t.name)
+        >>> t.store(5, -1.0, 2)
+        >>> u.get(5)
+        -1.0
+        '''
+        if max_entries is None and max_bytes is None:
+            max_entries = TranspositionTable.DEFAULT_ENTRIES
+        slots = max_entries
+        if max_bytes is not None:
+            by_bytes = max_bytes // SharedTranspositionTable.SLOT_BYTES
+            if slots is None or by_bytes < slots:
+                slots = by_bytes
+        self.buckets = max(slots // 2, 1)
+        self.slots = 2 * self.buckets
+        size = SharedTranspositionTable.SLOT_BYTES * self.slots
+        self._shm = _open(name, size)  # new blocks are zeroed: all unused
+        self.name = self._shm.name
+        self._words = self._shm.buf.cast('Q')
+        self._floats = self._shm.buf.cast('d')
+        self.hits, self.misses, self.overwrites = 0, 0, 0
+        self._finalizer = weakref.finalize(
+            self, _release, self._shm, self._words, self._floats,
+            name is None)
+
+    def __reduce__(self):
+        ''' (SharedTranspositionTable) -> tuple
+
+        Return how to pickle self: by name, so that a process unpickling it
+        attaches to the same shared memory.
+        '''
+        return (_attach, (self.name, self.slots))
+
+    def __len__(self):
+        ''' (SharedTranspositionTable) -> int
+
+        Return the number of occupied slots in self.
+        '''
+        return len([i for i in range(self.slots)
+                    if self._words[3 * i + 2] & 1])
+
+    def _read(self, i):
+        ''' (SharedTranspositionTable, int) -> (int, int, int)
+
+        Return the key, score bits and info word of slot i, or a key of -1
+        if the slot is unused or was torn by a concurrent store.
+        '''
+        check = self._words[3 * i]
+        score_bits = self._words[3 * i + 1]
+        info = self._words[3 * i + 2]
+        if not info & 1:
+            return -1, score_bits, info
+        return check ^ score_bits ^ info, score_bits, info
+
+    def _find(self, key):
+        ''' (SharedTranspositionTable, int) -> (float, int, int, int)
+
+        Return the score, depth, flag and move index stored for key, or
+        None if key is not stored.
+        '''
+        i = 2 * (key % self.buckets)
+        for j in (i, i + 1):
+            stored, score_bits, info = self._read(j)
+            if stored == key:
+                return (_to_float(score_bits), info >> 3 & 0x1FFFFFFF,
+                        info >> 1 & 3, (info >> 32) - 1)
+        return None
+
+    def __contains__(self, key):
+        ''' (SharedTranspositionTable, int) -> bool
+
+        Return whether key is stored in self, without counting a lookup.
+        '''
+        return self._find(key) is not None
+
+    def get(self, key, default=None):
+        ''' (SharedTranspositionTable, int, object) -> float
+
+        Return the EXACT score stored for key, or default if there is none.
+        '''
+        entry = self._find(key)
+        if entry is None or entry[2] != TranspositionTable.EXACT:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return entry[0]
+
+    def probe(self, key):
+        ''' (SharedTranspositionTable, int) -> (float, int, int, int)
+
+        Return the score, depth, flag and best move index stored for key,
+        or None if there are none.
+
+        >>> t = SharedTranspositionTable(max_entries=8)
+        >>> t.store(5, 0.0, 3, TranspositionTable.LOWER, 7)
+        >>> t.probe(5)
+        (0.0, 3, 1, 7)
+        '''
+        entry = self._find(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def depth(self, key):
+        ''' (SharedTranspositionTable, int) -> int
+
+        Return the depth stored with key, or -1 if key is not stored.
+        '''
+        entry = self._find(key)
+        return -1 if entry is None else entry[1]
+
+    def store(self, key, score, depth, flag=TranspositionTable.EXACT,
+              move=-1):
+        ''' (SharedTranspositionTable, int, float, int, int, int) -> NoneType
+
+        Store score for key as TranspositionTable.store does.
+
+        >>> t = SharedTranspositionTable(max_entries=2)
+        >>> t.store(1, 1.0, 5)
+        >>> t.store(2, 0.0, 3)
+        >>> t.store(3, -1.0, 1)
+        >>> 1 in t, 2 in t, 3 in t, t.overwrites
+        (True, False, True, 1)
+        >>> t = SharedTranspositionTable(max_entries=2)
+        >>> for key, depth in ((2, 5), (1, 1), (2, 0), (1, 3)):
+        ...     t.store(key, float(depth), depth)
+        >>> t.probe(2)[1], t.probe(1)[1], len(t)
+        (0, 3, 2)
+        '''
+        i = 2 * (key % self.buckets)
+        stored, score_bits, info = self._read(i + 1)
+        if stored == key:  # never keep key in both slots of its bucket
+            i += 1
+        else:
+            stored, score_bits, info = self._read(i)
+            if not (stored == key or not info & 1 or
+                    depth >= info >> 3 & 0x1FFFFFFF):
+                i += 1
+                stored, score_bits, info = self._read(i)
+        if info & 1 and stored != key:
+            self.overwrites += 1
+        info = 1 | flag << 1 | depth << 3 | (move + 1) << 32
+        self._floats[3 * i + 1] = score
+        self._words[3 * i + 2] = info
+        self._words[3 * i] = key ^ self._words[3 * i + 1] ^ info
+
+    def clear(self):
+        ''' (SharedTranspositionTable) -> NoneType
+
+        Remove every entry from self, for every process, and reset the
+        counters of this process.
+        '''
+        for i in range(self.slots):
+            self._words[3 * i + 2] = 0
+        self.hits, self.misses, self.overwrites = 0, 0, 0
+
+    def close(self):
+        ''' (SharedTranspositionTable) -> NoneType
+
+        Stop using self in this process. The process that created self also
+        frees the shared memory.
+        '''
+        self._finalizer()
+
+
+def _attach(name, slots):
+    ''' (str, int) -> SharedTranspositionTable
+
+    Return a SharedTranspositionTable attached to the block called name,
+    reusing this process's attachment if there is one. Attaching to another
+    block closes the attachment to the last one.
+
+    >>> t, u = (SharedTranspositionTable(max_entries=8) for i in range(2))
+    >>> _attach(t.name, t.slots) is _attach(t.name, t.slots)
+    True
+    >>> _attach(u.name, u.slots).name == u.name, list(_ATTACHED) == [u.name]
+    (True, True)
+    '''
+    table = _ATTACHED.get(name)
+    if table is None:
+        for old in _ATTACHED.values():
+            old.close()
+        _ATTACHED.clear()
+        table = _ATTACHED[name] = SharedTranspositionTable(slots, name=name)
+    return table
+
+
+def _open(name, size):
+    ''' (str, int) -> SharedMemory
+
+    Return the existing shared memory block called name, or a new one of
+    size bytes if name is None. It is left out of the resource tracker,
+    which would otherwise free it when any process using it exits; the
+    finalizer of the table that created it frees it instead.
+    '''
+    create = name is None
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, create, size, track=False)
+    shm = shared_memory.SharedMemory(name, create, size)
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+def _release(shm, words, floats, owner):
+    ''' (SharedMemory, memoryview, memoryview, bool) -> NoneType
+
+    Release the views of shm and close it, unlinking it if owner.
+    '''
+    words.release()
+    floats.release()
+    shm.close()
+    if owner:
+        if sys.version_info < (3, 13):  # unlink unregisters it again
+            resource_tracker.register(shm._name, 'shared_memory')
+        shm.unlink()
+
+
+def _to_float(bits):
+    ''' (int) -> float
+
+    Return the float whose 64 bits are bits.
+    '''
+    return struct.unpack('<d', struct.pack('<Q', bits))[0]
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,166 @@
+'''A file of solved Tippy positions, shared by every process that reads it.
+
+The file holds a header of three 64-bit words (MAGIC, board size, number
+of positions), then the canonical keys of the positions in increasing
+order, then the best move of each (an int16 cell index, in the
+orientation of the canonical key, or -1), then its exact score (int8).
+SolvedPositions maps the file read-only and binary searches the keys in
+place, so opening it costs nothing and processes share the pages.
+
+>>> import os, tempfile
+>>> from tippy_square_state import TippyGameState
+>>> from tippy_move import TippyMove
+>>> path = os.path.join(tempfile.mkdtemp(), 'tippy3.db')
+>>> s = TippyGameState('p1', board_size=3)
+>>> table = build(path, [s])
+>>> table.value(s)
+1.0
+>>> s.push(table.best_move(s))
+>>> table.value(s)
+-1.0
+'''
+import os
+import numpy as np
+from tippy_move import TippyMove
+from tippy_square_state import symmetries
+
+MAGIC = int.from_bytes(b'TIPPYDB1', 'little')
+HEADER_BYTES = 3 * 8
+
+
+class SolvedPositions:
+    ''' Solved Tippy positions of one board size, looked up by
+    canonical_key in a file mapped into memory.
+
+    path: str        -- file the positions were read from
+    board_size: int  -- size of the board of every position
+    keys: numpy array of uint64  -- canonical keys, in increasing order
+    moves: numpy array of int16  -- best move of each key, as a cell index
+                                    in the orientation of the key, or -1
+    values: numpy array of int8  -- score of each key for the next player
+    '''
+
+    def __init__(self, path):
+        ''' (SolvedPositions, str) -> NoneType
+
+        Open the positions written at path by write.
+        '''
+        self.path = path
+        raw = np.memmap(path, np.uint8, 'r')
+        magic, self.board_size, count = raw[:HEADER_BYTES].view(np.uint64)
+        if magic != MAGIC:
+            raise ValueError('{} is not a file of solved positions'.format(
+                path))
+        self.board_size, count = int(self.board_size), int(count)
+        start = HEADER_BYTES
+        self.keys = raw[start:start + 8 * count].view(np.uint64)
+        start += 8 * count
+        self.moves = raw[start:start + 2 * count].view(np.int16)
+        start += 2 * count
+        self.values = raw[start:start + count].view(np.int8)
+
+    def __len__(self):
+        ''' (SolvedPositions) -> int
+
+        Return the number of positions in self.
+        '''
+        return len(self.keys)
+
+    def find(self, key):
+        ''' (SolvedPositions, int) -> int
+
+        Return the index of canonical key key in self, or -1 if it is not
+        there.
+        '''
+        i = int(np.searchsorted(self.keys, np.uint64(key)))
+        if i < len(self.keys) and self.keys[i] == key:
+            return i
+        return -1
+
+    def value(self, state):
+        ''' (SolvedPositions, TippyGameState) -> float
+
+        Return the exact score of state for its next player, or None if
+        state is not in self.
+        '''
+        i = self.find(state.canonical_key())
+        return None if i < 0 else float(self.values[i])
+
+    def best_move(self, state):
+        ''' (SolvedPositions, TippyGameState) -> TippyMove
+
+        Return a best move from state, or None if state is not in self or
+        has no moves.
+        '''
+        i = self.find(state.canonical_key())
+        if i < 0 or self.moves[i] < 0:
+            return None
+        # the move is stored in the orientation of the canonical key
+        perm = symmetries(self.board_size)[state.canonical_symmetry()]
+        cell = perm.index(int(self.moves[i]))
+        return TippyMove(divmod(cell, self.board_size))
+
+
+def solve(state, found):
+    ''' (TippyGameState, dict of int to (float, int)) -> float
+
+    Return the exact score of state for its next player. Add to found,
+    for state and each state its search reaches, canonical_key -> (score,
+    best move as a cell index in the orientation of the key, or -1).
+    Searching a state stops at its first winning move.
+    '''
+    key = state.canonical_key()
+    if key in found:
+        return found[key][0]
+    if state.over:
+        found[key] = (state.outcome(), -1)
+        return found[key][0]
+    best, best_cell = None, -1
+    for move in state.distinct_next_moves():
+        state.push(move)
+        score = - solve(state, found)
+        state.pop()
+        if best is None or score > best:
+            best, best_cell = score, state.move_index(move)
+            if best == state.WIN:
+                break
+    perm = symmetries(state.board_size)[state.canonical_symmetry()]
+    found[key] = (best, perm[best_cell])
+    return best
+
+
+def write(path, board_size, found):
+    ''' (str, int, dict of int to (float, int)) -> NoneType
+
+    Write the positions in found, as filled in by solve, to path. The file
+    is replaced in one step, so that processes reading the old one are not
+    disturbed.
+    '''
+    keys = np.fromiter(found, np.uint64, len(found))
+    order = np.argsort(keys)
+    moves = np.array([found[k][1] for k in found], np.int16)
+    values = np.array([found[k][0] for k in found], np.int8)
+    header = np.array([MAGIC, board_size, len(found)], np.uint64)
+    partial = '{}.{}.tmp'.format(path, os.getpid())
+    with open(partial, 'wb') as f:
+        for array in (header, keys[order], moves[order], values[order]):
+            f.write(array.tobytes())
+    os.replace(partial, path)
+
+
+def build(path, states):
+    ''' (str, list of TippyGameState) -> SolvedPositions
+
+    Solve each of states, all of one board size, write every position
+    reached to path and return them.
+    '''
+    found = {}
+    for state in states:
+        solve(state, found)
+    write(path, states[0].board_size, found)
+    return SolvedPositions(path)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
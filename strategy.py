@@ -1,9 +1,23 @@
+from search_stats import SearchStats
+
+
 class Strategy:
     '''Interface to suggest moves for a GameState.
 
     Must be subclassed to a concrete strategy.  Our intention is
     to provide a uniform interface for functions that suggest moves.
+
+    collect_stats: bool   -- whether suggest_move records a SearchStats of
+                             what it searched in last_stats
+    last_stats: SearchStats  -- stats of the latest suggest_move, or None
+    on_stats: function    -- called with last_stats after each suggest_move,
+                             or None
+    stats_factory: function  -- makes the SearchStats of each suggest_move
     '''
+    collect_stats = False
+    last_stats = None
+    on_stats = None
+    stats_factory = SearchStats
 
     def __init__(self, interactive=False):
         '''(Strategy, bool) -> NoneType
@@ -17,3 +31,27 @@ class Strategy:
         Suggest a next move for state.
         '''
         raise NotImplementedError('Must be implemented in subclass')
+
+    def start_stats(self):
+        '''(Strategy) -> SearchStats
+
+        Return a new SearchStats, made by self.stats_factory, for
+        suggest_move to fill in, if self.collect_stats or self.on_stats is
+        set, and None otherwise.
+        '''
+        if self.collect_stats or self.on_stats is not None:
+            return self.stats_factory()
+        return None
+
+    def finish_stats(self, stats):
+        '''(Strategy, SearchStats) -> NoneType
+
+        Finish stats, unless it is None, keep it as self.last_stats and
+        pass it to self.on_stats, if set.
+        '''
+        if stats is None:
+            return
+        stats.finish()
+        self.last_stats = stats
+        if self.on_stats is not None:
+            self.on_stats(stats)
@@ -0,0 +1,200 @@
+import math
+import random
+import time
+from strategy import Strategy
+
+
+class StrategyMCTS(Strategy):
+    ''' Interface to suggest a strong move by Monte Carlo tree search.
+
+    Each playout walks down the tree by UCT, adds one state to it, and plays
+    on from there by random moves, through GameState.random_playout. The
+    move suggested is the most visited one from the root. The subtree under
+    the moves actually played is kept for the next suggest_move.
+
+    time_limit: float    -- seconds each suggest_move may spend, or None
+    playouts: int        -- most playouts each suggest_move may make, or
+                            None
+    exploration: float   -- weight of the exploration term of UCT
+    random: random.Random  -- chooses the moves tried and played out
+    '''
+
+    def __init__(self, interactive=False, time_limit=1.0, playouts=None,
+                 exploration=math.sqrt(2), seed=None):
+        '''(StrategyMCTS, bool, float, int, float, object) -> NoneType
+
+        Create new StrategyMCTS (self), prompt user if interactive. Stop
+        each search once time_limit seconds have passed or playouts
+        playouts are made, whichever is first; at least one must be given.
+        Seed the random choices with seed, if given.
+
+        >>> from tippy_square_state import TippyGameState
+        >>> from tippy_move import TippyMove
+        >>> s = TippyGameState('p1', current_board=[['X ', 'X ', '_ ', '_ '], ['_ ', 'O ', 'X ', '_ '], ['O ', '_ ', 'O ', '_ '], ['_ ', '_ ', '_ ', '_ ']])
+        >>> m = StrategyMCTS(time_limit=None, playouts=2000, seed=1)
+        >>> m.suggest_move(s) in [TippyMove((0, 2)), TippyMove((1, 3)), TippyMove((2, 1))]
+        True
+        '''
+        if time_limit is None and playouts is None:
+            raise ValueError('give a time_limit or a number of playouts')
+        self.time_limit = time_limit
+        self.playouts = playouts
+        self.exploration = exploration
+        self.random = random.Random(seed)
+        self._root = None  # node of the state of the latest suggest_move
+
+    def suggest_move(self, state):
+        '''(StrategyMCTS, GameState) -> Move
+
+        Return a strong move from those available for state.
+
+        Overrides Strategy.suggest_move
+
+        >>> from subtract_square_state import SubtractSquareState
+        >>> m = StrategyMCTS(time_limit=None, playouts=500, seed=1)
+        >>> s = SubtractSquareState('p1', current_total=29)
+        >>> m.suggest_move(s)
+        SubtractSquareMove(9)
+        >>> from subtract_square_move import SubtractSquareMove
+        >>> s = s.apply_move(SubtractSquareMove(9))
+        >>> kept = [n for n in m._root.children if n.move.amount == 1][0]
+        >>> before = kept.visits
+        >>> m.suggest_move(s.apply_move(SubtractSquareMove(1)))
+        SubtractSquareMove(9)
+        >>> kept.visits - before
+        500
+        >>> m = StrategyMCTS(time_limit=0.0)
+        >>> m.suggest_move(s) in s.possible_next_moves()
+        True
+        '''
+
+        stats = self.start_stats()
+        move = state.solved_move()
+        if move is not None:  # no need to search a solved state
+            self.finish_stats(stats)
+            return move
+
+        root = self._reused_root(state)
+        if self.time_limit is None:
+            deadline = None
+        else:
+            deadline = time.perf_counter() + self.time_limit
+        playouts = 0
+        while (self.playouts is None or playouts < self.playouts) and (
+                deadline is None or time.perf_counter() < deadline):
+            self._playout(root, state, stats)
+            playouts += 1
+        if not root.children:  # no time for a playout: expand a move anyway
+            self._playout(root, state, stats)
+        best = max(root.children, key=_visits)
+        best.parent = None  # keep only the subtree of the move made
+        self._root = best
+        self.finish_stats(stats)
+        return best.move
+
+    def _reused_root(self, state):
+        ''' (StrategyMCTS, GameState) -> _Node
+
+        Return the node of state in the subtree kept from the latest
+        suggest_move, if it is there, as a new root, and otherwise a new
+        root for state.
+        '''
+        key = state.hash_key()
+        if self._root is not None:
+            for node in [self._root] + self._root.children:
+                if node.key == key and node.next_player == state.next_player:
+                    node.parent = None
+                    return node
+        return _Node(None, None, state)
+
+    def _playout(self, root, state, stats):
+        ''' (StrategyMCTS, _Node, GameState, SearchStats) -> NoneType
+
+        Make one playout from root, the node of state, and add its outcome
+        to every node on its path. state is left as it was.
+        '''
+        node, current, path = root, state, []
+        c = self.exploration
+        try:
+            # select: descend by UCT while every move of the node has a
+            # child
+            while not node.untried and node.children:
+                log_visits = math.log(node.visits)
+                best, best_value = None, None
+                for child in node.children:
+                    value = (child.wins / child.visits +
+                             c * math.sqrt(log_visits / child.visits))
+                    if best_value is None or value > best_value:
+                        best, best_value = child, value
+                node = best
+                current = current.next_state(node.move)
+                path.append(current)
+            # expand: add the state reached by one untried move, only once
+            # stats have let the search go on, so that a cancelled search
+            # leaves no unvisited child in the tree
+            if node.untried:
+                i = self.random.randrange(len(node.untried))
+                current = current.next_state(node.untried[i])
+                path.append(current)
+                if stats is not None:
+                    stats.node(len(path))
+                child = _Node(node.untried.pop(i), node, current)
+                node.children.append(child)
+                node = child
+            if stats is not None:
+                if current.over:
+                    stats.terminal_leaves += 1
+                else:
+                    stats.heuristic_leaves += 1
+            # the outcome for the player to move at node, who did not move
+            # there
+            outcome = current.random_playout(self.random)
+        finally:  # a cancelled search leaves state as it was
+            for i in range(len(path)):
+                state.undo_next_state()
+        while node is not None:
+            node.visits += 1
+            node.wins += (1 - outcome) / 2
+            outcome = - outcome
+            node = node.parent
+
+
+class _Node:
+    ''' A state in the tree of a StrategyMCTS.
+
+    move: Move           -- move from the parent to this state, or None
+    parent: _Node        -- node of the state before move, or None
+    key: int             -- hash_key of the state
+    next_player: str     -- next player of the state
+    untried: list of Move  -- legal moves without a child yet
+    children: list of _Node
+    visits: int          -- playouts through this node
+    wins: float          -- their wins for the player who made move, a draw
+                            counting a half
+    '''
+    __slots__ = ('move', 'parent', 'key', 'next_player', 'untried',
+                 'children', 'visits', 'wins')
+
+    def __init__(self, move, parent, state):
+        ''' (_Node, Move, _Node, GameState) -> NoneType
+
+        Create a new leaf for state, reached by move from parent.
+        '''
+        self.move, self.parent = move, parent
+        self.key, self.next_player = state.hash_key(), state.next_player
+        self.untried = [] if state.over else state.possible_next_moves()
+        self.children = []
+        self.visits, self.wins = 0, 0.0
+
+
+def _visits(node):
+    ''' (_Node) -> int
+
+    Return the visits of node, to choose the most visited child.
+    '''
+    return node.visits
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -1,39 +1,106 @@
 import random
+import time
 from strategy import Strategy
+from parallel_search import map_children
+from search_stats import collected
 
 
 class StrategyMinimax(Strategy):
     ''' Interface to suggest a strong move.
 
+    workers: int  -- number of processes to search the moves from the root
+                     in, or None to search them one after another here
     '''
 
+    def __init__(self, interactive=False, workers=None):
+        '''(StrategyMinimax, bool, int) -> NoneType
+
+        Create new StrategyMinimax (self), prompt user if interactive.
+        If workers is given, search each move from the root in a shared
+        pool of that many processes.
+        '''
+        self.workers = workers
+
     def suggest_move(self, state):
         '''(Minimax, GameState) -> Move
 
         Return a strong move from those available for state.
 
         Overrides Strategy.suggest_move
+
+        >>> from subtract_square_state import SubtractSquareState
+        >>> m = StrategyMinimax()
+        >>> m.collect_stats = True
+        >>> m.suggest_move(SubtractSquareState('p1', current_total=8))
+        SubtractSquareMove(1)
+        >>> m.last_stats.nodes, len(m.last_stats.root_moves)
+        (24, 2)
         '''
+
+        stats = self.start_stats()
+        move = state.solved_move()
+        if move is not None:  # no need to search a solved state
+            self.finish_stats(stats)
+            return move
         
         score_to_move = {}
-        for m in state.possible_next_moves():
-            s = state.apply_move(m)
-            score = - minimax_move(s)
+        moves = state.possible_next_moves()
+        if self.workers and stats is not None:
+            scores = []
+            for m, (score, child) in zip(moves, map_children(
+                    self.workers, collected, state, moves, minimax_move)):
+                stats.merge(child, m)
+                scores.append(- score)
+        elif self.workers:
+            scores = [- score for score in
+                      map_children(self.workers, minimax_move, state, moves)]
+        else:
+            scores = []
+            for m in moves:
+                start = time.perf_counter()
+                if state.IN_PLACE:  # search by moving state itself in place
+                    state.push(m)
+                    try:
+                        scores.append(- minimax_move(state, stats, 1))
+                    finally:  # a cancelled search leaves state as it was
+                        state.pop()
+                else:
+                    s = state.apply_trusted_move(m)
+                    scores.append(- minimax_move(s, stats, 1))
+                if stats is not None:
+                    stats.root_moves.append((m, time.perf_counter() - start))
+        for m, score in zip(moves, scores):
             if score not in score_to_move:
                 score_to_move[score] = []
             score_to_move[score].append(m)
         best_score = max(score_to_move.keys())
+        self.finish_stats(stats)
         return random.choice(score_to_move[best_score])
 
 
-def minimax_move(state):
-    ''' (Move, GameState) -> int
+def minimax_move(state, stats=None, ply=0):
+    ''' (GameState, SearchStats, int) -> int
         
     Return a score(0, 1, -1) of each move with respect to next_player.
+    Add what is searched to stats, if given, with state ply moves below
+    the root.
     '''
 
+    if stats is not None:
+        stats.node(ply)
     if state.over:
+        if stats is not None:
+            stats.terminal_leaves += 1
         return state.outcome()
+    elif state.IN_PLACE:
+        scores = []
+        for x in state.possible_next_moves():
+            state.push(x)
+            try:
+                scores.append(-minimax_move(state, stats, ply + 1))
+            finally:
+                state.pop()
+        return max(scores)
     else:
-        return max([-minimax_move(state.apply_move(x)) 
+        return max([-minimax_move(state.apply_trusted_move(x), stats, ply + 1)
                     for x in state.possible_next_moves()])
@@ -1,18 +1,76 @@
+import itertools
 import random
+import time
 from strategy import Strategy
+from transposition_table import TranspositionTable
+from shared_transposition_table import SharedTranspositionTable
+from parallel_search import map_children
+from search_stats import collected
+
+
+# numbers telling apart the strategies whose caches the workers keep
+_OWNERS = itertools.count()
+
+
+class HashCollisionError(Exception):
+    ''' Raised when two different states share a hash_key. '''
 
 
 class StrategyMinimaxMemoize(Strategy):
     ''' Interface to suggest a strong move.
 
+    state_to_score: dict of int to float  -- score of each state visited,
+                                             keyed by GameState.hash_key,
+                                             or a TranspositionTable if
+                                             its size is limited or it is
+                                             shared
+    state_to_repr: dict of int to str     -- repr of each state visited, to
+                                             detect collisions, or only of
+                                             those still in a bounded
+                                             state_to_score; None unless
+                                             verify
+    symmetry: bool  -- whether states are keyed by GameState.canonical_key,
+                       so that symmetric states share one entry
+    workers: int    -- number of processes to search the moves from the
+                       root in, each with its own cache unless the cache is
+                       shared, or None to search them one after another here
     '''
     
-    def __init__(self, interactive=False):
-        '''(StrategyMinimaxMemoize) -> None
+    def __init__(self, interactive=False, verify=False, max_entries=None,
+                 max_bytes=None, symmetry=False, workers=None, shared=False):
+        '''(StrategyMinimaxMemoize, bool, bool, int, int, bool, int, bool)
+            -> None
         
         Create new StrategyMinimaxMemoize (self), prompt user if interactive.
+        If verify, check every cache hit against the repr of the state
+        stored under that key and raise HashCollisionError on a mismatch.
+        If max_entries or max_bytes is given, cache scores in a
+        TranspositionTable of that size instead of an unbounded dict.
+        If symmetry, key states by their canonical form and only search one
+        of each group of symmetric moves at the root. If workers is given,
+        search each move from the root in a shared pool of that many
+        processes. If shared, cache scores in a SharedTranspositionTable
+        that the workers all read and add to.
+
+        >>> from subtract_square_state import SubtractSquareState
+        >>> s = SubtractSquareState('p1', current_total=8)
+        >>> m = StrategyMinimaxMemoize(workers=2, shared=True, max_entries=64)
+        >>> m.suggest_move(s)
+        SubtractSquareMove(1)
+        >>> m.state_to_score.get(s.apply_move(m.suggest_move(s)).hash_key())
+        -1.0
         '''
-        self.state_to_score = {}
+        if shared:
+            self.state_to_score = SharedTranspositionTable(max_entries,
+                                                           max_bytes)
+        elif max_entries is None and max_bytes is None:
+            self.state_to_score = {}
+        else:
+            self.state_to_score = TranspositionTable(max_entries, max_bytes)
+        self.state_to_repr = {} if verify else None
+        self.symmetry = symmetry
+        self.workers = workers
+        self._owner = next(_OWNERS)
         
     def suggest_move(self, state):
         '''(StrategyMinimaxMemoize, GameState) -> Move
@@ -20,42 +78,219 @@ class StrategyMinimaxMemoize(Strategy):
         Return a strong move from those available for state.
 
         Overrides Strategy.suggest_move
+
+        >>> from subtract_square_state import SubtractSquareState
+        >>> m = StrategyMinimaxMemoize(workers=2)
+        >>> found = []
+        >>> m.on_stats = found.append
+        >>> m.suggest_move(SubtractSquareState('p1', current_total=8))
+        SubtractSquareMove(1)
+        >>> found[0].tt_misses > 0, len(found[0].root_moves)
+        (True, 2)
         '''
+
+        stats = self.start_stats()
+        move = state.solved_move()
+        if move is not None:  # no need to search a solved state
+            self.finish_stats(stats)
+            return move
         
         score_to_move = {}
-        for m in state.possible_next_moves():
-            s = state.apply_move(m)
-            score = - minimax_move(s, self.state_to_score)
+        if self.symmetry:
+            moves = state.distinct_next_moves()
+        else:
+            moves = state.possible_next_moves()
+        if self.workers:
+            if isinstance(self.state_to_score, SharedTranspositionTable):
+                cache = self.state_to_score  # sent to the workers by name
+            else:
+                cache = getattr(self.state_to_score, 'slots', None)
+            args = (self._owner, self.symmetry, cache,
+                    self.state_to_repr is not None)
+            if stats is None:
+                scores = map_children(self.workers, _worker_minimax, state,
+                                      moves, *args)
+            else:
+                scores = map_children(self.workers, collected, state, moves,
+                                      _worker_minimax, *args)
+        for i, m in enumerate(moves):
+            start = time.perf_counter()
+            if self.workers and stats is not None:
+                stats.merge(scores[i][1], m)
+                score = - scores[i][0]
+            elif self.workers:
+                score = - scores[i]
+            elif state.IN_PLACE:  # search by moving state itself in place
+                state.push(m)
+                try:
+                    score = - minimax_move(state, self.state_to_score,
+                                           self.state_to_repr, self.symmetry,
+                                           stats, 1)
+                finally:  # a cancelled search leaves state as it was
+                    state.pop()
+            else:
+                s = state.apply_trusted_move(m)
+                score = - minimax_move(s, self.state_to_score,
+                                       self.state_to_repr, self.symmetry,
+                                       stats, 1)
+            if stats is not None and not self.workers:
+                stats.root_moves.append((m, time.perf_counter() - start))
             if score not in score_to_move: #add the score as a new key to dictionary, if it's not already
                 score_to_move[score] = []
             score_to_move[score].append(m) #add move as a value to the score
-            if repr(s) not in self.state_to_score: #add the gamestate to the dictionary, if it's not already
-                self.state_to_score[repr(s)] = score            
         best_score = max(score_to_move.keys()) #find the best score
-        if repr(state) not in self.state_to_score: #add the gamestate to the dictionary, if it's not already
-            self.state_to_score[repr(state)] = best_score
+        _store(state, _key(state, self.symmetry), best_score, len(moves),
+               self.state_to_score, self.state_to_repr, self.symmetry)
+        self.finish_stats(stats)
         return random.choice(score_to_move[best_score])
 
 
-def minimax_move(state, state_to_score):
-    ''' (GameState, dic of str to int) -> int
+def minimax_move(state, state_to_score, state_to_repr=None, symmetry=False,
+                 stats=None, ply=0):
+    ''' (GameState, dict of int to float or TranspositionTable,
+         dict of int to str, bool, SearchStats, int) -> float
         
     Return a score(0, 1, -1) of each move with respect to next_player. 
-    If state is in state_to_score, return the score directly.
+    If state is in state_to_score, return the score directly. If
+    state_to_repr is not None, use it to check that a cached score
+    really belongs to state, where it has the repr stored: a shared
+    state_to_score also holds scores stored by other processes. If
+    symmetry, states are keyed by their canonical form. Add what is
+    searched to stats, if given, with state ply moves below the root.
     '''
 
-    if repr(state) in state_to_score: #check if the gamestate has already been visited
-        return state_to_score[repr(state)]
+    if stats is not None:
+        stats.node(ply)
+    key = _key(state, symmetry)
+    score = state_to_score.get(key)
+    if stats is not None:
+        if score is None:
+            stats.tt_misses += 1
+        else:
+            stats.tt_hits += 1
+    if score is not None: #check if the gamestate has already been visited
+        if (state_to_repr is not None and key in state_to_repr and
+                state_to_repr[key] != _repr(state, symmetry)):
+            raise HashCollisionError('{} and {} share key {}'.format(
+                state_to_repr[key], _repr(state, symmetry), key))
+        return score
     else: 
         if state.over: #if the game's over, return the score
-            score = state.outcome()
-            if repr(state) not in state_to_score: #add the gamestate to the dictionary, if it's not already
-                state_to_score[repr(state)] = score      
-            return score
+            if stats is not None:
+                stats.terminal_leaves += 1
+            scores = [state.outcome()]
+        elif state.IN_PLACE: #recurse on state itself, undoing each move
+            scores = []
+            for x in state.possible_next_moves():
+                state.push(x)
+                try:
+                    scores.append(-minimax_move(state, state_to_score,
+                                                state_to_repr, symmetry,
+                                                stats, ply + 1))
+                finally:
+                    state.pop()
         else: #recursively run this function until the game is over
-            score = max([-minimax_move(state.apply_move(x), state_to_score) 
-                        for x in state.possible_next_moves()])
-            if repr(state) not in state_to_score: #add the gamestate to the dictionary, if it's not already
-                state_to_score[repr(state)] = score  
-            return score
-            
+            scores = [-minimax_move(state.apply_trusted_move(x),
+                                    state_to_score, state_to_repr, symmetry,
+                                    stats, ply + 1)
+                      for x in state.possible_next_moves()]
+        score = max(scores)
+        depth = 0 if state.over else len(scores)
+        _store(state, key, score, depth, state_to_score, state_to_repr,
+               symmetry)
+        return score
+
+
+# (owner, game, symmetry, cache, verify) -> (state_to_score, state_to_repr)
+# kept by each worker process across searches, for the latest owner only
+_WORKER_CACHES = {}
+
+
+def _worker_minimax(state, owner, symmetry, cache, verify, stats=None,
+                    ply=1):
+    ''' (GameState, int, bool, int or SharedTranspositionTable, bool,
+         SearchStats, int) -> float
+
+    Return minimax_move(state, ..., stats, ply) using cache if it is a
+    SharedTranspositionTable, and otherwise a cache kept by this process for
+    searches by the strategy numbered owner of the same game with the same
+    options: a TranspositionTable of cache entries, or a dict if cache is
+    None. Searches for any other strategy or options drop it.
+
+    >>> from subtract_square_state import SubtractSquareState
+    >>> s = SubtractSquareState('p1', current_total=20)
+    >>> _worker_minimax(s, -1, False, None, False)
+    -1.0
+    >>> _worker_minimax(s, -2, False, 64, False)
+    -1.0
+    >>> len(_WORKER_CACHES)
+    1
+    '''
+    options = (owner, type(state).__name__, symmetry,
+               getattr(cache, 'name', cache), verify)
+    if options not in _WORKER_CACHES:
+        # caches of other strategies, or of closed shared tables, are not
+        # kept, so that they do not pile up in a long-lived worker
+        _WORKER_CACHES.clear()
+        if isinstance(cache, SharedTranspositionTable):
+            state_to_score = cache
+        elif cache is None:
+            state_to_score = {}
+        else:
+            state_to_score = TranspositionTable(cache)
+        _WORKER_CACHES[options] = (state_to_score, {} if verify else None)
+    state_to_score, state_to_repr = _WORKER_CACHES[options]
+    return minimax_move(state, state_to_score, state_to_repr, symmetry,
+                        stats, ply)
+
+
+def _key(state, symmetry):
+    ''' (GameState, bool) -> int
+
+    Return the cache key of state, canonical if symmetry.
+    '''
+    return state.canonical_key() if symmetry else state.hash_key()
+
+
+def _repr(state, symmetry):
+    ''' (GameState, bool) -> str
+
+    Return the repr of state, or of its canonical form if symmetry.
+    '''
+    return repr(state.canonical()) if symmetry else repr(state)
+
+
+def _store(state, key, score, depth, state_to_score, state_to_repr,
+           symmetry=False):
+    ''' (GameState, int, float, int,
+         dict of int to float or TranspositionTable, dict of int to str,
+         bool) -> NoneType
+
+    Add score for state under key, if state is not already stored, and
+    record repr(state) in state_to_repr unless it is None. depth, the
+    number of moves searched from state, ranks entries of a
+    TranspositionTable for replacement. Once state_to_repr holds twice as
+    many reprs as a TranspositionTable has slots, the reprs of the entries
+    it has evicted are dropped, so that it stays within that bound.
+
+    >>> from subtract_square_state import SubtractSquareState
+    >>> table, reprs = TranspositionTable(max_entries=4), {}
+    >>> for total in range(1, 100):
+    ...     s = SubtractSquareState('p1', current_total=total)
+    ...     _store(s, s.hash_key(), 0.0, 0, table, reprs)
+    >>> len(reprs) <= 2 * table.slots
+    True
+    >>> len([key for key in reprs if key in table]) == len(table)
+    True
+    '''
+    if isinstance(state_to_score, TranspositionTable):
+        state_to_score.store(key, score, depth)
+    elif key not in state_to_score: #add the gamestate to the dictionary, if it's not already
+        state_to_score[key] = score
+    if state_to_repr is not None:
+        state_to_repr[key] = _repr(state, symmetry)
+        if (isinstance(state_to_score, TranspositionTable) and
+                len(state_to_repr) > 2 * state_to_score.slots):
+            for evicted in [k for k in state_to_repr
+                            if k not in state_to_score]:
+                del state_to_repr[evicted]
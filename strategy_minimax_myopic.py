@@ -1,49 +1,221 @@
 import random
+import time
 from strategy import Strategy
+from parallel_search import map_children
+from search_stats import collected
+
+
+class SearchTimeout(Exception):
+    ''' Raised when a search passes its deadline. '''
 
 
 class StrategyMinimaxMyopic(Strategy):
     ''' Interface to suggest a strong move.
 
+    depth: int         -- how many moves deep to search, counting the move
+                          suggested, when there is no time_limit
+    time_limit: float  -- seconds each suggest_move may spend deepening
+                          its search, or None to search to depth
+    workers: int       -- number of processes to search the moves from the
+                          root in, or None to search them one after
+                          another here
     '''
-    
-    def __init__(self, interactive=False):
-        '''(StrategyMinimaxMyopic, bool) -> NoneType
+
+    def __init__(self, interactive=False, time_limit=None, depth=4,
+                 workers=None):
+        '''(StrategyMinimaxMyopic, bool, float, int, int) -> NoneType
 
         Create new StrategyMinimaxMyopic (self), prompt user if interactive.
-        '''    
+        Search depth moves deep, or, if time_limit is given, search 1, 2, 3,
+        ... moves deep until time_limit seconds have passed. If workers is
+        given, search each move from the root in a shared pool of that many
+        processes.
+        '''
+        self.depth = depth
+        self.time_limit = time_limit
+        self.workers = workers
 
     def suggest_move(self, state):
         '''(StrategyMinimaxMyopic, GameState) -> Move
 
         Return a strong move from those available for state.
 
+        If self.time_limit is set, return a best move of the deepest search
+        that finished in time. A search of depth 1 always finishes. Each
+        search starts with the best moves of the one before it, and
+        deepening stops once a search never had to stop at rough_outcome.
+
         Overrides Strategy.suggest_move
+
+        >>> from subtract_square_state import SubtractSquareState
+        >>> s = SubtractSquareState('p1', current_total=8)
+        >>> m = StrategyMinimaxMyopic(time_limit=0.05)
+        >>> m.collect_stats = True
+        >>> m.suggest_move(s)
+        SubtractSquareMove(1)
+        >>> [depth for depth, seconds in m.last_stats.iterations][:3]
+        [1, 2, 3]
         '''
-        
-        score_to_move = {}
-        n = 3 #how deep we decide to go
-        for m in state.possible_next_moves():
-            s = state.apply_move(m)
-            score = - minimax_move(s, n)
-            if score not in score_to_move: #add score as a key in dictionary, if it's not already
-                score_to_move[score] = []
-            score_to_move[score].append(m) #add move as a value to score
-        best_score = max(score_to_move.keys())
-        return random.choice(score_to_move[best_score])
-
-
-def minimax_move(state, n):
-    ''' (StrategyMinimaxMyopic, int) -> int
-        
+
+        stats = self.start_stats()
+        move = state.solved_move()
+        if move is not None:  # no need to search a solved state
+            self.finish_stats(stats)
+            return move
+
+        moves = state.possible_next_moves()
+        if self.time_limit is None:
+            best = _best_moves(state, moves, self.depth, workers=self.workers,
+                               stats=stats)
+            self.finish_stats(stats)
+            return random.choice(best)
+        deadline = time.perf_counter() + self.time_limit
+        n = 1
+        while True:
+            horizon = []
+            start = time.perf_counter()
+            try:
+                if n == 1:
+                    best = _best_moves(state, moves, n, None, horizon,
+                                       stats=stats)
+                else:
+                    best = _best_moves(state, moves, n, deadline, horizon,
+                                       self.workers, stats)
+            except SearchTimeout:
+                break
+            if stats is not None:
+                stats.iterations.append((n, time.perf_counter() - start))
+            if not horizon:  # every line was searched to the end
+                self.finish_stats(stats)
+                return random.choice(best)
+            moves = best + [m for m in moves if m not in best]
+            previous_best = best
+            n += 1
+        self.finish_stats(stats)
+        return random.choice(previous_best)
+
+
+def _best_moves(state, moves, n, deadline=None, horizon=None, workers=None,
+                stats=None):
+    ''' (GameState, list of Move, int, float, list, int, SearchStats)
+        -> list of Move
+
+    Return those of moves, the legal moves from state, that score best in
+    a search n moves deep, counting the move itself. If workers is given,
+    search each move in a shared pool of that many processes. Add what is
+    searched to stats, if given.
+    '''
+    score_to_move = {}
+    if workers:
+        if deadline is None:
+            time_left = None
+        else:
+            time_left = deadline - time.perf_counter()
+        args = (n - 1, time_left, horizon is not None)
+        if stats is None:
+            results = map_children(workers, _worker_minimax, state, moves,
+                                   *args)
+        else:
+            results = []
+            for m, (result, child) in zip(moves, map_children(
+                    workers, collected, state, moves, _worker_minimax, *args)):
+                stats.merge(child, m)
+                results.append(result)
+    for i, m in enumerate(moves):
+        start = time.perf_counter()
+        if workers:
+            score = - results[i][0]
+            if results[i][1] and horizon is not None and not horizon:
+                horizon.append(True)
+        elif state.IN_PLACE:  # search by moving state itself in place
+            state.push(m)
+            try:
+                score = - minimax_move(state, n - 1, deadline, horizon, stats,
+                                       1)
+            finally:
+                state.pop()
+        else:
+            s = state.apply_trusted_move(m)
+            score = - minimax_move(s, n - 1, deadline, horizon, stats, 1)
+        if stats is not None and not workers:
+            stats.root_moves.append((m, time.perf_counter() - start))
+        if score not in score_to_move: #add score as a key in dictionary, if it's not already
+            score_to_move[score] = []
+        score_to_move[score].append(m) #add move as a value to score
+    best_score = max(score_to_move.keys())
+    return score_to_move[best_score]
+
+
+def _worker_minimax(state, n, time_left, watch_horizon, stats=None, ply=1):
+    ''' (GameState, int, float, bool, SearchStats, int) -> (float, bool)
+
+    Return minimax_move(state, n, ..., stats, ply) run in a worker
+    process, giving up with SearchTimeout after time_left seconds unless it
+    is None, and whether a score was estimated by rough_outcome if
+    watch_horizon.
+    '''
+    if time_left is None:
+        deadline = None
+    else:
+        deadline = time.perf_counter() + time_left
+    horizon = [] if watch_horizon else None
+    return (minimax_move(state, n, deadline, horizon, stats, ply),
+            bool(horizon))
+
+
+def minimax_move(state, n, deadline=None, horizon=None, stats=None, ply=0):
+    ''' (GameState, int, float, list, SearchStats, int) -> int
+
     Return a score(0, 1, -1) of each move with respect to next_player.
+
+    Raise SearchTimeout once time.perf_counter() passes deadline, if
+    given. Make horizon, if given, non-empty whenever a score is estimated
+    by rough_outcome. Add what is searched to stats, if given, with state
+    ply moves below the root.
     '''
 
-    if n <= 0: #when n == 0, the desired depth has been reached 
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SearchTimeout()
+    if stats is not None:
+        stats.node(ply)
+    if n <= 0: #when n == 0, the desired depth has been reached
+        if horizon is not None and not horizon and not state.over:
+            horizon.append(True)
+        if stats is not None and state.over:
+            stats.terminal_leaves += 1
+        elif stats is not None:
+            stats.heuristic_leaves += 1
         return state.rough_outcome()
     elif state.over:
+        if stats is not None:
+            stats.terminal_leaves += 1
         return state.outcome()
+    elif n == 1 and (horizon is None or horizon):
+        # every child is a leaf, so estimate them all in one call
+        outcomes = state.next_rough_outcomes()
+        if stats is not None:
+            over = state.next_over_count()
+            stats.nodes += len(outcomes)
+            stats.terminal_leaves += over
+            stats.heuristic_leaves += len(outcomes) - over
+            stats.max_depth = max(stats.max_depth, ply + 1)
+        return max([-score for score in outcomes])
+    elif state.IN_PLACE:
+        scores = []
+        for x in state.possible_next_moves():
+            state.push(x)
+            try:
+                scores.append(-minimax_move(state, n - 1, deadline, horizon,
+                                            stats, ply + 1))
+            finally:
+                state.pop()
+        return max(scores)
     else:
-        return max([-minimax_move(state.apply_move(x), n - 1) #n-1, so that this function is called recursively n times
+        return max([-minimax_move(state.apply_trusted_move(x), n - 1, deadline,
+                                  horizon, stats, ply + 1) #n-1, so that this function is called recursively n times
                     for x in state.possible_next_moves()])
-                    
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
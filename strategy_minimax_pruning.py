@@ -1,11 +1,118 @@
+'''Minimax with alpha-beta pruning, in negamax form.
+
+The pruned search returns the same scores as strategy_minimax while
+visiting fewer states.  Count the states each search moves into:
+
+>>> from subtract_square_state import SubtractSquareState
+>>> from tippy_square_state import TippyGameState
+>>> from tippy_move import TippyMove
+>>> import strategy_minimax
+>>> def counting(cls):
+...     class Counting(cls):
+...         pushes = 0
+...         def push(self, move):
+...             Counting.pushes += 1
+...             cls.push(self, move)
+...     return Counting
+>>> def nodes(search, state):
+...     type(state).pushes = 0
+...     score = search(state)
+...     return score, type(state).pushes
+>>> s = counting(SubtractSquareState)('p1', current_total=30)
+>>> pruned, full = nodes(minimax_move, s), nodes(strategy_minimax.minimax_move, s)
+>>> pruned[0] == full[0], pruned[1] < full[1]
+(True, True)
+>>> s = counting(TippyGameState)('p1', board_size=3)
+>>> s.push(TippyMove((0, 0)))
+>>> pruned, full = nodes(minimax_move, s), nodes(strategy_minimax.minimax_move, s)
+>>> pruned[0] == full[0], pruned[1] < full[1]
+(True, True)
+
+Scores are WIN, LOSE or DRAW, one apart, so a window of width one, a null
+window, can only tell whether a score is above or below a bound.
+Principal variation search (driver 'pvs') searches the first move of each
+state with the full window and proves the others worse with null windows,
+searching again only those that are not. MTD(f) (driver 'mtdf') only ever
+searches the root with null windows, narrowing the bounds on its score
+until they meet, and relies on the transposition table to make each
+search after the first cheap. Both find the same scores:
+
+>>> s = TippyGameState('p1', board_size=3)
+>>> s.push(TippyMove((1, 1)))
+>>> table = TranspositionTable(1024)
+>>> score, move = mtdf(lambda alpha, beta: (
+...     minimax_move(s, alpha, beta, table), None))
+>>> minimax_move(s) == minimax_move(s, pvs=True) == score
+True
+'''
 import random
+import time
 from strategy import Strategy
+from game_state import GameState
+from transposition_table import TranspositionTable
+from shared_transposition_table import SharedTranspositionTable
+from move_ordering import MoveOrdering
+from parallel_search import map_children
+from search_stats import collected
 
 
 class StrategyMinimaxPruning(Strategy):
     ''' Interface to suggest a strong move.
 
+    table: TranspositionTable  -- scores, bounds and best moves of the
+                                  states searched, shared with the workers
+                                  if it is a SharedTranspositionTable, or
+                                  None
+    ordering: MoveOrdering     -- orders the moves at each state, or None
+                                  to search them in the order given
+    workers: int               -- number of processes to search the moves
+                                  from the root in, or None to search them
+                                  one after another here
+    driver: str                -- how the root is searched: 'alphabeta',
+                                  'pvs' or 'mtdf'
+    DRIVERS: tuple of str      -- class constant, the drivers there are
     '''
+    DRIVERS = ('alphabeta', 'pvs', 'mtdf')
+
+    def __init__(self, interactive=False, ordering=None, max_entries=None,
+                 max_bytes=None, workers=None, shared=False,
+                 driver='alphabeta'):
+        '''(StrategyMinimaxPruning, bool, MoveOrdering, int, int, int, bool,
+            str) -> NoneType
+
+        Create new StrategyMinimaxPruning (self), prompt user if
+        interactive. Order moves with ordering, if given. If max_entries or
+        max_bytes is given, keep a TranspositionTable of that size across
+        searches. If workers is given, search the first move from the root
+        here, to get a window, and the others in a shared pool of that many
+        processes, each with its own table and ordering. If shared, keep a
+        SharedTranspositionTable instead, which the workers all use, so that
+        each can reuse the states the others have searched. Search by
+        plain alpha-beta, principal variation search or MTD(f), as driver
+        says; MTD(f) keeps a TranspositionTable of the default size if no
+        size is given.
+
+        >>> from tippy_square_state import TippyGameState
+        >>> s = TippyGameState('p1', board_size=3)
+        >>> p = StrategyMinimaxPruning(workers=2, shared=True, max_entries=64)
+        >>> p.suggest_move(s) in s.possible_next_moves()
+        True
+        >>> p.table.hits > 0
+        True
+        '''
+        if driver not in StrategyMinimaxPruning.DRIVERS:
+            raise ValueError('driver must be one of {}'.format(
+                StrategyMinimaxPruning.DRIVERS))
+        self.workers = workers
+        self.ordering = ordering
+        self.driver = driver
+        if shared:
+            self.table = SharedTranspositionTable(max_entries, max_bytes)
+        elif (max_entries is None and max_bytes is None and
+              driver != 'mtdf'):
+            self.table = None
+        else:
+            self.table = TranspositionTable(max_entries, max_bytes)
 
     def suggest_move(self, state):
         '''(Minimax, GameState) -> Move
@@ -13,37 +120,254 @@ class StrategyMinimaxPruning(Strategy):
         Return a strong move from those available for state.
 
         Overrides Strategy.suggest_move
+
+        >>> from subtract_square_state import SubtractSquareState
+        >>> s = SubtractSquareState('p1', current_total=8)
+        >>> p = StrategyMinimaxPruning(max_entries=64)
+        >>> p.collect_stats = True
+        >>> p.suggest_move(s)
+        SubtractSquareMove(1)
+        >>> p.last_stats.cutoffs > 0, p.last_stats.tt_hits > 0
+        (True, True)
+        >>> StrategyMinimaxPruning(driver='mtdf').suggest_move(s)
+        SubtractSquareMove(1)
         '''
-        
-        score_to_move = {}
-        for m in state.possible_next_moves():
-            s = state.apply_move(m)
-            score = - minimax_move(s)
-            if score not in score_to_move:
-                score_to_move[score] = []
-            score_to_move[score].append(m)
-        best_score = max(score_to_move.keys())
-        return random.choice(score_to_move[best_score])
-
-
-def minimax_move(state, min = -1, max = 1):
-    ''' (Move, GameState) -> int
-        
-    Return a score(0, 1, -1) of each move with respect to next_player.
+
+        stats = self.start_stats()
+        move = state.solved_move()
+        if move is not None:  # no need to search a solved state
+            self.finish_stats(stats)
+            return move
+
+        # shuffled, so that the first best move found is a random one of
+        # the best moves
+        moves = state.possible_next_moves()
+        random.shuffle(moves)
+        if self.ordering is not None:
+            self.ordering.new_search()
+            moves = self.ordering.order(state, moves, 0,
+                                        _tt_move(state, self.table))
+        if self.driver == 'mtdf':
+            entry = None if self.table is None else self.table.probe(
+                state.hash_key())
+            guess = GameState.DRAW if entry is None else entry[0]
+            best_move = mtdf(lambda alpha, beta: self._search_root(
+                state, moves, alpha, beta, stats), guess)[1]
+        else:
+            best_move = self._search_root(state, moves, GameState.LOSE,
+                                          GameState.WIN, stats)[1]
+        self.finish_stats(stats)
+        return best_move
+
+    def _search_root(self, state, moves, alpha, beta, stats):
+        '''(StrategyMinimaxPruning, GameState, list of Move, float, float,
+            SearchStats) -> (float, Move)
+
+        Return the score of state, or a bound on it as minimax_move does,
+        and the best of moves, its legal moves in the order to search them.
+        '''
+        pvs = self.driver == 'pvs'
+        best_score, best_move = None, None
+        for i, m in enumerate(moves):
+            if self.workers and i == 1:
+                # the rest are searched at once, with the first move's window
+                if isinstance(self.table, SharedTranspositionTable):
+                    table = self.table  # sent to the workers by name
+                else:
+                    table = getattr(self.table, 'slots', None)
+                args = (-beta, -alpha, table, self.ordering is not None,
+                        pvs)
+                if stats is None:
+                    scores = map_children(self.workers, _worker_minimax,
+                                          state, moves[1:], *args)
+                else:
+                    scores = []
+                    for move, (score, child) in zip(moves[1:], map_children(
+                            self.workers, collected, state, moves[1:],
+                            _worker_minimax, *args)):
+                        stats.merge(child, move)
+                        scores.append(score)
+            start = time.perf_counter()
+            if self.workers and i > 0:
+                score = - scores[i - 1]
+            else:
+                child = state.next_state(m)
+                try:
+                    if pvs and i > 0:
+                        score = - minimax_move(child, -alpha - 1, -alpha,
+                                               self.table, self.ordering, 1,
+                                               stats, True)
+                        if alpha < score < beta:
+                            score = - minimax_move(child, -beta, -score,
+                                                   self.table, self.ordering,
+                                                   1, stats, True)
+                    else:
+                        score = - minimax_move(child, -beta, -alpha,
+                                               self.table, self.ordering, 1,
+                                               stats, pvs)
+                finally:  # a cancelled search leaves state as it was
+                    state.undo_next_state()
+                if stats is not None:
+                    stats.root_moves.append((m, time.perf_counter() - start))
+            if best_score is None or score > best_score:
+                best_score, best_move = score, m
+                alpha = max(alpha, score)
+                if alpha >= beta:
+                    if stats is not None:
+                        stats.cutoffs += 1
+                    break
+        return best_score, best_move
+
+
+def minimax_move(state, alpha=GameState.LOSE, beta=GameState.WIN,
+                 table=None, ordering=None, ply=0, stats=None, pvs=False):
+    ''' (GameState, float, float, TranspositionTable, MoveOrdering, int,
+         SearchStats, bool) -> float
+
+    Return a score(0, 1, -1) of state with respect to next_player, if it
+    lies strictly between alpha and beta. Otherwise return a bound on the
+    score: at most alpha if the score is at most alpha, and at least beta
+    if it is at least beta.
+
+    If table is given, use the scores and bounds stored in it and store
+    what is found. If ordering is given, use it to order the moves of
+    state, which is ply moves below the root. Add what is searched to
+    stats, if given. If pvs, search by principal variation search.
     '''
+    if stats is not None:
+        stats.node(ply)
     if state.over:
+        if stats is not None:
+            stats.terminal_leaves += 1
         return state.outcome()
-    elif state.next_player == 'p1':
-        v = min
-        if v != 1:
-            for x in state.possible_next_moves():
-                if minimax_move(state.apply_move(x), min = v) > v:
-                    v = minimax_move(state.apply_move(x))
-            return v
-    else:
-        v = max
-        if v != -1:
-            for x in state.possible_next_moves():
-                if minimax_move(state.apply_move(x), max = v) < v:
-                    v = minimax_move(state.apply_move(x))
-            return v
+    tt_move = -1
+    if table is not None:
+        key = state.hash_key()
+        entry = table.probe(key)
+        if stats is not None:
+            if entry is None:
+                stats.tt_misses += 1
+            else:
+                stats.tt_hits += 1
+        if entry is not None:
+            score, depth, flag, tt_move = entry
+            if flag == TranspositionTable.EXACT:
+                return score
+            elif flag == TranspositionTable.LOWER and score > alpha:
+                alpha = score
+            elif flag == TranspositionTable.UPPER and score < beta:
+                beta = score
+            if alpha >= beta:
+                return score
+    moves = state.possible_next_moves()
+    if ordering is not None:
+        moves = ordering.order(state, moves, ply, tt_move)
+    window_alpha = alpha
+    best, best_move = None, None
+    for i, x in enumerate(moves):
+        child = state.next_state(x)
+        try:
+            if pvs and i > 0:
+                # a null window, to prove x no better than the best so far
+                score = -minimax_move(child, -alpha - 1, -alpha, table,
+                                      ordering, ply + 1, stats, True)
+                if alpha < score < beta:  # it is better; by how much?
+                    score = -minimax_move(child, -beta, -score, table,
+                                          ordering, ply + 1, stats, True)
+            else:
+                score = -minimax_move(child, -beta, -alpha, table, ordering,
+                                      ply + 1, stats, pvs)
+        finally:
+            state.undo_next_state()
+        if best is None or score > best:
+            best, best_move = score, x
+            if best > alpha:
+                alpha = best
+                if alpha >= beta:  # the opponent will avoid this state
+                    if stats is not None:
+                        stats.cutoffs += 1
+                    if ordering is not None:
+                        ordering.cutoff(state, x, ply, len(moves))
+                    break
+    if table is not None:
+        if best <= window_alpha:
+            flag = TranspositionTable.UPPER
+        elif best >= beta:
+            flag = TranspositionTable.LOWER
+        else:
+            flag = TranspositionTable.EXACT
+        table.store(key, best, len(moves), flag, state.move_index(best_move))
+    return best
+
+
+def mtdf(search, guess=GameState.DRAW):
+    ''' (function, float) -> (float, object)
+
+    Return the score found by MTD(f), starting from guess, and what search
+    returned with it. search(alpha, beta) must return a score, or a bound
+    on it, as minimax_move does, and anything else, such as the move that
+    scored it, which is kept from the latest search that found a lower
+    bound.
+
+    >>> mtdf(lambda alpha, beta: (0.0, (alpha, beta)), 1.0)
+    (0.0, (-1.0, 0.0))
+    '''
+    lower, upper = GameState.LOSE, GameState.WIN
+    score, found = guess, None
+    while lower < upper:
+        beta = score + 1 if score == lower else score
+        score, result = search(beta - 1, beta)
+        if score >= beta:
+            lower, found = score, result
+        else:
+            upper = score
+            if found is None:
+                found = result
+    return score, found
+
+
+# (game, table, ordered) -> (table, ordering) kept by each worker process
+# across searches
+_WORKER_TABLES = {}
+
+
+def _worker_minimax(state, alpha, beta, table, ordered, pvs=False,
+                    stats=None, ply=1):
+    ''' (GameState, float, float, int or SharedTranspositionTable, bool,
+         bool, SearchStats, int) -> float
+
+    Return minimax_move(state, alpha, beta, ..., ply, stats, pvs) using table
+    if it is a SharedTranspositionTable, and otherwise a TranspositionTable
+    of table entries, unless table is None, and a MoveOrdering if ordered,
+    both kept by this process for searches of the same game.
+    '''
+    options = (type(state).__name__, getattr(table, 'name', table), ordered)
+    if isinstance(table, SharedTranspositionTable):
+        # attaching to table closed this process's other shared tables
+        for key in [key for key in _WORKER_TABLES
+                    if isinstance(key[1], str) and key[1] != table.name]:
+            del _WORKER_TABLES[key]
+    if options not in _WORKER_TABLES:
+        if isinstance(table, int):
+            table = TranspositionTable(table)
+        _WORKER_TABLES[options] = (table, MoveOrdering() if ordered else None)
+    table, ordering = _WORKER_TABLES[options]
+    if ordering is not None:
+        ordering.new_search()
+    return minimax_move(state, alpha, beta, table, ordering, ply, stats, pvs)
+
+
+def _tt_move(state, table):
+    ''' (GameState, TranspositionTable) -> int
+
+    Return the index of the best move stored in table for state, or -1.
+    '''
+    if table is None:
+        return -1
+    entry = table.probe(state.hash_key())
+    return -1 if entry is None else entry[3]
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
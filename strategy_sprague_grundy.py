@@ -0,0 +1,96 @@
+from math import isqrt
+import numpy as np
+from strategy import Strategy
+from subtract_square_move import SubtractSquarePilesMove
+from subtract_square_table import grundy
+
+
+class StrategySpragueGrundy(Strategy):
+    ''' Interface to suggest a best move of Subtract Square on several piles
+    by the Sprague-Grundy theorem, with no search.
+
+    The value of the piles together is the XOR of the Grundy values of the
+    piles, and the player to move wins iff it is not 0. A winning move
+    takes one pile to a total whose value is the value of that pile XOR
+    the value of them all, leaving the opponent a value of 0.
+
+    values: numpy array of int  -- Grundy value of each pile smaller than
+                                   its length, grown as larger piles appear
+    '''
+
+    def __init__(self, interactive=False, limit=1000):
+        '''(StrategySpragueGrundy, bool, int) -> NoneType
+
+        Create new StrategySpragueGrundy (self), prompt user if
+        interactive, with the values of piles up to limit.
+        '''
+        self.values = grundy(limit)
+
+    def suggest_move(self, state):
+        '''(StrategySpragueGrundy, SubtractSquarePilesState)
+            -> SubtractSquarePilesMove
+
+        Return a winning move for state, if there is one, and otherwise
+        removing 1 from its largest pile. It takes a pass over the piles
+        and, for one of them, a look at the value after each square. Each
+        value looked up counts as a node of its stats.
+
+        Overrides Strategy.suggest_move
+
+        >>> from subtract_square_state import SubtractSquarePilesState
+        >>> from strategy_minimax_pruning import minimax_move
+        >>> s = SubtractSquarePilesState('p1', piles=[3, 5, 7])
+        >>> m = StrategySpragueGrundy().suggest_move(s)
+        >>> m, minimax_move(s), minimax_move(s.apply_move(m))
+        (SubtractSquarePilesMove(0, 1), 1.0, -1.0)
+        >>> s = SubtractSquarePilesState('p1', piles=[2000, 5000, 3])
+        >>> g = StrategySpragueGrundy()
+        >>> m = g.suggest_move(s)
+        >>> m
+        SubtractSquarePilesMove(1, 784)
+        >>> a, b, c = s.apply_move(m).piles
+        >>> int(g.values[a] ^ g.values[b] ^ g.values[c])
+        0
+        >>> g.collect_stats = True
+        >>> g.suggest_move(SubtractSquarePilesState('p1', piles=[3, 5, 7]))
+        SubtractSquarePilesMove(0, 1)
+        >>> g.last_stats.nodes, g.last_stats.max_depth, g.last_stats.tt_hits
+        (4, 1, 0)
+        '''
+
+        stats = self.start_stats()
+        piles = state.piles
+        top = max(piles)
+        if top >= len(self.values):
+            self.values = grundy(max(top, 2 * (len(self.values) - 1)))
+        values = self.values
+        total, looked_up = 0, len(piles)
+        for pile in piles:
+            total ^= int(values[pile])
+        move = None
+        if total:
+            for i, pile in enumerate(piles):
+                # a smaller value is always a square away, a larger one
+                # may not be
+                target = int(values[pile]) ^ total
+                if target < values[pile]:
+                    roots = np.arange(1, isqrt(pile) + 1, dtype=np.int64)
+                    looked_up += roots.size
+                    found = np.flatnonzero(
+                        values[pile - roots * roots] == target)
+                    if found.size:
+                        move = SubtractSquarePilesMove(
+                            i, int(roots[found[0]]) ** 2)
+                        break
+        if move is None:  # no move wins
+            move = SubtractSquarePilesMove(piles.index(top), 1)
+        if stats is not None:  # each value looked up stands for a state
+            stats.nodes += looked_up
+            stats.max_depth = 1 if looked_up > len(piles) else 0
+        self.finish_stats(stats)
+        return move
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
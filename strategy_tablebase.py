@@ -0,0 +1,61 @@
+from strategy import Strategy
+from strategy_minimax_pruning import StrategyMinimaxPruning
+import tippy_tablebase
+
+
+class StrategyTablebase(Strategy):
+    ''' Interface to suggest a best move of Tippy from a tablebase.
+
+    tablebase: Tablebase  -- every reachable position of one board size
+    fallback: Strategy    -- suggests moves for states not in tablebase
+    '''
+
+    def __init__(self, interactive=False, path=None, board_size=3,
+                 fallback=None):
+        '''(StrategyTablebase, bool, str, int, Strategy) -> NoneType
+
+        Create new StrategyTablebase (self), prompt user if interactive.
+        Look moves up in the tablebase written at path, or, if path is not
+        given, in one generated now for board_size. Ask fallback, by
+        default a StrategyMinimaxPruning, about states not in it.
+        '''
+        if path is None:
+            self.tablebase = tippy_tablebase.generate(board_size)
+        else:
+            self.tablebase = tippy_tablebase.load(path)
+        if fallback is None:
+            fallback = StrategyMinimaxPruning()
+        self.fallback = fallback
+
+    def suggest_move(self, state):
+        '''(StrategyTablebase, GameState) -> Move
+
+        Return a best move for state from self.tablebase.
+
+        Overrides Strategy.suggest_move
+
+        >>> from tippy_square_state import TippyGameState
+        >>> from tippy_move import TippyMove
+        >>> s = TippyGameState('p1', board_size=3)
+        >>> StrategyTablebase().suggest_move(s)
+        TippyMove((1, 1))
+        '''
+
+        stats = self.start_stats()
+        move = self.tablebase.best_move(state)
+        if move is None:  # another board size, or a board with other marks
+            self.fallback.collect_stats = stats is not None
+            self.fallback.stats_factory = self.stats_factory
+            move = self.fallback.suggest_move(state)
+            if stats is not None:
+                stats.tt_misses += 1
+                stats.merge(self.fallback.last_stats)
+        elif stats is not None:
+            stats.tt_hits += 1
+        self.finish_stats(stats)
+        return move
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
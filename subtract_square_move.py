@@ -1,20 +1,64 @@
 from move import Move
 
+# amount -> the one SubtractSquareMove removing it
+_MOVES = {}
+# (pile, amount) -> the one SubtractSquarePilesMove removing it
+_PILES_MOVES = {}
+
 
 class SubtractSquareMove(Move):
     ''' A move in the game of Subtract Square.
 
     amount: int -- amount to subtract from current value.
+
+    SubtractSquareMoves are immutable and there is only one for each
+    amount, so that states share them rather than make new ones, and they
+    can be kept in sets and as keys of dicts.
     '''
+    __slots__ = ('amount',)
 
-    def __init__(self, amount):
-        ''' (SubtractSquareMove, int) -> NoneType
+    def __new__(cls, amount):
+        ''' (type, int) -> SubtractSquareMove
 
-        Initialize a new SubtractSquareMove for removing amount from value.
+        Return the SubtractSquareMove for removing amount from value, made
+        the first time it is asked for.
 
         Assume: amount is a positive integer square.
+
+        >>> SubtractSquareMove(4) is SubtractSquareMove(4)
+        True
+        >>> SubtractSquareMove(4).amount = 9
+        Traceback (most recent call last):
+        ...
+        AttributeError: SubtractSquareMove is immutable
+        '''
+        move = _MOVES.get(amount)
+        if move is None:
+            move = Move.__new__(cls)
+            object.__setattr__(move, 'amount', amount)
+            # added only once made, and only if no other thread was first
+            move = _MOVES.setdefault(amount, move)
+        return move
+
+    def __setattr__(self, name, value):
+        ''' (SubtractSquareMove, str, object) -> NoneType
+
+        Refuse to change self, which other states may share.
+        '''
+        raise AttributeError('SubtractSquareMove is immutable')
+
+    def __reduce__(self):
+        ''' (SubtractSquareMove) -> (type, tuple)
+
+        Return how to make self again, so that a copy, or a move sent to
+        another process, is the SubtractSquareMove of its amount there.
+
+        >>> import pickle
+        >>> m = SubtractSquareMove(9)
+        >>> pickle.loads(pickle.dumps(m)) is m
+        True
         '''
-        self.amount = amount
+        return SubtractSquareMove, (self.amount,)
 
     def __repr__(self):
         ''' (SubtractSquareMove) -> str
@@ -49,8 +93,112 @@ class SubtractSquareMove(Move):
         >>> print(m1 == m2)
         False
         '''
-        return (isinstance(other, SubtractSquareMove) and 
-                self.amount == other.amount)
+        return self is other or (isinstance(other, SubtractSquareMove) and
+                                 self.amount == other.amount)
+
+    def __hash__(self):
+        ''' (SubtractSquareMove) -> int
+
+        Return a hash of self, equal for equal SubtractSquareMoves.
+
+        >>> len({SubtractSquareMove(1), SubtractSquareMove(1)})
+        1
+        '''
+        return hash(self.amount)
+
+
+
+class SubtractSquarePilesMove(Move):
+    ''' A move in the game of Subtract Square played on several piles.
+
+    pile: int    -- index of the pile to subtract from.
+    amount: int  -- amount to subtract from that pile.
+
+    Like SubtractSquareMoves, SubtractSquarePilesMoves are immutable and
+    there is only one for each pile and amount.
+    '''
+    __slots__ = ('pile', 'amount')
+
+    def __new__(cls, pile, amount):
+        ''' (type, int, int) -> SubtractSquarePilesMove
+
+        Return the SubtractSquarePilesMove for removing amount from pile,
+        made the first time it is asked for.
+
+        Assume: pile is a pile index and amount is a positive integer
+        square.
+
+        >>> SubtractSquarePilesMove(1, 4) is SubtractSquarePilesMove(1, 4)
+        True
+        '''
+        move = _PILES_MOVES.get((pile, amount))
+        if move is None:
+            move = Move.__new__(cls)
+            object.__setattr__(move, 'pile', pile)
+            object.__setattr__(move, 'amount', amount)
+            move = _PILES_MOVES.setdefault((pile, amount), move)
+        return move
+
+    def __setattr__(self, name, value):
+        ''' (SubtractSquarePilesMove, str, object) -> NoneType
+
+        Refuse to change self, which other states may share.
+        '''
+        raise AttributeError('SubtractSquarePilesMove is immutable')
+
+    def __reduce__(self):
+        ''' (SubtractSquarePilesMove) -> (type, tuple)
+
+        Return how to make self again, as the SubtractSquarePilesMove of
+        its pile and amount.
+
+        >>> import pickle
+        >>> m = SubtractSquarePilesMove(0, 9)
+        >>> pickle.loads(pickle.dumps(m)) is m
+        True
+        '''
+        return SubtractSquarePilesMove, (self.pile, self.amount)
+
+    def __repr__(self):
+        ''' (SubtractSquarePilesMove) -> str
+
+        Return a string representation of this SubtractSquarePilesMove.
+
+        >>> SubtractSquarePilesMove(2, 4)
+        SubtractSquarePilesMove(2, 4)
+        '''
+        return 'SubtractSquarePilesMove({}, {})'.format(self.pile,
+                                                        self.amount)
+
+    def __str__(self):
+        ''' (SubtractSquarePilesMove) -> str
+
+        Return a string representation of this SubtractSquarePilesMove
+        that is suitable for users to read.
+
+        >>> print(SubtractSquarePilesMove(2, 4))
+        Remove 4 from pile 2
+        '''
+        return 'Remove {} from pile {}'.format(self.amount, self.pile)
+
+    def __eq__(self, other):
+        ''' (SubtractSquarePilesMove, SubtractSquarePilesMove) -> bool
+
+        Return True iff this SubtractSquarePilesMove is the same as other.
+
+        >>> SubtractSquarePilesMove(0, 4) == SubtractSquarePilesMove(1, 4)
+        False
+        '''
+        return self is other or (
+            isinstance(other, SubtractSquarePilesMove) and
+            self.pile == other.pile and self.amount == other.amount)
+
+    def __hash__(self):
+        ''' (SubtractSquarePilesMove) -> int
+
+        Return a hash of self, equal for equal SubtractSquarePilesMoves.
+        '''
+        return hash((self.pile, self.amount))
 
 
 if __name__ == '__main__':
@@ -1,14 +1,24 @@
 from game_state import GameState
-from subtract_square_move import SubtractSquareMove
-from math import sqrt
+from subtract_square_move import SubtractSquareMove, SubtractSquarePilesMove
+from math import isqrt
 from random import randint
 
+# SubtractSquareMove(i * i) at index i - 1, extended as larger totals appear
+_SQUARE_MOVES = []
+# keeps hash keys of pile states within the 64 bits TranspositionTable holds
+_KEY_MASK = (1 << 63) - 1
+
 
 class SubtractSquareState(GameState):
     ''' The state of a Subtract Square game
 
     current_total: int   --- total to be subtracted from
+    TABLE: SubtractSquareTable  --- class attribute, a table of solved
+                                    totals for solved_move and rough_outcome
+                                    to look up, or None
     '''
+    IN_PLACE = True
+    TABLE = None
 
     def __init__(self, p, interactive=False, current_total=0):
         ''' (SubtractSquareState, int, str) -> NoneType
@@ -23,10 +33,26 @@ class SubtractSquareState(GameState):
             current_total = randint(1, int(input('Maximum starting value? ')))
         GameState.__init__(self, p)
         self.current_total = current_total
+        self.over = current_total == 0
+        self._history = []  # amounts pushed and not yet popped
         self.instructions = ('On your turn, you may remove any number so long '
                              'as it is (a) a perfect square, and '
                              '(b) no more than the current number.')
 
+    def __reduce__(self):
+        ''' (SubtractSquareState) -> tuple
+
+        Return how to pickle self: by next player and total only, leaving
+        out the instructions and any pushes that pop could undo.
+
+        >>> import pickle
+        >>> s = SubtractSquareState('p2', current_total=17)
+        >>> pickle.loads(pickle.dumps(s)) == s
+        True
+        '''
+        return (SubtractSquareState,
+                (self.next_player, False, self.current_total))
+
     def __repr__(self):
         ''' (SubtractSquareState) -> str
 
@@ -76,18 +102,119 @@ class SubtractSquareState(GameState):
         >>> print(s2)
         Current total: 8; next player: p2
         '''
-        if move in self.possible_next_moves():
-            new_total = self.current_total - move.amount
-            return SubtractSquareState(self.opponent(),
-                                       current_total=new_total)
+        if self.is_legal(move):
+            return self.apply_trusted_move(move)
         else:
             return None
 
+    def apply_trusted_move(self, move):
+        ''' (SubtractSquareState, SubtractSquareMove) -> SubtractSquareState
+
+        Return the new SubtractSquareState reached by applying move to self,
+        without checking that move is legal.
+
+        Overrides GameState.apply_trusted_move
+
+        >>> s = SubtractSquareState('p1', current_total=17)
+        >>> print(s.apply_trusted_move(SubtractSquareMove(16)))
+        Current total: 1; next player: p2
+        '''
+        new_total = self.current_total - move.amount
+        return SubtractSquareState(self.opponent(), current_total=new_total)
+
+    def is_legal(self, move):
+        ''' (SubtractSquareState, SubtractSquareMove) -> bool
+
+        Return whether move is legal from self: whether it removes a
+        positive square no greater than current_total.
+
+        Overrides GameState.is_legal
+
+        >>> s = SubtractSquareState('p1', current_total=17)
+        >>> s.is_legal(SubtractSquareMove(16))
+        True
+        >>> s.is_legal(SubtractSquareMove(25)), s.is_legal(SubtractSquareMove(8))
+        (False, False)
+        '''
+        return (isinstance(move, SubtractSquareMove) and
+                move.amount <= self.current_total and
+                is_pos_square(move.amount))
+
+    def push(self, move):
+        ''' (SubtractSquareState, SubtractSquareMove) -> NoneType
+
+        Apply move to self in place, so that it can be undone by pop.
+
+        >>> s = SubtractSquareState('p1', current_total=17)
+        >>> s.push(SubtractSquareMove(16))
+        >>> print(s)
+        Current total: 1; next player: p2
+        >>> s.pop()
+        >>> print(s)
+        Current total: 17; next player: p1
+        '''
+        self._history.append(move.amount)
+        self.current_total -= move.amount
+        self.next_player = self.opponent()
+        self.over = self.current_total == 0
+
+    def pop(self):
+        ''' (SubtractSquareState) -> NoneType
+
+        Undo the most recent push on self.
+        '''
+        self.current_total += self._history.pop()
+        self.next_player = self.opponent()
+        self.over = self.current_total == 0
+
+    def hash_key(self):
+        ''' (SubtractSquareState) -> int
+
+        Return an integer key for self, distinct for every state.
+
+        >>> SubtractSquareState('p1', current_total=17).hash_key()
+        34
+        >>> SubtractSquareState('p2', current_total=17).hash_key()
+        35
+        '''
+        return 2 * self.current_total + (self.next_player == 'p2')
+
+    def move_index(self, move):
+        ''' (SubtractSquareState, SubtractSquareMove) -> int
+
+        Return the amount move removes.
+
+        >>> SubtractSquareState('p1', current_total=17).move_index(SubtractSquareMove(9))
+        9
+        '''
+        return move.amount
+
+    def solved_move(self):
+        ''' (SubtractSquareState) -> SubtractSquareMove
+
+        Return a best move from self looked up in TABLE, or None if there
+        is no TABLE, it does not reach current_total, or the game is over.
+
+        Overrides GameState.solved_move
+
+        >>> import os, tempfile, subtract_square_table
+        >>> path = os.path.join(tempfile.mkdtemp(), 'table.npy')
+        >>> SubtractSquareState.TABLE = subtract_square_table.build(100, path)
+        >>> SubtractSquareState('p1', current_total=9).solved_move()
+        SubtractSquareMove(4)
+        >>> SubtractSquareState.TABLE = None
+        '''
+        table = self.TABLE
+        if table is None or self.over or self.current_total > table.limit:
+            return None
+        return table.best_move(self.current_total)
+
     def rough_outcome(self):
         '''(SubtractSquareState) -> float
 
         Return an estimate in interval [LOSE, WIN] of best outcome next_player
-        can guarantee from state self.
+        can guarantee from state self, which is exact if TABLE reaches
+        current_total.
 
         >>> SubtractSquareState('p1', current_total=0).rough_outcome()
         -1.0
@@ -98,11 +225,15 @@ class SubtractSquareState(GameState):
         >>> SubtractSquareState('p1', current_total=16).rough_outcome()
         1.0
         '''
-        if is_pos_square(self.current_total):
+        table = self.TABLE
+        if table is not None and self.current_total <= table.limit:
+            if table.is_win(self.current_total):
+                return SubtractSquareState.WIN
+            return SubtractSquareState.LOSE
+        elif is_pos_square(self.current_total):
             return SubtractSquareState.WIN
-        elif all([is_pos_square(self.current_total - n**2)
-                  for n in range(1, self.current_total + 1)
-                  if n**2 < self.current_total]):
+        elif all(is_pos_square(self.current_total - n * n)
+                 for n in range(1, isqrt(max(self.current_total - 1, 0)) + 1)):
             return SubtractSquareState.LOSE
         else:
             return SubtractSquareState.DRAW
@@ -143,9 +274,322 @@ class SubtractSquareState(GameState):
         >>> len(L1) == len(L2) and all([m in L2 for m in L1])
         True
         '''
-        return [SubtractSquareMove(i**2)
-                for i in range(self.current_total, 0, -1)
-                if i*i <= self.current_total]
+        return square_moves(self.current_total)[::-1]
+
+
+class SubtractSquarePilesState(GameState):
+    ''' The state of a Subtract Square game played on several piles
+
+    On each turn a player removes a square from any one pile, and whoever
+    empties the last pile wins. Each pile is a game of Subtract Square, so
+    the game is their sum, and the Sprague-Grundy values of the piles tell
+    who wins it without a search.
+
+    piles: list of int   --- totals to be subtracted from
+    '''
+    IN_PLACE = True
+
+    def __init__(self, p, interactive=False, piles=(0,)):
+        ''' (SubtractSquarePilesState, str, bool, list of int) -> NoneType
+
+        Initialize SubtractSquarePilesState self with piles the numbers to
+        decrease to 0.
+
+        Assume:  every pile is a non-negative int
+                        p in {'p1', 'p2'}
+        '''
+        if interactive:
+            most = int(input('Maximum starting value? '))
+            piles = [randint(1, most)
+                     for i in range(int(input('How many piles? ')))]
+        GameState.__init__(self, p)
+        self.piles = list(piles)
+        self.over = not any(self.piles)
+        self._history = []  # moves pushed and not yet popped
+        self.instructions = ('On your turn, you may remove from any one pile '
+                             'any number so long as it is (a) a perfect '
+                             'square, and (b) no more than that pile.')
+
+    def __reduce__(self):
+        ''' (SubtractSquarePilesState) -> tuple
+
+        Return how to pickle self: by next player and piles only.
+
+        >>> import pickle
+        >>> s = SubtractSquarePilesState('p2', piles=[3, 17])
+        >>> pickle.loads(pickle.dumps(s)) == s
+        True
+        '''
+        return (SubtractSquarePilesState,
+                (self.next_player, False, list(self.piles)))
+
+    def __repr__(self):
+        ''' (SubtractSquarePilesState) -> str
+
+        Return a string representation of SubtractSquarePilesState self
+        that evaluates to an equivalent SubtractSquarePilesState.
+
+        >>> SubtractSquarePilesState('p1', piles=[3, 17])
+        SubtractSquarePilesState('p1', False, [3, 17])
+        '''
+        return 'SubtractSquarePilesState({}, False, {})'.format(
+            repr(self.next_player), repr(self.piles))
+
+    def __str__(self):
+        ''' (SubtractSquarePilesState) -> str
+
+        Return a convenient string representation of
+        SubtractSquarePilesState self.
+
+        >>> print(SubtractSquarePilesState('p1', piles=[3, 17]))
+        Piles: 3, 17; next player: p1
+        '''
+        return 'Piles: {}; next player: {}'.format(
+            ', '.join([str(pile) for pile in self.piles]), self.next_player)
+
+    def __eq__(self, other):
+        ''' (SubtractSquarePilesState, SubtractSquarePilesState) -> bool
+
+        Return True iff this SubtractSquarePilesState is equivalent to
+        other.
+
+        >>> s1 = SubtractSquarePilesState('p1', piles=[3, 17])
+        >>> s1 == SubtractSquarePilesState('p1', piles=[3, 17])
+        True
+        >>> s1 == SubtractSquarePilesState('p1', piles=[17, 3])
+        False
+        '''
+        return (isinstance(other, SubtractSquarePilesState) and
+                self.piles == other.piles and
+                self.next_player == other.next_player)
+
+    def apply_move(self, move):
+        ''' (SubtractSquarePilesState, SubtractSquarePilesMove)
+            -> SubtractSquarePilesState
+
+        Return the new SubtractSquarePilesState reached by applying move to
+        self, or None if move is illegal.
+
+        >>> s = SubtractSquarePilesState('p1', piles=[3, 17])
+        >>> print(s.apply_move(SubtractSquarePilesMove(1, 9)))
+        Piles: 3, 8; next player: p2
+        >>> s.apply_move(SubtractSquarePilesMove(0, 4)) is None
+        True
+        '''
+        if self.is_legal(move):
+            return self.apply_trusted_move(move)
+        else:
+            return None
+
+    def apply_trusted_move(self, move):
+        ''' (SubtractSquarePilesState, SubtractSquarePilesMove)
+            -> SubtractSquarePilesState
+
+        Return the new SubtractSquarePilesState reached by applying move to
+        self, without checking that move is legal.
+
+        Overrides GameState.apply_trusted_move
+        '''
+        piles = list(self.piles)
+        piles[move.pile] -= move.amount
+        return SubtractSquarePilesState(self.opponent(), piles=piles)
+
+    def is_legal(self, move):
+        ''' (SubtractSquarePilesState, SubtractSquarePilesMove) -> bool
+
+        Return whether move removes a positive square from a pile of self
+        no smaller than it.
+
+        Overrides GameState.is_legal
+
+        >>> s = SubtractSquarePilesState('p1', piles=[3, 17])
+        >>> s.is_legal(SubtractSquarePilesMove(1, 16))
+        True
+        >>> s.is_legal(SubtractSquarePilesMove(0, 4)), s.is_legal(SubtractSquarePilesMove(2, 1))
+        (False, False)
+        '''
+        return (isinstance(move, SubtractSquarePilesMove) and
+                0 <= move.pile < len(self.piles) and
+                move.amount <= self.piles[move.pile] and
+                is_pos_square(move.amount))
+
+    def push(self, move):
+        ''' (SubtractSquarePilesState, SubtractSquarePilesMove) -> NoneType
+
+        Apply move to self in place, so that it can be undone by pop.
+
+        >>> s = SubtractSquarePilesState('p1', piles=[3, 17])
+        >>> s.push(SubtractSquarePilesMove(0, 1))
+        >>> print(s)
+        Piles: 2, 17; next player: p2
+        >>> s.pop()
+        >>> print(s)
+        Piles: 3, 17; next player: p1
+        '''
+        self._history.append(move)
+        self.piles[move.pile] -= move.amount
+        self.next_player = self.opponent()
+        self.over = not any(self.piles)
+
+    def pop(self):
+        ''' (SubtractSquarePilesState) -> NoneType
+
+        Undo the most recent push on self.
+        '''
+        move = self._history.pop()
+        self.piles[move.pile] += move.amount
+        self.next_player = self.opponent()
+        self.over = False
+
+    def hash_key(self):
+        ''' (SubtractSquarePilesState) -> int
+
+        Return an integer key for self, for use in transposition tables.
+
+        >>> s = SubtractSquarePilesState('p1', piles=[3, 17])
+        >>> s.hash_key() == SubtractSquarePilesState('p1', piles=[3, 17]).hash_key()
+        True
+        >>> s.hash_key() == SubtractSquarePilesState('p2', piles=[3, 17]).hash_key()
+        False
+        '''
+        return ((hash(tuple(self.piles)) & _KEY_MASK) << 1 |
+                (self.next_player == 'p2'))
+
+    def move_index(self, move):
+        ''' (SubtractSquarePilesState, SubtractSquarePilesMove) -> int
+
+        Return amount * len(piles) + pile of move.
+
+        >>> SubtractSquarePilesState('p1', piles=[3, 17]).move_index(SubtractSquarePilesMove(1, 9))
+        19
+        '''
+        return move.amount * len(self.piles) + move.pile
+
+    def canonical(self):
+        ''' (SubtractSquarePilesState) -> SubtractSquarePilesState
+
+        Return self with its piles in order, largest first, the same game
+        with the piles renumbered.
+
+        Overrides GameState.canonical
+
+        >>> SubtractSquarePilesState('p1', piles=[3, 17, 5]).canonical()
+        SubtractSquarePilesState('p1', False, [17, 5, 3])
+        '''
+        return SubtractSquarePilesState(
+            self.next_player, piles=sorted(self.piles, reverse=True))
+
+    def distinct_next_moves(self):
+        ''' (SubtractSquarePilesState) -> list of SubtractSquarePilesMove
+
+        Return the legal moves from self, leaving out those from a pile as
+        large as an earlier one.
+
+        Overrides GameState.distinct_next_moves
+
+        >>> SubtractSquarePilesState('p1', piles=[4, 4]).distinct_next_moves()
+        [SubtractSquarePilesMove(0, 4), SubtractSquarePilesMove(0, 1)]
+        '''
+        moves, seen = [], set()
+        for i, pile in enumerate(self.piles):
+            if pile not in seen:
+                seen.add(pile)
+                moves.extend(pile_moves(i, pile))
+        return moves
+
+    def rough_outcome(self):
+        '''(SubtractSquarePilesState) -> float
+
+        Return an estimate in interval [LOSE, WIN] of best outcome
+        next_player can guarantee from state self: a win if one pile is
+        left and it is a square, a loss if the game is over, and otherwise
+        a draw.
+
+        >>> SubtractSquarePilesState('p1', piles=[0, 16]).rough_outcome()
+        1.0
+        >>> SubtractSquarePilesState('p1', piles=[0, 0]).rough_outcome()
+        -1.0
+        >>> SubtractSquarePilesState('p1', piles=[1, 16]).rough_outcome()
+        0.0
+        '''
+        left = [pile for pile in self.piles if pile]
+        if not left:
+            return SubtractSquarePilesState.LOSE
+        elif len(left) == 1 and is_pos_square(left[0]):
+            return SubtractSquarePilesState.WIN
+        else:
+            return SubtractSquarePilesState.DRAW
+
+    def get_move(self):
+        '''(SubtractSquarePilesState) -> SubtractSquarePilesMove
+
+        Prompt user and return move.
+        '''
+        pile = int(input('From which pile (0 to {})? '.format(
+            len(self.piles) - 1)))
+        return SubtractSquarePilesMove(pile, int(input('Remove how much? ')))
+
+    def winner(self, player):
+        ''' (SubtractSquarePilesState, str) -> bool
+
+        Return True iff the game is over and player has won, by emptying
+        the last pile.
+
+        >>> s = SubtractSquarePilesState('p1', piles=[1, 0])
+        >>> s.apply_move(SubtractSquarePilesMove(0, 1)).winner('p1')
+        True
+
+        Preconditions: player is either 'p1' or 'p2'
+        '''
+        return self.over and self.opponent() == player
+
+    def possible_next_moves(self):
+        ''' (SubtractSquarePilesState) -> list of SubtractSquarePilesMove
+
+        Return a (possibly empty) list of moves that are legal
+        from the present state, pile by pile, largest amount first.
+
+        >>> SubtractSquarePilesState('p1', piles=[1, 4]).possible_next_moves()
+        [SubtractSquarePilesMove(0, 1), SubtractSquarePilesMove(1, 4), SubtractSquarePilesMove(1, 1)]
+        '''
+        moves = []
+        for i, pile in enumerate(self.piles):
+            moves.extend(pile_moves(i, pile))
+        return moves
+
+
+def pile_moves(pile, total):
+    '''(int, int) -> list of SubtractSquarePilesMove
+
+    Return the moves removing a square up to total from pile number pile,
+    largest first.
+
+    >>> pile_moves(1, 5)
+    [SubtractSquarePilesMove(1, 4), SubtractSquarePilesMove(1, 1)]
+    '''
+    return [SubtractSquarePilesMove(pile, m.amount)
+            for m in reversed(square_moves(total))]
+
+
+def square_moves(total):
+    '''(int) -> list of SubtractSquareMove
+
+    Return the moves removing 1, 4, 9, ... up to total, in that order.
+    The moves themselves are made once and shared by every state.
+
+    >>> square_moves(10)
+    [SubtractSquareMove(1), SubtractSquareMove(4), SubtractSquareMove(9)]
+    '''
+    global _SQUARE_MOVES
+    n = isqrt(total)
+    moves = _SQUARE_MOVES
+    if len(moves) < n:
+        # grown in a copy and published at once, so that a thread reading
+        # the list while another grows it never sees it half built
+        moves = moves + [SubtractSquareMove(i * i)
+                         for i in range(len(moves) + 1, n + 1)]
+        _SQUARE_MOVES = moves
+    return moves[:n]
 
 
 def is_pos_square(n):
@@ -158,8 +602,7 @@ def is_pos_square(n):
     >>> is_pos_square(9)
     True
     '''
-    from math import sqrt
-    return round(sqrt(n))**2 == n and n > 0
+    return n > 0 and isqrt(n)**2 == n
 
 
 if __name__ == '__main__':
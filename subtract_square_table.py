@@ -0,0 +1,175 @@
+'''Win/lose tables for Subtract Square, solved once and kept on disk.
+
+A total is a win for the player to move iff some square leads to a total
+that is a loss. Rather than recursing from each total, solve() sieves
+upwards: the smallest total not yet known to be a win is a loss, and every
+total a square above it is then a win. Each loss marks all of its square
+offsets at once, with one NumPy assignment.
+
+>>> table = build(100, os.path.join(tempfile.mkdtemp(), 'table.npy'))
+>>> [t for t in range(40) if not table.is_win(t)]
+[0, 2, 5, 7, 10, 12, 15, 17, 20, 22, 34, 39]
+'''
+import os
+import tempfile
+from math import isqrt
+import numpy as np
+from subtract_square_move import SubtractSquareMove
+
+DEFAULT_PATH = os.path.join(tempfile.gettempdir(), 'subtract_square_table.npy')
+# a word of grundy with all 64 values marked
+_FULL = (1 << 64) - 1
+
+
+class SubtractSquareTable:
+    ''' Which totals of Subtract Square are wins for the player to move,
+    one bit per total, read from a file mapped into memory.
+
+    path: str   -- file the table was read from
+    limit: int  -- largest total in the table
+    bits: numpy array of uint8  -- the bits, total t being bit t % 8 of
+                                   byte t // 8
+    '''
+
+    def __init__(self, path):
+        ''' (SubtractSquareTable, str) -> NoneType
+
+        Open the table saved at path by build.
+        '''
+        self.path = path
+        self.bits = np.load(path, mmap_mode='r')
+        self.limit = 8 * len(self.bits) - 1
+
+    def is_win(self, total):
+        ''' (SubtractSquareTable, int) -> bool
+
+        Return whether the player to move wins from total.
+
+        Assume: 0 <= total <= self.limit
+        '''
+        return bool(self.bits[total >> 3] >> (total & 7) & 1)
+
+    def best_move(self, total):
+        ''' (SubtractSquareTable, int) -> SubtractSquareMove
+
+        Return the smallest move from total that leaves the opponent a
+        loss, or, if there is none, removing 1.
+
+        Assume: 0 < total <= self.limit
+
+        >>> table = build(100, os.path.join(tempfile.mkdtemp(), 't.npy'))
+        >>> table.best_move(8), table.best_move(10)
+        (SubtractSquareMove(1), SubtractSquareMove(1))
+        >>> table.best_move(9)
+        SubtractSquareMove(4)
+        '''
+        if self.is_win(total):
+            top = isqrt(total)
+            for start in range(1, top + 1, 256):  # 256 squares at a time
+                roots = np.arange(start, min(start + 256, top + 1),
+                                  dtype=np.int64)
+                after = total - roots * roots
+                loses = self.bits[after >> 3] >> (after & 7) & 1 == 0
+                if loses.any():
+                    return SubtractSquareMove(int(roots[loses.argmax()]) ** 2)
+        return SubtractSquareMove(1)
+
+
+def solve(n):
+    ''' (int) -> numpy array of bool
+
+    Return an array whose item t is whether the player to move wins from
+    total t, for 0 <= t <= n.
+
+    >>> solve(10).nonzero()[0].tolist()
+    [1, 3, 4, 6, 8, 9]
+    '''
+    win = np.zeros(n + 1, dtype=bool)
+    squares = np.arange(1, isqrt(n) + 1, dtype=np.int64) ** 2
+    total = 0
+    while True:
+        # the next loss is the next total not marked as a win
+        while True:
+            chunk = win[total:total + 4096]
+            if chunk.size == 0:
+                return win
+            i = int(chunk.argmin())
+            if not chunk[i]:
+                total += i
+                break
+            total += chunk.size
+        reach = np.searchsorted(squares, n - total, side='right')
+        win[total + squares[:reach]] = True
+        total += 1
+
+
+def grundy(n):
+    ''' (int) -> numpy array of int
+
+    Return an array whose item t is the Sprague-Grundy value of a pile of
+    t in Subtract Square, for 0 <= t <= n: the least value not taken by a
+    pile a square smaller. A pile is a loss for the player to move iff its
+    value is 0.
+
+    Values are found in order, as in solve, but each total marks the value
+    it takes at every total a square above it at once, as a bit in words
+    of 64, so that the value of a total is its first bit not yet marked.
+
+    >>> grundy(12).tolist()
+    [0, 1, 0, 1, 2, 0, 1, 0, 1, 2, 0, 1, 0]
+    >>> bool(((grundy(1000) == 0) == ~solve(1000)).all())
+    True
+    '''
+    values = np.zeros(n + 1, dtype=np.int32)
+    squares = np.arange(1, isqrt(n) + 1, dtype=np.int64) ** 2
+    # bit b of marked[w, t] is whether a pile a square below t has value
+    # 64 * w + b
+    marked = np.zeros((1, n + 1), dtype=np.uint64)
+    for total in range(n + 1):
+        w = 0
+        while True:
+            if w == len(marked):  # every value so far is marked
+                marked = np.vstack([marked, np.zeros(n + 1, np.uint64)])
+            word = int(marked[w, total])
+            if word != _FULL:
+                break
+            w += 1
+        free = ~word & (word + 1)  # the lowest bit not set
+        values[total] = 64 * w + free.bit_length() - 1
+        reach = np.searchsorted(squares, n - total, side='right')
+        marked[w, total + squares[:reach]] |= np.uint64(free)
+    return values
+
+
+def build(n, path=DEFAULT_PATH):
+    ''' (int, str) -> SubtractSquareTable
+
+    Solve every total up to at least n, save the table at path and return
+    it. The file is replaced in one step, so that processes reading the old
+    table are not disturbed.
+    '''
+    n = (n // 8 + 1) * 8 - 1  # fill the last byte
+    bits = np.packbits(solve(n), bitorder='little')
+    partial = '{}.{}.tmp'.format(path, os.getpid())
+    with open(partial, 'wb') as f:
+        np.save(f, bits)
+    os.replace(partial, path)
+    return SubtractSquareTable(path)
+
+
+def load(n, path=DEFAULT_PATH):
+    ''' (int, str) -> SubtractSquareTable
+
+    Return the table saved at path if it reaches total n, and otherwise
+    build one that does.
+    '''
+    if os.path.exists(path):
+        table = SubtractSquareTable(path)
+        if table.limit >= n:
+            return table
+    return build(n, path)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,154 @@
+'''TippyGameState.rough_outcome for many boards at once, with NumPy.
+
+rough_outcome looks at each interior cell holding a stone, and at each
+pair of neighbouring cells that would make a z/s tetrimino with it and one
+more cell, which it can complete at one of two ends. For the player to
+move, each empty end counts once in p_score. For the opponent, a pair
+counts once in o_score only if both ends are empty. THREATS lists those
+pairs and ends as offsets from the interior cell. OPPONENT_THREATS is the
+list rough_outcome checks for the opponent, and it differs in one pair.
+threat_masks turns both lists into bitboards once per board size. Ends
+off the board never count.
+
+rough_outcomes matches rough_outcome on random boards of every size, with
+stray marks that are neither stones nor empty:
+
+>>> from random import Random
+>>> from tippy_square_state import TippyGameState
+>>> r = Random(16)
+>>> states = []
+>>> for i in range(400):
+...     n = r.randint(3, 8)
+...     marks = ['X ', 'O ', '_ ', '_ ', '? '][:r.choice([4, 5])]
+...     board = [[r.choice(marks) for y in range(n)] for x in range(n)]
+...     states.append(TippyGameState(r.choice(['p1', 'p2']), current_board=board))
+>>> all(rough_outcomes(board_array(s))[0] == s.rough_outcome()
+...     for s in states)
+True
+'''
+import numpy as np
+
+# (stone, stone, end, end) as (row, column) offsets from an interior cell
+# holding a stone, in the order rough_outcome checks them
+THREATS = (((1, 0), (0, 1), (-1, 1), (1, -1)),
+           ((1, 0), (0, -1), (-1, -1), (1, 1)),
+           ((1, 0), (1, -1), (2, -1), (0, 1)),
+           ((1, 0), (1, 1), (2, 1), (0, -1)),
+           ((-1, 0), (0, 1), (-1, -1), (1, 1)),
+           ((-1, 0), (0, -1), (1, -1), (-1, 1)),
+           ((-1, 0), (-1, 1), (0, -1), (-2, 1)),
+           ((-1, 0), (-1, -1), (-2, -1), (0, 1)),
+           ((0, 1), (-1, 0), (-1, -1), (1, 1)),
+           ((0, 1), (-1, 1), (-1, 2), (1, 0)),
+           ((0, 1), (1, 0), (1, -1), (-1, 1)),
+           ((0, 1), (1, 1), (-1, 0), (1, 2)),
+           ((0, -1), (-1, 0), (-1, 1), (1, -1)),
+           ((0, -1), (-1, -1), (-1, -2), (1, 0)),
+           ((0, -1), (1, 0), (-1, -1), (1, 1)),
+           ((0, -1), (1, -1), (-1, 0), (1, -2)))
+# rough_outcome pairs the last ends with the cell at (1, 1), not (1, -1),
+# when counting the opponent's threats
+OPPONENT_THREATS = THREATS[:-1] + (((0, -1), (1, 1), (-1, 0), (1, -2)),)
+
+# (board_size, threats) -> (stones, first ends, second ends) as arrays of
+# bitboards
+_THREAT_MASKS = {}
+
+
+def threat_masks(board_size, threats=THREATS):
+    ''' (int, tuple) -> (array of uint64, array of uint64, array of uint64)
+
+    Return, for every interior cell of a board of board_size x board_size
+    and every threat of threats, the bitboard of its three stones and of
+    each of its two ends, 0 for an end off the board. Computed once per
+    board size, which is at most 8.
+
+    >>> [len(masks) for masks in threat_masks(4)]
+    [64, 64, 64]
+    '''
+    if (board_size, threats) not in _THREAT_MASKS:
+        def bit(x, y):
+            if 0 <= x < board_size and 0 <= y < board_size:
+                return 1 << (x * board_size + y)
+            return 0
+        stones, firsts, seconds = [], [], []
+        for x in range(1, board_size - 1):
+            for y in range(1, board_size - 1):
+                for a, b, first, second in threats:
+                    stones.append(bit(x, y) | bit(x + a[0], y + a[1]) |
+                                  bit(x + b[0], y + b[1]))
+                    firsts.append(bit(x + first[0], y + first[1]))
+                    seconds.append(bit(x + second[0], y + second[1]))
+        _THREAT_MASKS[board_size, threats] = (
+            np.array(stones, np.uint64), np.array(firsts, np.uint64),
+            np.array(seconds, np.uint64))
+    return _THREAT_MASKS[board_size, threats]
+
+
+def board_array(*states):
+    ''' (TippyGameState, ...) -> numpy array of int8
+
+    Return the boards of states, all of one size, as a (B, N, N) array seen
+    from each next player: 1 for their stones, -1 for the opponent's, 0
+    for an empty cell and 2 for any other mark.
+
+    >>> from tippy_square_state import TippyGameState
+    >>> board_array(TippyGameState('p2', current_board=[['X ', '_ '], ['O ', '_ ']]))
+    array([[[-1,  0],
+            [ 1,  0]]], dtype=int8)
+    '''
+    n = states[0].board_size
+    cells = np.arange(n * n, dtype=np.uint64)
+    boards = np.full((len(states), n * n), 2, np.int8)
+    for i, state in enumerate(states):
+        if state.next_player == 'p1':
+            mover, other = state.x_mask, state.o_mask
+        else:
+            mover, other = state.o_mask, state.x_mask
+        for mask, value in ((mover, 1), (other, -1), (state.empty_mask, 0)):
+            boards[i][np.uint64(mask) >> cells & np.uint64(1) == 1] = value
+    return boards.reshape(len(states), n, n)
+
+
+def rough_outcomes(boards):
+    ''' (numpy array) -> numpy array of float
+
+    Return TippyGameState.rough_outcome of each of boards, a (B, N, N)
+    array as made by board_array, with N at most 8.
+
+    >>> rough_outcomes(np.array([[[1, 1, 0], [1, 0, 0], [0, 0, 0]]]))
+    array([0.])
+    '''
+    b, n = boards.shape[:2]
+    weights = np.uint64(1) << np.arange(n * n, dtype=np.uint64)
+    flat = boards.reshape(b, n * n)
+    return outcomes_of_masks(np.where(flat == 1, weights, 0).sum(1),
+                             np.where(flat == -1, weights, 0).sum(1),
+                             np.where(flat == 0, weights, 0).sum(1), n)
+
+
+def outcomes_of_masks(mover, other, empty, board_size):
+    ''' (array of uint64, array of uint64, array of uint64, int)
+        -> numpy array of float
+
+    Return rough_outcome of each board given by the bitboards of the
+    stones of the player to move, of the opponent and of the empty cells.
+    '''
+    mover = np.asarray(mover, np.uint64)[:, None]
+    other = np.asarray(other, np.uint64)[:, None]
+    empty = np.asarray(empty, np.uint64)[:, None]
+    stones, firsts, seconds = threat_masks(board_size)
+    ours = mover & stones == stones
+    p_score = ((ours & (firsts != 0) & (empty & firsts == firsts)).sum(1) +
+               (ours & (seconds != 0) & (empty & seconds == seconds)).sum(1))
+    stones, firsts, seconds = threat_masks(board_size, OPPONENT_THREATS)
+    ends = firsts | seconds
+    theirs = other & stones == stones
+    o_score = (theirs & (firsts != 0) & (seconds != 0) &
+               (empty & ends == ends)).sum(1)
+    return np.sign(p_score - o_score).astype(float)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
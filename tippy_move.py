@@ -1,22 +1,66 @@
 from move import Move
 
+# coord -> the one TippyMove placing there
+_MOVES = {}
+
 
 class TippyMove(Move):
     ''' A move in the game of Tippy.
 
     coord: tuple -- position to place players move.
+
+    TippyMoves are immutable and there is only one for each coord, so that
+    states share them rather than make new ones, and they can be kept in
+    sets and as keys of dicts.
     '''
+    __slots__ = ('coord',)
 
-    def __init__(self, coord):
-        ''' (TippyMove, tuple) -> NoneType
+    def __new__(cls, coord):
+        ''' (type, tuple) -> TippyMove
 
-        Initialize a new TippyMove adding players move.
+        Return the TippyMove adding players move at coord, made the first
+        time it is asked for.
 
         Assume: position is valid, and two numbers. First number is row
         position, second number is column position, with the first row and 
         first column being 0.
+
+        >>> TippyMove((1, 2)) is TippyMove((1, 2))
+        True
+        >>> TippyMove((1, 2)).coord = (0, 0)
+        Traceback (most recent call last):
+        ...
+        AttributeError: TippyMove is immutable
+        '''
+        if isinstance(coord, list):
+            coord = tuple(coord)
+        move = _MOVES.get(coord)
+        if move is None:
+            move = Move.__new__(cls)
+            object.__setattr__(move, 'coord', coord)
+            # added only once made, and only if no other thread was first
+            move = _MOVES.setdefault(coord, move)
+        return move
+
+    def __setattr__(self, name, value):
+        ''' (TippyMove, str, object) -> NoneType
+
+        Refuse to change self, which other states may share.
+        '''
+        raise AttributeError('TippyMove is immutable')
+
+    def __reduce__(self):
+        ''' (TippyMove) -> (type, tuple)
+
+        Return how to make self again, so that a copy, or a move sent to
+        another process, is the TippyMove of its coord there.
+
+        >>> import copy, pickle
+        >>> m = TippyMove((1, 2))
+        >>> copy.deepcopy(m) is pickle.loads(pickle.dumps(m)) is m
+        True
         '''
-        self.coord = coord
+        return TippyMove, (self.coord,)
 
     def __repr__(self):
         ''' (TippyMove) -> str
@@ -52,8 +96,18 @@ class TippyMove(Move):
         >>> print(m1 == m2)
         False
         '''
-        return (isinstance(other, TippyMove) and 
-                self.coord == other.coord)
+        return self is other or (isinstance(other, TippyMove) and
+                                 self.coord == other.coord)
+
+    def __hash__(self):
+        ''' (TippyMove) -> int
+
+        Return a hash of self, equal for equal TippyMoves.
+
+        >>> {TippyMove((0, 1)): 'a'}[TippyMove((0, 1))]
+        'a'
+        '''
+        return hash(self.coord)
 
 
 if __name__ == '__main__':
@@ -1,14 +1,32 @@
 from game_state import GameState
 from tippy_move import TippyMove
-from copy import deepcopy
+from random import Random
 
 
 class TippyGameState(GameState):
     ''' The state of a Tippy game
     
     board_size: int  -- the size of a game board
-    current_board: list of list  -- represents a nxn game board
+    x_mask: int      -- bitboard of cells holding 'X ', bit x * board_size + y
+    o_mask: int      -- bitboard of cells holding 'O '
+    empty_mask: int  -- bitboard of cells holding '_ '
+    x_wins: bool     -- whether 'X ' has formed a z/s tetrimino
+    o_wins: bool     -- whether 'O ' has formed a z/s tetrimino
+    current_board: list of list  -- represents a nxn game board, a new
+                                    copy of it on each access
+    TABLE: SolvedPositions  -- class attribute, solved positions for
+                               solved_move to look up, or None
+
+    The list board, legal moves and rough_outcome are worked out on first
+    use and kept with the bitboards they were worked out from, so that a
+    state which is only hashed or looked up never pays for them, and one
+    moved by push and pop never sees them stale.
     '''
+    IN_PLACE = True
+    TABLE = None
+    _board_cache = None  # (x_mask, o_mask, empty_mask, list board)
+    _moves_cache = None  # (empty_mask, list of TippyMove)
+    _rough_cache = None  # (x_mask, o_mask, next_player, rough_outcome)
 
     def __init__(self, p, interactive=False, board_size=3, current_board=None):
         ''' (TippyGameState, str, int, list) -> NoneType
@@ -21,24 +39,120 @@ class TippyGameState(GameState):
         if interactive:
             board_size = int(input('Board size? '))
         GameState.__init__(self, p)
+        # cells which are none of 'X ', 'O ' or '_ ' are kept aside so that
+        # current_board can be rebuilt exactly; they block moves and wins
+        self._other_marks = {}
         if not current_board:  # if board is not created, create it
-            self.current_board = []
-            for x in range(board_size):
-                d = []
-                for y in range(board_size):
-                    d.append('_ ')
-                self.current_board.append(d)
             self.board_size = board_size
+            self.x_mask, self.o_mask = 0, 0
+            self.empty_mask = (1 << (board_size * board_size)) - 1
         else:
-            self.current_board = deepcopy(current_board)
-            self.board_size = len(self.current_board)
+            self.board_size = len(current_board)
+            self.x_mask, self.o_mask, self.empty_mask = 0, 0, 0
+            bit = 1
+            for row in current_board:
+                for cell in row:
+                    if cell == 'X ':
+                        self.x_mask |= bit
+                    elif cell == 'O ':
+                        self.o_mask |= bit
+                    elif cell == '_ ':
+                        self.empty_mask |= bit
+                    else:
+                        self._other_marks[bit] = cell
+                    bit <<= 1
+        self.x_wins = has_tetromino(self.x_mask, self.board_size)
+        self.o_wins = has_tetromino(self.o_mask, self.board_size)
+        # (bit, x_wins, o_wins, zobrist) for each unpopped push
+        self._history = []
+        self._zobrist = zobrist_key(self)
             
         # check if the game is over
         self.over = self.winner(self.next_player) or self.winner(
-            self.opponent()) or self.possible_next_moves() == [] 
+            self.opponent()) or not self.empty_mask
         self.instructions = ('On your turn, you may put your symbol'
                              'on any empty position of the game board ')
 
+    @classmethod
+    def _from_masks(cls, p, board_size, x_mask, o_mask, empty_mask,
+                    other_marks, x_wins, o_wins, zobrist):
+        ''' (type, str, int, int, int, int, dict, bool, bool, int)
+            -> TippyGameState
+
+        Return a new TippyGameState built directly from bitboards, already
+        known winners and Zobrist hash, without parsing a list board.
+        '''
+        state = cls.__new__(cls)
+        state.next_player = p
+        state.board_size = board_size
+        state.x_mask, state.o_mask = x_mask, o_mask
+        state.empty_mask = empty_mask
+        state._other_marks = other_marks
+        state.x_wins, state.o_wins = x_wins, o_wins
+        state._history = []
+        state._zobrist = zobrist
+        state.over = x_wins or o_wins or not empty_mask
+        state.instructions = ('On your turn, you may put your symbol'
+                              'on any empty position of the game board ')
+        return state
+
+    def __reduce__(self):
+        ''' (TippyGameState) -> tuple
+
+        Return how to pickle self: by its bitboards, winners and hash,
+        leaving out the instructions and any pushes that pop could undo.
+
+        >>> import pickle
+        >>> s = TippyGameState('p1', board_size=3).apply_move(TippyMove((0, 1)))
+        >>> t = pickle.loads(pickle.dumps(s))
+        >>> t == s and t.hash_key() == s.hash_key()
+        True
+        '''
+        return (TippyGameState._from_masks,
+                (self.next_player, self.board_size, self.x_mask, self.o_mask,
+                 self.empty_mask, self._other_marks, self.x_wins,
+                 self.o_wins, self._zobrist))
+
+    @property
+    def current_board(self):
+        ''' (TippyGameState) -> list of list
+
+        Return a new nxn list board equivalent to the bitboards of self.
+
+        >>> s = TippyGameState('p1', board_size=2)
+        >>> s.apply_move(TippyMove((1, 0))).current_board
+        [['_ ', '_ '], ['X ', '_ ']]
+        '''
+        return [row[:] for row in self._board()]
+
+    def _board(self):
+        ''' (TippyGameState) -> list of list
+
+        Return the list board of self, built once for its bitboards, which
+        the caller must not change.
+        '''
+        cache = self._board_cache
+        if (cache is not None and cache[0] == self.x_mask and
+                cache[1] == self.o_mask and cache[2] == self.empty_mask):
+            return cache[3]
+        board = []
+        bit = 1
+        for x in range(self.board_size):
+            row = []
+            for y in range(self.board_size):
+                if self.x_mask & bit:
+                    row.append('X ')
+                elif self.o_mask & bit:
+                    row.append('O ')
+                elif self.empty_mask & bit:
+                    row.append('_ ')
+                else:
+                    row.append(self._other_marks[bit])
+                bit <<= 1
+            board.append(row)
+        self._board_cache = (self.x_mask, self.o_mask, self.empty_mask, board)
+        return board
+
     def __repr__(self):
         ''' (TippyGameState) -> str
 
@@ -52,7 +166,7 @@ class TippyGameState(GameState):
         
         return 'TippyGameState({}, {}, {})'.format(repr(self.next_player), 
                                                    repr(self.board_size), 
-                                                   repr(self.current_board))
+                                                   repr(self._board()))
 
     def __str__(self):
         ''' (TippyGameState) -> str
@@ -69,7 +183,7 @@ class TippyGameState(GameState):
         '''
         board = ''
         i = 0
-        for row in self.current_board:
+        for row in self._board():
             for column in row:
                 board += column
             board += '\n'
@@ -89,10 +203,54 @@ class TippyGameState(GameState):
         True
         '''
         return (isinstance(other, TippyGameState) and
-                self.current_board == other.current_board and
+                self.x_mask == other.x_mask and
+                self.o_mask == other.o_mask and
+                self.empty_mask == other.empty_mask and
+                self._other_marks == other._other_marks and
                 self.next_player == other.next_player and 
                 self.board_size == other.board_size)
 
+    def move_bit(self, move):
+        ''' (TippyGameState, TippyMove) -> int
+
+        Return the bitboard bit of the cell move places at, or 0 if the
+        cell is off the board.
+
+        >>> TippyGameState('p1', board_size=3).move_bit(TippyMove((1, 2)))
+        32
+        >>> TippyGameState('p1', board_size=3).move_bit(TippyMove((3, 0)))
+        0
+        '''
+        if not isinstance(move, TippyMove):
+            return 0
+        x, y = move.coord
+        if 0 <= x < self.board_size and 0 <= y < self.board_size:
+            return 1 << (x * self.board_size + y)
+        return 0
+
+    def is_legal(self, move):
+        ''' (TippyGameState, TippyMove) -> bool
+
+        Return whether move places at an empty cell of self.
+
+        Overrides GameState.is_legal
+
+        >>> s = TippyGameState('p1', board_size=3).apply_move(TippyMove((1, 1)))
+        >>> s.is_legal(TippyMove((1, 1))), s.is_legal(TippyMove((0, 1)))
+        (False, True)
+        '''
+        return bool(self.move_bit(move) & self.empty_mask)
+
+    def move_index(self, move):
+        ''' (TippyGameState, TippyMove) -> int
+
+        Return the cell index x * board_size + y of the cell move places at.
+
+        >>> TippyGameState('p1', board_size=3).move_index(TippyMove((1, 2)))
+        5
+        '''
+        return move.coord[0] * self.board_size + move.coord[1]
+
     def apply_move(self, move):
         ''' (TippyGameState, TippyMove) -> TippyGameState
 
@@ -107,17 +265,234 @@ class TippyGameState(GameState):
         _ X _ 
         _ _ _ 
         '''
-        if move in self.possible_next_moves():
-            new_board = deepcopy(self.current_board)
+        bit = self.move_bit(move)
+        if bit & self.empty_mask:
+            i = bit.bit_length() - 1
+            # only the tetriminos through the new cell can form a new win
+            through = cell_tetromino_masks(self.board_size)[i]
+            x_wins, o_wins = self.x_wins, self.o_wins
+            side, x_keys, o_keys = zobrist_table(self.board_size)[1:]
             if self.next_player == 'p1':
-                new_board[move.coord[0]][move.coord[1]] = 'X '
+                x_mask, o_mask = self.x_mask | bit, self.o_mask
+                x_wins = x_wins or _covers_any(x_mask, through)
+                zobrist = self._zobrist ^ x_keys[i] ^ side
             else:
-                new_board[move.coord[0]][move.coord[1]] = 'O '
-            return TippyGameState(self.opponent(), 
-                                  current_board=new_board)
+                x_mask, o_mask = self.x_mask, self.o_mask | bit
+                o_wins = o_wins or _covers_any(o_mask, through)
+                zobrist = self._zobrist ^ o_keys[i] ^ side
+            return TippyGameState._from_masks(
+                self.opponent(), self.board_size, x_mask, o_mask,
+                self.empty_mask ^ bit, self._other_marks, x_wins, o_wins,
+                zobrist)
         else:
             return None
 
+    def push(self, move):
+        ''' (TippyGameState, TippyMove) -> NoneType
+
+        Apply move to self in place, so that it can be undone by pop.
+
+        >>> s = TippyGameState('p1', board_size=3)
+        >>> s.push(TippyMove((0, 2)))
+        >>> s
+        TippyGameState('p2', 3, [['_ ', '_ ', 'X '], ['_ ', '_ ', '_ '], ['_ ', '_ ', '_ ']])
+        >>> s.pop()
+        >>> s == TippyGameState('p1', board_size=3)
+        True
+        '''
+        x, y = move.coord
+        i = x * self.board_size + y
+        bit = 1 << i
+        self._history.append((bit, self.x_wins, self.o_wins, self._zobrist))
+        through = cell_tetromino_masks(self.board_size)[i]
+        side, x_keys, o_keys = zobrist_table(self.board_size)[1:]
+        if self.next_player == 'p1':
+            self.x_mask |= bit
+            self.x_wins = self.x_wins or _covers_any(self.x_mask, through)
+            self._zobrist ^= x_keys[i] ^ side
+            self.next_player = 'p2'
+        else:
+            self.o_mask |= bit
+            self.o_wins = self.o_wins or _covers_any(self.o_mask, through)
+            self._zobrist ^= o_keys[i] ^ side
+            self.next_player = 'p1'
+        self.empty_mask ^= bit
+        self.over = self.x_wins or self.o_wins or not self.empty_mask
+
+    def pop(self):
+        ''' (TippyGameState) -> NoneType
+
+        Undo the most recent push on self.
+        '''
+        bit, self.x_wins, self.o_wins, self._zobrist = self._history.pop()
+        if self.next_player == 'p1':  # p2 made the move being undone
+            self.o_mask ^= bit
+            self.next_player = 'p2'
+        else:
+            self.x_mask ^= bit
+            self.next_player = 'p1'
+        self.empty_mask |= bit
+        self.over = self.x_wins or self.o_wins or not self.empty_mask
+
+    def hash_key(self):
+        ''' (TippyGameState) -> int
+
+        Return the Zobrist hash of self, kept up to date move by move.
+
+        >>> s1 = TippyGameState('p1', board_size=3)
+        >>> s2 = s1.apply_move(TippyMove((0, 0))).apply_move(TippyMove((1, 1)))
+        >>> s2 = s2.apply_move(TippyMove((2, 2)))
+        >>> s3 = s1.apply_move(TippyMove((2, 2))).apply_move(TippyMove((1, 1)))
+        >>> s3.push(TippyMove((0, 0)))
+        >>> s2.hash_key() == s3.hash_key()
+        True
+        >>> s4 = TippyGameState('p2', current_board=s2.current_board)
+        >>> s4.hash_key() == s2.hash_key()
+        True
+        >>> s3.pop()
+        >>> s3.hash_key() == s2.hash_key()
+        False
+        '''
+        return self._zobrist & _LANE
+
+    def other_mask(self):
+        ''' (TippyGameState) -> int
+
+        Return the bitboard of cells holding none of 'X ', 'O ' or '_ '.
+        '''
+        full = (1 << (self.board_size * self.board_size)) - 1
+        return full ^ self.x_mask ^ self.o_mask ^ self.empty_mask
+
+    def canonical_masks(self):
+        ''' (TippyGameState) -> (int, int, int, int)
+
+        Return the index in symmetries(board_size) of the rotation or
+        reflection giving the smallest (x_mask, o_mask, other_mask) of
+        self, followed by those three bitboards after it is applied.
+        '''
+        n = self.board_size
+        other = self.other_mask()
+        best = (0, self.x_mask, self.o_mask, other)
+        row_mask = (1 << n) - 1
+        shifts = range(0, n * n, n)
+        x_rows = [self.x_mask >> i & row_mask for i in shifts]
+        o_rows = [self.o_mask >> i & row_mask for i in shifts]
+        tables = row_images(n)
+        for t in range(1, 8):
+            x_mask = 0
+            for images, cells in zip(tables[t], x_rows):
+                x_mask |= images[cells]
+            if x_mask > best[1]:
+                continue
+            o_mask = 0
+            for images, cells in zip(tables[t], o_rows):
+                o_mask |= images[cells]
+            if other:
+                image = (t, x_mask, o_mask, transform_mask(other, n, t))
+            else:
+                image = (t, x_mask, o_mask, 0)
+            if image[1:] < best[1:]:
+                best = image
+        return best
+
+    def canonical_key(self):
+        ''' (TippyGameState) -> int
+
+        Return a key which is the same for every rotation and reflection
+        of self: the smallest of the hash_keys of the 8 of them, all kept up
+        to date move by move.
+
+        >>> s1 = TippyGameState('p2', current_board=[['X ', '_ ', '_ '], ['_ ', '_ ', '_ '], ['_ ', '_ ', '_ ']])
+        >>> s2 = TippyGameState('p2', current_board=[['_ ', '_ ', '_ '], ['_ ', '_ ', '_ '], ['_ ', '_ ', 'X ']])
+        >>> s1.canonical_key() == s2.canonical_key() != s1.apply_move(TippyMove((1, 1))).canonical_key()
+        True
+        '''
+        z = self._zobrist
+        return min(z & _LANE, z >> 64 & _LANE, z >> 128 & _LANE,
+                   z >> 192 & _LANE, z >> 256 & _LANE, z >> 320 & _LANE,
+                   z >> 384 & _LANE, z >> 448)
+
+    def canonical_symmetry(self):
+        ''' (TippyGameState) -> int
+
+        Return the index in symmetries(board_size) of the rotation or
+        reflection of self whose hash_key is canonical_key(), so that cell i
+        of self is cell symmetries(board_size)[t][i] of that image.
+
+        >>> s = TippyGameState('p2', current_board=[['X ', '_ '], ['_ ', '_ ']])
+        >>> t = s.canonical_symmetry()
+        >>> zobrist_key(s) >> 64 * t & _LANE == s.canonical_key()
+        True
+        '''
+        z = self._zobrist
+        lanes = [z >> 64 * t & _LANE for t in range(8)]
+        return lanes.index(min(lanes))
+
+    def canonical(self):
+        ''' (TippyGameState) -> TippyGameState
+
+        Return the rotation or reflection of self chosen to stand for all 8
+        of them.
+
+        >>> s = TippyGameState('p1', current_board=[['_ ', 'X '], ['_ ', '_ ']])
+        >>> s.canonical().current_board
+        [['X ', '_ '], ['_ ', '_ ']]
+        '''
+        t, x_mask, o_mask, other = self.canonical_masks()
+        perm = symmetries(self.board_size)[t]
+        other_marks = {}
+        for bit in self._other_marks:
+            other_marks[1 << perm[bit.bit_length() - 1]] = (
+                self._other_marks[bit])
+        return TippyGameState._from_masks(
+            self.next_player, self.board_size, x_mask, o_mask,
+            transform_mask(self.empty_mask, self.board_size, t), other_marks,
+            self.x_wins, self.o_wins,
+            _zobrist_of(self.board_size, self.next_player, x_mask, o_mask,
+                        other))
+
+    def distinct_next_moves(self):
+        ''' (TippyGameState) -> list of TippyMove
+
+        Return the legal moves from self, keeping only the first move of
+        each group that a rotation or reflection leaving self unchanged
+        maps onto one another.
+
+        >>> TippyGameState('p1', board_size=3).distinct_next_moves()
+        [TippyMove((0, 0)), TippyMove((0, 1)), TippyMove((1, 1))]
+        '''
+        other = self.other_mask()
+        stabilizer = [perm for t, perm in
+                      enumerate(symmetries(self.board_size))
+                      if t and
+                      transform_mask(self.x_mask, self.board_size, t) ==
+                      self.x_mask and
+                      transform_mask(self.o_mask, self.board_size, t) ==
+                      self.o_mask and
+                      transform_mask(other, self.board_size, t) == other]
+        if not stabilizer:
+            return self.possible_next_moves()
+        moves, seen = [], set()
+        for move in self.possible_next_moves():
+            i = move.coord[0] * self.board_size + move.coord[1]
+            if i not in seen:
+                moves.append(move)
+                seen.update([perm[i] for perm in stabilizer])
+        return moves
+
+    def solved_move(self):
+        ''' (TippyGameState) -> TippyMove
+
+        Return the best move from self stored in TABLE, or None if there is
+        no TABLE for this board size or self is not in it.
+
+        Overrides GameState.solved_move
+        '''
+        table = self.TABLE
+        if table is None or self.over or table.board_size != self.board_size:
+            return None
+        return table.best_move(self)
+
     def rough_outcome(self):
         '''(TippyGameState) -> float
 
@@ -133,6 +508,20 @@ class TippyGameState(GameState):
         >>> TippyGameState('p1', board_size=3, current_board=[['X ', 'O ', '_ '], ['O ', 'O ', 'X '], ['_ ', '_ ', 'X ']]).rough_outcome()
         -1.0
         '''
+        cache = self._rough_cache
+        if (cache is not None and cache[0] == self.x_mask and
+                cache[1] == self.o_mask and cache[2] == self.next_player):
+            return cache[3]
+        outcome = self._rough_outcome()
+        self._rough_cache = (self.x_mask, self.o_mask, self.next_player,
+                             outcome)
+        return outcome
+
+    def _rough_outcome(self):
+        '''(TippyGameState) -> float
+
+        Return rough_outcome() of self, worked out from its list board.
+        '''
         if self.next_player == 'p1':
             s = 'X '
             o = 'O '
@@ -140,6 +529,7 @@ class TippyGameState(GameState):
             s = 'O '
             o = 'X '
         e = '_ '
+        board = self._board()
         
         # p_score represents how many ways next_player is one move from 
         # winning, o_score represents how many ways opponent can win 
@@ -152,225 +542,225 @@ class TippyGameState(GameState):
         # o_score by 1. 
         for x in range(1, self.board_size - 1):
             for y in range(1, self.board_size - 1):
-                if self.current_board[x][y] == s:
-                    if self.current_board[x + 1][y] == s:
-                        if self.current_board[x][y + 1] == s:
-                            if self.current_board[x - 1][y + 1] == e:
+                if board[x][y] == s:
+                    if board[x + 1][y] == s:
+                        if board[x][y + 1] == s:
+                            if board[x - 1][y + 1] == e:
                                 p_score += 1
-                            if self.current_board[x + 1][y - 1] == e:
+                            if board[x + 1][y - 1] == e:
                                 p_score += 1
-                        if self.current_board[x][y - 1] == s:
-                            if self.current_board[x - 1][y - 1] == e:
+                        if board[x][y - 1] == s:
+                            if board[x - 1][y - 1] == e:
                                 p_score += 1
-                            if self.current_board[x + 1][y + 1] == e:
+                            if board[x + 1][y + 1] == e:
                                 p_score += 1                        
-                        if self.current_board[x + 1][y - 1] == s:
+                        if board[x + 1][y - 1] == s:
                             if (
-                                x + 2 <= self.board_size and
-                                self.current_board[x + 2][y - 1] == e
+                                x + 2 < self.board_size and
+                                board[x + 2][y - 1] == e
                             ):
                                 p_score += 1
-                            if self.current_board[x][y + 1] == e:
+                            if board[x][y + 1] == e:
                                 p_score += 1                        
-                        if self.current_board[x + 1][y + 1] == s:
+                        if board[x + 1][y + 1] == s:
                             if (
-                                x + 2 <= self.board_size and
-                                self.current_board[x + 2][y + 1] == e
+                                x + 2 < self.board_size and
+                                board[x + 2][y + 1] == e
                             ):
                                 p_score += 1
-                            if self.current_board[x][y - 1] == e:
+                            if board[x][y - 1] == e:
                                 p_score += 1                        
-                    if self.current_board[x - 1][y] == s:
-                        if self.current_board[x][y + 1] == s:
-                            if self.current_board[x - 1][y - 1] == e:
+                    if board[x - 1][y] == s:
+                        if board[x][y + 1] == s:
+                            if board[x - 1][y - 1] == e:
                                 p_score += 1
-                            if self.current_board[x + 1][y + 1] == e:
+                            if board[x + 1][y + 1] == e:
                                 p_score += 1
-                        if self.current_board[x][y - 1] == s:
-                            if self.current_board[x + 1][y - 1] == e:
+                        if board[x][y - 1] == s:
+                            if board[x + 1][y - 1] == e:
                                 p_score += 1
-                            if self.current_board[x - 1][y + 1] == e:
+                            if board[x - 1][y + 1] == e:
                                 p_score += 1                        
-                        if self.current_board[x - 1][y + 1] == s:
-                            if self.current_board[x][y - 1] == e:
+                        if board[x - 1][y + 1] == s:
+                            if board[x][y - 1] == e:
                                 p_score += 1
                             if (
                                 0 <= x - 2 and 
-                                self.current_board[x - 2][y + 1] == e
+                                board[x - 2][y + 1] == e
                             ):
                                 p_score += 1                        
-                        if self.current_board[x - 1][y - 1] == s:
+                        if board[x - 1][y - 1] == s:
                             if (
                                 0 <= x - 2 and
-                                self.current_board[x - 2][y - 1] == e
+                                board[x - 2][y - 1] == e
                             ):
                                 p_score += 1
-                            if self.current_board[x][y + 1] == e:
+                            if board[x][y + 1] == e:
                                 p_score += 1                         
                         
-                    if self.current_board[x][y + 1] == s:
-                        if self.current_board[x - 1][y] == s:
-                            if self.current_board[x - 1][y - 1] == e:
+                    if board[x][y + 1] == s:
+                        if board[x - 1][y] == s:
+                            if board[x - 1][y - 1] == e:
                                 p_score += 1
-                            if self.current_board[x + 1][y + 1] == e:
+                            if board[x + 1][y + 1] == e:
                                 p_score += 1
-                        if self.current_board[x - 1][y + 1] == s:
+                        if board[x - 1][y + 1] == s:
                             if (
-                                y + 2 <= self.board_size and
-                                self.current_board[x - 1][y + 2] == e
+                                y + 2 < self.board_size and
+                                board[x - 1][y + 2] == e
                             ):
                                 p_score += 1
-                            if self.current_board[x + 1][y] == e:
+                            if board[x + 1][y] == e:
                                 p_score += 1                        
-                        if self.current_board[x + 1][y] == s:
-                            if self.current_board[x + 1][y - 1] == e:
+                        if board[x + 1][y] == s:
+                            if board[x + 1][y - 1] == e:
                                 p_score += 1
-                            if self.current_board[x - 1][y + 1] == e:
+                            if board[x - 1][y + 1] == e:
                                 p_score += 1                        
-                        if self.current_board[x + 1][y + 1] == s:
-                            if self.current_board[x - 1][y] == e:
+                        if board[x + 1][y + 1] == s:
+                            if board[x - 1][y] == e:
                                 p_score += 1
                             if (
-                                y + 2 <= self.board_size and
-                                self.current_board[x + 1][y + 2] == e
+                                y + 2 < self.board_size and
+                                board[x + 1][y + 2] == e
                             ):
                                 p_score += 1                          
-                    if self.current_board[x][y - 1] == s:
-                        if self.current_board[x - 1][y] == s:
-                            if self.current_board[x - 1][y + 1] == e:
+                    if board[x][y - 1] == s:
+                        if board[x - 1][y] == s:
+                            if board[x - 1][y + 1] == e:
                                 p_score += 1
-                            if self.current_board[x + 1][y - 1] == e:
+                            if board[x + 1][y - 1] == e:
                                 p_score += 1
-                        if self.current_board[x - 1][y - 1] == s:
+                        if board[x - 1][y - 1] == s:
                             if (
                                 0 <= y - 2 and
-                                self.current_board[x - 1][y - 2] == e
+                                board[x - 1][y - 2] == e
                             ):
                                 p_score += 1
-                            if self.current_board[x + 1][y] == e:
+                            if board[x + 1][y] == e:
                                 p_score += 1                        
-                        if self.current_board[x + 1][y] == s:
-                            if self.current_board[x - 1][y - 1] == e:
+                        if board[x + 1][y] == s:
+                            if board[x - 1][y - 1] == e:
                                 p_score += 1
-                            if self.current_board[x + 1][y + 1] == e:
+                            if board[x + 1][y + 1] == e:
                                 p_score += 1                        
-                        if self.current_board[x + 1][y - 1] == s:
-                            if self.current_board[x - 1][y] == e:
+                        if board[x + 1][y - 1] == s:
+                            if board[x - 1][y] == e:
                                 p_score += 1
                             if (
                                 0 <= y - 2 and
-                                self.current_board[x + 1][y - 2] == e
+                                board[x + 1][y - 2] == e
                             ):
                                 p_score += 1  
                                 
-                elif self.current_board[x][y] == o:
-                    if self.current_board[x + 1][y] == o:
-                        if self.current_board[x][y + 1] == o:
+                elif board[x][y] == o:
+                    if board[x + 1][y] == o:
+                        if board[x][y + 1] == o:
                             if (
-                                self.current_board[x - 1][y + 1] == e and
-                                self.current_board[x + 1][y - 1] == e
+                                board[x - 1][y + 1] == e and
+                                board[x + 1][y - 1] == e
                             ):
                                 o_score += 1
-                        if self.current_board[x][y - 1] == o:
+                        if board[x][y - 1] == o:
                             if (
-                                self.current_board[x - 1][y - 1] == e and
-                                self.current_board[x + 1][y + 1] == e
+                                board[x - 1][y - 1] == e and
+                                board[x + 1][y + 1] == e
                             ):
                                 o_score += 1                        
-                        if self.current_board[x + 1][y - 1] == o:
+                        if board[x + 1][y - 1] == o:
                             if (
-                                x + 2 <= self.board_size and
-                                self.current_board[x + 2][y - 1] == e and
-                                self.current_board[x][y + 1] == e
+                                x + 2 < self.board_size and
+                                board[x + 2][y - 1] == e and
+                                board[x][y + 1] == e
                             ):
                                 o_score += 1                        
-                        if self.current_board[x + 1][y + 1] == o:
+                        if board[x + 1][y + 1] == o:
                             if (
-                                x + 2 <= self.board_size and
-                                self.current_board[x + 2][y + 1] == e and
-                                self.current_board[x][y - 1] == e
+                                x + 2 < self.board_size and
+                                board[x + 2][y + 1] == e and
+                                board[x][y - 1] == e
                             ):
                                 o_score += 1                        
-                    if self.current_board[x - 1][y] == o:
-                        if self.current_board[x][y + 1] == o:
+                    if board[x - 1][y] == o:
+                        if board[x][y + 1] == o:
                             if (
-                                self.current_board[x - 1][y - 1] == e and
-                                self.current_board[x + 1][y + 1] == e
+                                board[x - 1][y - 1] == e and
+                                board[x + 1][y + 1] == e
                             ):
                                 o_score += 1
-                        if self.current_board[x][y - 1] == o:
+                        if board[x][y - 1] == o:
                             if (
-                                self.current_board[x + 1][y - 1] == e and
-                                self.current_board[x - 1][y + 1] == e
+                                board[x + 1][y - 1] == e and
+                                board[x - 1][y + 1] == e
                             ):
                                 o_score += 1                        
-                        if self.current_board[x - 1][y + 1] == o:
+                        if board[x - 1][y + 1] == o:
                             if (
-                                self.current_board[x][y - 1] == e and
-                                0 <= x - 2 and self.current_board[x - 2][y + 1]
+                                board[x][y - 1] == e and
+                                0 <= x - 2 and board[x - 2][y + 1]
                                 == e
                             ):
                                 o_score += 1                        
-                        if self.current_board[x - 1][y - 1] == o:
+                        if board[x - 1][y - 1] == o:
                             if (
                                 0 <= x - 2 and
-                                self.current_board[x - 2][y - 1] == e and
-                                self.current_board[x][y + 1] == e
+                                board[x - 2][y - 1] == e and
+                                board[x][y + 1] == e
                             ):
                                 o_score += 1                         
                         
-                    if self.current_board[x][y + 1] == o:
-                        if self.current_board[x - 1][y] == o:
+                    if board[x][y + 1] == o:
+                        if board[x - 1][y] == o:
                             if (
-                                self.current_board[x - 1][y - 1] == e and
-                                self.current_board[x + 1][y + 1] == e
+                                board[x - 1][y - 1] == e and
+                                board[x + 1][y + 1] == e
                             ):
                                 o_score += 1
-                        if self.current_board[x - 1][y + 1] == o:
+                        if board[x - 1][y + 1] == o:
                             if (
-                                y + 2 <= self.board_size and
-                                self.current_board[x - 1][y + 2] == e and
-                                self.current_board[x + 1][y] == e
+                                y + 2 < self.board_size and
+                                board[x - 1][y + 2] == e and
+                                board[x + 1][y] == e
                             ):
                                 o_score += 1                        
-                        if self.current_board[x + 1][y] == o:
+                        if board[x + 1][y] == o:
                             if (
-                                self.current_board[x + 1][y - 1] == e and
-                                self.current_board[x - 1][y + 1] == e
+                                board[x + 1][y - 1] == e and
+                                board[x - 1][y + 1] == e
                             ):
                                 o_score += 1                        
-                        if self.current_board[x + 1][y + 1] == o:
+                        if board[x + 1][y + 1] == o:
                             if (
-                                self.current_board[x - 1][y] == e and
-                                y + 2 <= self.board_size and
-                                self.current_board[x + 1][y + 2] == e
+                                board[x - 1][y] == e and
+                                y + 2 < self.board_size and
+                                board[x + 1][y + 2] == e
                             ):
                                 o_score += 1                          
-                    if self.current_board[x][y - 1] == o:
-                        if self.current_board[x - 1][y] == o:
+                    if board[x][y - 1] == o:
+                        if board[x - 1][y] == o:
                             if (
-                                self.current_board[x - 1][y + 1] == e and
-                                self.current_board[x + 1][y - 1] == e
+                                board[x - 1][y + 1] == e and
+                                board[x + 1][y - 1] == e
                             ):
                                 o_score += 1
-                        if self.current_board[x - 1][y - 1] == o:
+                        if board[x - 1][y - 1] == o:
                             if (
                                 0 <= y - 2 and
-                                self.current_board[x - 1][y - 2] == e and
-                                self.current_board[x + 1][y] == e
+                                board[x - 1][y - 2] == e and
+                                board[x + 1][y] == e
                             ):
                                 o_score += 1                        
-                        if self.current_board[x + 1][y] == o:
+                        if board[x + 1][y] == o:
                             if (
-                                self.current_board[x - 1][y - 1] == e and
-                                self.current_board[x + 1][y + 1] == e
+                                board[x - 1][y - 1] == e and
+                                board[x + 1][y + 1] == e
                             ):
                                 o_score += 1                        
-                        if self.current_board[x + 1][y + 1] == o:
+                        if board[x + 1][y + 1] == o:
                             if (
-                                self.current_board[x - 1][y] == e and
+                                board[x - 1][y] == e and
                                 0 <= y - 2 and
-                                self.current_board[x + 1][y - 2] == e
+                                board[x + 1][y - 2] == e
                             ):
                                 o_score += 1              
         # if next_player has more ways of winning than the opponent, returns
@@ -382,6 +772,103 @@ class TippyGameState(GameState):
         else:
             return TippyGameState.DRAW
                 
+    def next_rough_outcomes(self):
+        ''' (TippyGameState) -> list of float
+
+        Return the rough_outcome of the state reached by each of
+        possible_next_moves(), all found at once by
+        tippy_evaluation.outcomes_of_masks for boards up to 8x8.
+
+        Overrides GameState.next_rough_outcomes
+
+        >>> s = TippyGameState('p2', current_board=[['X ', 'X ', '_ '], ['_ ', 'X ', 'O '], ['_ ', 'O ', '_ ']])
+        >>> s.next_rough_outcomes() == GameState.next_rough_outcomes(s)
+        True
+        '''
+        if self.board_size > 8:
+            return GameState.next_rough_outcomes(self)
+        import tippy_evaluation  # NumPy is only needed here
+        if self.next_player == 'p1':
+            mover, other = self.x_mask, self.o_mask
+        else:
+            mover, other = self.o_mask, self.x_mask
+        bits = []
+        empty = self.empty_mask
+        while empty:  # in the order of possible_next_moves
+            bits.append(empty & -empty)
+            empty ^= bits[-1]
+        # each child is seen from the opponent, who moves next there
+        return tippy_evaluation.outcomes_of_masks(
+            [other] * len(bits), [mover | bit for bit in bits],
+            [self.empty_mask ^ bit for bit in bits], self.board_size).tolist()
+
+    def next_over_count(self):
+        ''' (TippyGameState) -> int
+
+        Return how many of the states reached by possible_next_moves() are
+        over, found on the bitboards without making them.
+
+        Overrides GameState.next_over_count
+
+        >>> s = TippyGameState('p1', current_board=[['X ', 'X ', '_ '], ['_ ', 'X ', '_ '], ['O ', 'O ', '_ ']])
+        >>> s.next_over_count() == GameState.next_over_count(s)
+        True
+        >>> s.next_over_count()
+        1
+        '''
+        empty = self.empty_mask
+        if not empty & (empty - 1):  # the last move fills the board
+            return 1 if empty else 0
+        mover = self.x_mask if self.next_player == 'p1' else self.o_mask
+        through = cell_tetromino_masks(self.board_size)
+        count = 0
+        while empty:
+            bit = empty & -empty
+            empty ^= bit
+            if _covers_any(mover | bit, through[bit.bit_length() - 1]):
+                count += 1
+        return count
+
+    def random_playout(self, r):
+        ''' (TippyGameState, random.Random) -> float
+
+        Return the outcome, for self.next_player, of playing on from self
+        to the end of the game by moves chosen at random by r. The empty
+        cells are filled in a shuffled order, on bitboards only.
+
+        Overrides GameState.random_playout
+
+        >>> s = TippyGameState('p1', current_board=[['X ', 'X ', '_ '], ['_ ', 'X ', 'X '], ['O ', 'O ', '_ ']])
+        >>> s.random_playout(Random(1))
+        1.0
+        >>> s = TippyGameState('p1', board_size=5)
+        >>> outcomes = [s.random_playout(Random(i)) for i in range(200)]
+        >>> sorted(set(outcomes)), s == TippyGameState('p1', board_size=5)
+        ([-1.0, 0.0, 1.0], True)
+        '''
+        if self.over:
+            return self.outcome()
+        cells = []
+        empty = self.empty_mask
+        while empty:
+            cells.append(empty & -empty)
+            empty ^= cells[-1]
+        r.shuffle(cells)
+        through = cell_tetromino_masks(self.board_size)
+        mover, other = ((self.x_mask, self.o_mask)
+                        if self.next_player == 'p1' else
+                        (self.o_mask, self.x_mask))
+        for turn, bit in enumerate(cells):
+            if turn % 2 == 0:
+                mover |= bit
+                if _covers_any(mover, through[bit.bit_length() - 1]):
+                    return TippyGameState.WIN
+            else:
+                other |= bit
+                if _covers_any(other, through[bit.bit_length() - 1]):
+                    return TippyGameState.LOSE
+        return TippyGameState.DRAW
+
     def get_move(self):
         '''(TippyGameState) -> TippyMove
 
@@ -407,67 +894,9 @@ class TippyGameState(GameState):
         '''
         
         if player == 'p1':
-            s = 'X '
+            return self.x_wins
         else:
-            s = 'O '
-        flag = False  # flag indicates whether a z/s tetrimino is formed or not
-        x = 1
-        while x < self.board_size - 1 and not flag:
-            y = 1
-            while y < self.board_size - 1 and not flag:
-                if self.current_board[x][y] == s:
-                    if (
-                        self.current_board[x][y - 1] ==
-                        self.current_board[x + 1][y] ==
-                        self.current_board[x - 1][y - 1] == s
-                    ):
-                        flag = True
-                    elif (
-                        self.current_board[x][y - 1] ==
-                        self.current_board[x - 1][y] ==
-                        self.current_board[x + 1][y - 1] == s
-                    ):
-                        flag = True
-                    elif (
-                        self.current_board[x - 1][y] ==
-                        self.current_board[x][y + 1] ==
-                        self.current_board[x + 1][y + 1] == s
-                    ):
-                        flag = True
-                    elif (
-                        self.current_board[x - 1][y + 1] ==
-                        self.current_board[x][y + 1] ==
-                        self.current_board[x + 1][y] == s
-                    ):
-                        flag = True
-                    elif (
-                        self.current_board[x - 1][y] ==
-                        self.current_board[x - 1][y + 1] ==
-                        self.current_board[x][y - 1] == s
-                    ):
-                        flag = True
-                    elif (
-                        self.current_board[x + 1][y] ==
-                        self.current_board[x + 1][y + 1] ==
-                        self.current_board[x][y - 1] == s
-                    ):
-                        flag = True
-                    elif (
-                        self.current_board[x - 1][y] ==
-                        self.current_board[x - 1][y - 1] ==
-                        self.current_board[x][y + 1] == s
-                    ):
-                        flag = True
-                    elif (
-                        self.current_board[x + 1][y] ==
-                        self.current_board[x + 1][y - 1] ==
-                        self.current_board[x][y + 1] == s
-                    ):
-                        flag = True
-                y += 1
-            x += 1
-            
-        return flag
+            return self.o_wins
 
     def possible_next_moves(self):
         ''' (TippyGameState) -> list of TippyMove
@@ -480,13 +909,309 @@ class TippyGameState(GameState):
         >>> L2 = [TippyMove((0, 0)), TippyMove((0, 1)), TippyMove((1, 0)), TippyMove((1, 1))]
         >>> len(L1) == len(L2) and all([m in L2 for m in L1])
         True
+        >>> L1.clear()
+        >>> len(s1.possible_next_moves())
+        4
         '''
+        cache = self._moves_cache
+        if cache is not None and cache[0] == self.empty_mask:
+            return list(cache[1])  # callers may change the list they get
         moves = []
-        for x in range(self.board_size):
-            for y in range(self.board_size):
-                if self.current_board[x][y] == '_ ':
-                    moves.append(TippyMove((x, y)))
-        return moves
+        cells = cell_moves(self.board_size)
+        empty = self.empty_mask
+        while empty:  # take the lowest set bit until none are left
+            low = empty & -empty
+            moves.append(cells[low.bit_length() - 1])
+            empty ^= low
+        self._moves_cache = (self.empty_mask, moves)
+        return list(moves)
+
+
+# board_size -> tuple of bitboards, one per z/s tetrimino placement
+_TETROMINO_MASKS = {}
+
+
+def tetromino_masks(board_size):
+    ''' (int) -> tuple of int
+
+    Return the bitboards of every z/s tetrimino placement on a board of
+    board_size x board_size, computed once per board size.
+
+    >>> len(tetromino_masks(3))
+    8
+    >>> tetromino_masks(2)
+    ()
+    '''
+    if board_size not in _TETROMINO_MASKS:
+        # each shape as (row, column) offsets inside its bounding box
+        shapes = [((0, 0), (1, 0), (1, 1), (2, 1)),
+                  ((0, 1), (1, 1), (1, 0), (2, 0)),
+                  ((0, 1), (0, 2), (1, 0), (1, 1)),
+                  ((0, 0), (0, 1), (1, 1), (1, 2))]
+        masks = []
+        for shape in shapes:
+            height = max([dx for dx, dy in shape]) + 1
+            width = max([dy for dx, dy in shape]) + 1
+            for x in range(board_size - height + 1):
+                for y in range(board_size - width + 1):
+                    mask = 0
+                    for dx, dy in shape:
+                        mask |= 1 << ((x + dx) * board_size + y + dy)
+                    masks.append(mask)
+        _TETROMINO_MASKS[board_size] = tuple(masks)
+    return _TETROMINO_MASKS[board_size]
+
+
+# board_size -> tuple, indexed by cell, of the tetrimino bitboards covering it
+_CELL_TETROMINO_MASKS = {}
+
+
+def cell_tetromino_masks(board_size):
+    ''' (int) -> tuple of tuple of int
+
+    Return, for each cell index x * board_size + y, the bitboards of the
+    z/s tetrimino placements covering that cell on a board of
+    board_size x board_size, computed once per board size.
+
+    >>> [len(masks) for masks in cell_tetromino_masks(3)]
+    [2, 4, 2, 4, 8, 4, 2, 4, 2]
+    '''
+    if board_size not in _CELL_TETROMINO_MASKS:
+        index = []
+        for i in range(board_size * board_size):
+            index.append(tuple([t for t in tetromino_masks(board_size)
+                                if t >> i & 1]))
+        _CELL_TETROMINO_MASKS[board_size] = tuple(index)
+    return _CELL_TETROMINO_MASKS[board_size]
+
+
+# board_size -> tuple, indexed by cell, of the TippyMove placing there
+_CELL_MOVES = {}
+
+
+def cell_moves(board_size):
+    ''' (int) -> tuple of TippyMove
+
+    Return, for each cell index x * board_size + y, the move placing at
+    that cell on a board of board_size x board_size, collected once per
+    board size.
+
+    >>> cell_moves(2)
+    (TippyMove((0, 0)), TippyMove((0, 1)), TippyMove((1, 0)), TippyMove((1, 1)))
+    '''
+    if board_size not in _CELL_MOVES:
+        _CELL_MOVES[board_size] = tuple([
+            TippyMove(divmod(i, board_size))
+            for i in range(board_size * board_size)])
+    return _CELL_MOVES[board_size]
+
+
+# board_size -> (base, side, x_keys, o_keys) of packed Zobrist keys
+_ZOBRIST_TABLES = {}
+_LANE = (1 << 64) - 1
+
+
+def zobrist_table(board_size):
+    ''' (int) -> tuple of (int, int, tuple of int, tuple of int)
+
+    Return the Zobrist keys for a board of board_size x board_size: a key
+    for the board size itself, a key for 'p2' to move, and a key per cell
+    index for each of 'X ' and 'O '. The keys are seeded by board_size, so
+    they are the same in every process.
+
+    Each key packs 8 lanes of 64 bits, lane t holding the 64-bit key of
+    the image of the cell under symmetries(board_size)[t], so XORing keys
+    hashes the 8 rotations and reflections of a board at once. Lane 0 is
+    the hash of the board itself.
+    '''
+    if board_size not in _ZOBRIST_TABLES:
+        r = Random('TippyGameState {}'.format(board_size))
+        cells = board_size * board_size
+        base, side = r.getrandbits(64), r.getrandbits(64)
+        x_keys = [r.getrandbits(64) for i in range(cells)]
+        o_keys = [r.getrandbits(64) for i in range(cells)]
+        perms = symmetries(board_size)
+        _ZOBRIST_TABLES[board_size] = (
+            _packed([base] * 8), _packed([side] * 8),
+            tuple([_packed([x_keys[perm[i]] for perm in perms])
+                   for i in range(cells)]),
+            tuple([_packed([o_keys[perm[i]] for perm in perms])
+                   for i in range(cells)]))
+    return _ZOBRIST_TABLES[board_size]
+
+
+def _packed(lanes):
+    ''' (list of int) -> int
+
+    Return the 64-bit ints in lanes packed into one int, lanes[0] lowest.
+    '''
+    key = 0
+    for t in range(len(lanes)):
+        key |= lanes[t] << 64 * t
+    return key
+
+
+def zobrist_key(state):
+    ''' (TippyGameState) -> int
+
+    Return the packed Zobrist hashes of state, as described in
+    zobrist_table, computed from scratch. Cells marked
+    with neither symbol nor '_ ' hash as both symbols at once.
+    '''
+    return _zobrist_of(state.board_size, state.next_player, state.x_mask,
+                       state.o_mask, state.other_mask())
+
+
+def _zobrist_of(board_size, p, x_mask, o_mask, other_mask):
+    ''' (int, str, int, int, int) -> int
+
+    Return the packed Zobrist hashes of the position with p to move and
+    the given bitboards, visiting only the occupied cells.
+    '''
+    base, side, x_keys, o_keys = zobrist_table(board_size)
+    key = base
+    if p == 'p2':
+        key ^= side
+    for mask, keys in ((x_mask, x_keys), (o_mask, o_keys),
+                       (other_mask, x_keys), (other_mask, o_keys)):
+        while mask:
+            low = mask & -mask
+            key ^= keys[low.bit_length() - 1]
+            mask ^= low
+    return key
+
+
+# board_size -> the 8 rotations and reflections of the board, each as a
+# tuple mapping every cell index to the index of its image
+_SYMMETRIES = {}
+
+
+def symmetries(board_size):
+    ''' (int) -> tuple of tuple of int
+
+    Return the 8 rotations and reflections of a board of
+    board_size x board_size, identity first, as permutations of the cell
+    indices. Z/S tetriminos map to Z/S tetriminos under each of them.
+
+    >>> symmetries(2)[1]
+    (1, 3, 0, 2)
+    '''
+    if board_size not in _SYMMETRIES:
+        n = board_size - 1
+        images = [lambda x, y: (x, y), lambda x, y: (y, n - x),
+                  lambda x, y: (n - x, n - y), lambda x, y: (n - y, x),
+                  lambda x, y: (x, n - y), lambda x, y: (y, x),
+                  lambda x, y: (n - y, n - x), lambda x, y: (n - x, y)]
+        perms = []
+        for image in images:
+            perm = []
+            for i in range(board_size * board_size):
+                x, y = image(*divmod(i, board_size))
+                perm.append(x * board_size + y)
+            perms.append(tuple(perm))
+        _SYMMETRIES[board_size] = tuple(perms)
+    return _SYMMETRIES[board_size]
+
+
+# board_size -> for each symmetry, for each row, the image of every
+# possible set of cells in that row
+_ROW_IMAGES = {}
+
+
+def transform_mask(mask, board_size, t):
+    ''' (int, int, int) -> int
+
+    Return the image of bitboard mask under symmetries(board_size)[t],
+    with one table lookup per row.
+
+    >>> transform_mask(0b0011, 2, 1)
+    10
+    '''
+    rows = row_images(board_size)[t]
+    row_mask = (1 << board_size) - 1
+    image = 0
+    for r in range(board_size):
+        image |= rows[r][mask >> r * board_size & row_mask]
+    return image
+
+
+def row_images(board_size):
+    ''' (int) -> list of list of list of int
+
+    Return, for each of symmetries(board_size) and each row, the list
+    mapping every bitboard of cells within that row, shifted down to bit 0,
+    to its image, computed once per board size.
+    '''
+    if board_size not in _ROW_IMAGES:
+        tables = []
+        for perm in symmetries(board_size):
+            rows = []
+            for r in range(board_size):
+                images = [0] * (1 << board_size)
+                for cells in range(1, 1 << board_size):
+                    low = cells & -cells
+                    i = r * board_size + low.bit_length() - 1
+                    images[cells] = images[cells ^ low] | 1 << perm[i]
+                rows.append(images)
+            tables.append(rows)
+        _ROW_IMAGES[board_size] = tables
+    return _ROW_IMAGES[board_size]
+
+
+def canonical_board(board):
+    ''' (list of list of str) -> list of list of str
+
+    Return the rotation or reflection of the nxn list board that
+    TippyGameState.canonical uses for the same position.
+
+    >>> canonical_board([['_ ', 'X '], ['_ ', '_ ']])
+    [['X ', '_ '], ['_ ', '_ ']]
+    '''
+    n = len(board)
+    flat = [cell for row in board for cell in row]
+    best = None
+    for perm in symmetries(n):
+        image = [None] * (n * n)
+        for i in range(n * n):
+            image[perm[i]] = flat[i]
+        masks = [0, 0, 0]  # 'X ', 'O ', other marks
+        for i in range(n * n):
+            if image[i] == 'X ':
+                masks[0] |= 1 << i
+            elif image[i] == 'O ':
+                masks[1] |= 1 << i
+            elif image[i] != '_ ':
+                masks[2] |= 1 << i
+        if best is None or masks < best[0]:
+            best = (masks, image)
+    image = best[1]
+    return [image[x * n:(x + 1) * n] for x in range(n)]
+
+
+def has_tetromino(mask, board_size):
+    ''' (int, int) -> bool
+
+    Return whether bitboard mask contains a z/s tetrimino anywhere on a
+    board of board_size x board_size.
+
+    >>> has_tetromino(0b000011110, 3)
+    True
+    >>> has_tetromino(0b000010111, 3)
+    False
+    '''
+    return _covers_any(mask, tetromino_masks(board_size))
+
+
+def _covers_any(mask, tetrominoes):
+    ''' (int, tuple of int) -> bool
+
+    Return whether bitboard mask covers every cell of some bitboard in
+    tetrominoes.
+    '''
+    for t in tetrominoes:
+        if mask & t == t:  # a z/s tetrimino is formed
+            return True
+    return False
                                  
         
 if __name__ == '__main__':
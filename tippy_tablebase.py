@@ -0,0 +1,249 @@
+'''Tablebases of every reachable Tippy position, by retrograde analysis.
+
+Both players play by the same rules, so a position is encoded from the
+side of the player to move: code = mover | other << 16, where mover and
+other are the bitboards of that player's cells and of the opponent's.
+Boards up to 4x4 fit. Each code is reduced to the smallest code among its
+8 rotations and reflections.
+
+generate() first builds the positions with 0, 1, 2, ... stones, one
+layer at a time. Each layer is a sorted NumPy array of codes, deduplicated
+with np.unique. It then goes back from the last layer and scores each
+position from the scores of its children in the layer after it.
+
+>>> table = generate(3)
+>>> from tippy_square_state import TippyGameState
+>>> s = TippyGameState('p1', board_size=3)
+>>> table.value(s)
+1.0
+>>> s.push(table.best_move(s))
+>>> table.value(s)
+-1.0
+'''
+import os
+import numpy as np
+from tippy_move import TippyMove
+from game_state import GameState
+from tippy_square_state import symmetries, tetromino_masks, transform_mask
+
+MAGIC = int.from_bytes(b'TIPPYTB1', 'little')
+HEADER_BYTES = 3 * 8
+SHIFT = 16
+_LOW = (1 << SHIFT) - 1
+
+
+class Tablebase:
+    ''' The score and best move of every reachable position of a Tippy
+    board, from the side of the player to move.
+
+    board_size: int  -- size of the board
+    codes: numpy array of uint64  -- canonical codes, in increasing order
+    moves: numpy array of int8    -- best move of each code, as a cell
+                                     index in the orientation of the code,
+                                     or -1 if the game is over
+    values: numpy array of int8   -- score of each code for the player to
+                                     move
+    '''
+
+    def __init__(self, board_size, codes, moves, values):
+        ''' (Tablebase, int, array, array, array) -> NoneType
+
+        Create a Tablebase of the given arrays.
+        '''
+        self.board_size = board_size
+        self.codes, self.moves, self.values = codes, moves, values
+
+    def __len__(self):
+        ''' (Tablebase) -> int
+
+        Return the number of positions in self.
+
+        >>> len(generate(2))
+        8
+        '''
+        return len(self.codes)
+
+    def find(self, state):
+        ''' (Tablebase, TippyGameState) -> (int, int)
+
+        Return the index of state in self and the index in
+        symmetries(board_size) taking state to the orientation stored, or
+        (-1, 0) if state is not in self.
+
+        >>> from tippy_square_state import TippyGameState
+        >>> table = generate(2)
+        >>> table.find(TippyGameState('p1', board_size=2))
+        (0, 0)
+        >>> table.find(TippyGameState('p1', current_board=[['# ', '_ '], ['_ ', '_ ']]))
+        (-1, 0)
+        '''
+        n = self.board_size
+        if getattr(state, 'board_size', None) != n:
+            return -1, 0
+        if state.x_mask | state.o_mask | state.empty_mask != (1 << n * n) - 1:
+            return -1, 0  # it has marks other than X and O
+        if state.next_player == 'p1':
+            mover, other = state.x_mask, state.o_mask
+        else:
+            mover, other = state.o_mask, state.x_mask
+        code, t = min((transform_mask(mover, n, t) |
+                       transform_mask(other, n, t) << SHIFT, t)
+                      for t in range(8))
+        i = int(np.searchsorted(self.codes, np.uint64(code)))
+        if i < len(self.codes) and self.codes[i] == code:
+            return i, t
+        return -1, 0
+
+    def value(self, state):
+        ''' (Tablebase, TippyGameState) -> float
+
+        Return the exact score of state for its next player, or None if
+        state is not in self.
+        '''
+        i = self.find(state)[0]
+        return None if i < 0 else float(self.values[i])
+
+    def best_move(self, state):
+        ''' (Tablebase, TippyGameState) -> TippyMove
+
+        Return a best move from state, or None if state is not in self or
+        has no moves.
+        '''
+        i, t = self.find(state)
+        if i < 0 or self.moves[i] < 0:
+            return None
+        cell = symmetries(self.board_size)[t].index(int(self.moves[i]))
+        return TippyMove(divmod(cell, self.board_size))
+
+
+def canonical_codes(mover, other, board_size):
+    ''' (array of uint64, array of uint64, int) -> array of uint64
+
+    Return the smallest code of each position among its 8 rotations and
+    reflections.
+
+    >>> canonical_codes(np.array([2], np.uint64), np.array([0], np.uint64), 2)
+    array([1], dtype=uint64)
+    '''
+    best = None
+    for perm in symmetries(board_size):
+        code = np.zeros_like(mover)
+        for i, image in enumerate(perm):
+            code |= (mover >> np.uint64(i) & np.uint64(1)) << np.uint64(image)
+            code |= ((other >> np.uint64(i) & np.uint64(1)) <<
+                     np.uint64(image + SHIFT))
+        best = code if best is None else np.minimum(best, code)
+    return best
+
+
+def has_tetromino(masks, board_size):
+    ''' (array of uint64, int) -> array of bool
+
+    Return whether each of masks covers a z/s tetrimino.
+
+    >>> has_tetromino(np.array([0b000011110, 0b111], np.uint64), 3)
+    array([ True, False])
+    '''
+    found = np.zeros(masks.shape, bool)
+    for tetromino in tetromino_masks(board_size):
+        t = np.uint64(tetromino)
+        found |= masks & t == t
+    return found
+
+
+def generate(board_size):
+    ''' (int) -> Tablebase
+
+    Return the Tablebase of every position reachable from the empty board
+    of board_size x board_size, for board_size up to 4.
+    '''
+    cells = board_size * board_size
+    low = np.uint64(_LOW)
+    layers = [np.zeros(1, np.uint64)]
+    lost = []  # whether the player to move in each position has lost
+    for stones in range(cells + 1):
+        codes = layers[stones]
+        lost.append(has_tetromino(codes >> np.uint64(SHIFT), board_size))
+        if stones == cells:
+            break
+        mover, other = codes & low, codes >> np.uint64(SHIFT)
+        live = ~lost[stones]
+        children = []
+        for c in range(cells):
+            bit = np.uint64(1 << c)
+            empty = live & ((mover | other) & bit == 0)
+            # the opponent moves next, so the two sides swap
+            children.append(canonical_codes(other[empty], mover[empty] | bit,
+                                            board_size))
+        layers.append(np.unique(np.concatenate(children)))
+    values = [None] * (cells + 1)
+    moves = [None] * (cells + 1)
+    for stones in range(cells, -1, -1):
+        codes = layers[stones]
+        best = np.full(len(codes), -2, np.int8)  # below every score
+        best_move = np.full(len(codes), -1, np.int8)
+        if stones < cells:
+            mover, other = codes & low, codes >> np.uint64(SHIFT)
+            live = ~lost[stones]
+            for c in range(cells):
+                bit = np.uint64(1 << c)
+                empty = live & ((mover | other) & bit == 0)
+                child = canonical_codes(other[empty], mover[empty] | bit,
+                                        board_size)
+                after = np.searchsorted(layers[stones + 1], child)
+                score = - values[stones + 1][after]
+                better = score > best[empty]
+                where = np.flatnonzero(empty)[better]
+                best[where] = score[better]
+                best_move[where] = c
+        best[lost[stones]] = GameState.LOSE
+        best[best == -2] = GameState.DRAW  # a full board with no tetrimino
+        values[stones], moves[stones] = best, best_move
+    codes = np.concatenate(layers)
+    order = np.argsort(codes)
+    return Tablebase(board_size, codes[order],
+                     np.concatenate(moves)[order],
+                     np.concatenate(values)[order])
+
+
+def write(path, table):
+    ''' (str, Tablebase) -> NoneType
+
+    Write table to path, replacing the file in one step.
+    '''
+    header = np.array([MAGIC, table.board_size, len(table)], np.uint64)
+    partial = '{}.{}.tmp'.format(path, os.getpid())
+    with open(partial, 'wb') as f:
+        for array in (header, table.codes, table.moves, table.values):
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(partial, path)
+
+
+def load(path):
+    ''' (str) -> Tablebase
+
+    Return the Tablebase written at path, mapped into memory rather than
+    read.
+
+    >>> import tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'tippy2.tb')
+    >>> write(path, generate(2))
+    >>> len(load(path))
+    8
+    '''
+    raw = np.memmap(path, np.uint8, 'r')
+    magic, board_size, count = raw[:HEADER_BYTES].view(np.uint64)
+    if magic != MAGIC:
+        raise ValueError('{} is not a Tippy tablebase'.format(path))
+    count = int(count)
+    start = HEADER_BYTES
+    codes = raw[start:start + 8 * count].view(np.uint64)
+    start += 8 * count
+    moves = raw[start:start + count].view(np.int8)
+    values = raw[start + count:start + 2 * count].view(np.int8)
+    return Tablebase(int(board_size), codes, moves, values)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
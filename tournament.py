@@ -0,0 +1,257 @@
+'''Matches of many games between two strategies, with no one at the keyboard.
+
+Run python tournament.py -a StrategyMinimaxPruning -b StrategyRandom
+--game tippy --option board_size=4 --games 1000 --workers 4 to play 1000
+games across a pool of 4 processes. The two sides take turns to move
+first. Each game is written to --out as a line of JSON as it finishes,
+with its moves, winner and the seconds each suggest_move took. The win
+rates of both sides, with 95% confidence intervals, are printed at the
+end.
+
+States and strategies are made with the options given and never with
+interactive=True. Game number i seeds random by SEED and i, so a match is
+played alike each time it is run, however many workers play it.
+
+>>> games = play('subtract_square', {'current_total': 25},
+...              ('StrategyMinimax', {}), ('StrategyRandom', {}), 4)
+>>> [g['winner'] for g in games]
+['a', 'a', 'a', 'a']
+>>> print(summary(games))
+StrategyMinimax vs StrategyRandom, subtract_square, 4 games
+  a StrategyMinimax: 4 wins, 100.0% [51.0%, 100.0%]
+  b StrategyRandom: 0 wins, 0.0% [0.0%, 49.0%]
+  draws: 0, 0.0% [0.0%, 49.0%]
+'''
+import argparse
+import ast
+import json
+import math
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import parallel_search
+from subtract_square_state import SubtractSquareState, SubtractSquarePilesState
+from tippy_square_state import TippyGameState
+from strategy_minimax import StrategyMinimax
+from strategy_minimax_memoize import StrategyMinimaxMemoize
+from strategy_minimax_myopic import StrategyMinimaxMyopic
+from strategy_minimax_pruning import StrategyMinimaxPruning
+from strategy_mcts import StrategyMCTS
+from strategy_random import StrategyRandom
+from strategy_sprague_grundy import StrategySpragueGrundy
+from strategy_tablebase import StrategyTablebase
+
+SEED = 2016
+GAMES = {'subtract_square': SubtractSquareState,
+         'subtract_square_piles': SubtractSquarePilesState,
+         'tippy': TippyGameState}
+STRATEGIES = {cls.__name__: cls for cls in (
+    StrategyMinimax, StrategyMinimaxMemoize, StrategyMinimaxMyopic,
+    StrategyMinimaxPruning, StrategyMCTS, StrategyRandom,
+    StrategySpragueGrundy, StrategyTablebase)}
+# z of a two-sided 95% confidence interval
+Z_95 = 1.959964
+
+
+def play_game(game, options, a, b, index, seed=SEED, opening=0):
+    ''' (str, dict, (str, dict), (str, dict), int, int, int) -> dict
+
+    Return the record of game number index of game, started with options,
+    between strategies a and b, each given by name and options. a moves
+    first in even games and b in odd ones. The first opening moves are
+    random. A side that suggests an illegal move loses.
+
+    >>> g = play_game('subtract_square', {'current_total': 5},
+    ...               ('StrategyRandom', {}), ('StrategyMinimax', {}), 1)
+    >>> g['p1'], g['moves'], g['winner']
+    ('b', ['Remove 1', 'Remove 4'], 'a')
+    '''
+    random.seed('{} {}'.format(seed, index))
+    sides = ('a', 'b') if index % 2 == 0 else ('b', 'a')
+    strategies = {p: STRATEGIES[name](**kwargs) for p, (name, kwargs) in
+                  zip(('p1', 'p2'), (a, b) if index % 2 == 0 else (b, a))}
+    state = GAMES[game]('p1', **options)
+    moves, latencies, illegal = [], [], None
+    while not state.over:
+        start = time.perf_counter()
+        if len(moves) < opening:
+            move = random.choice(state.possible_next_moves())
+        else:
+            move = strategies[state.next_player].suggest_move(state)
+            latencies.append(time.perf_counter() - start)
+        next_state = state.apply_move(move)
+        if next_state is None:
+            illegal = str(move)
+            break
+        moves.append(str(move))
+        state = next_state
+    if illegal is not None:  # the side that suggested it forfeits
+        winner = state.opponent()
+    elif state.winner('p1'):
+        winner = 'p1'
+    elif state.winner('p2'):
+        winner = 'p2'
+    else:
+        winner = None
+    record = {'index': index, 'game': game, 'a': a[0], 'b': b[0],
+              'p1': sides[0], 'p2': sides[1],
+              'moves': moves, 'opening': min(opening, len(moves)),
+              'latencies_s': latencies,
+              'winner': None if winner is None else sides[winner == 'p2']}
+    if illegal is not None:
+        record['illegal'] = illegal
+    return record
+
+
+def play(game, options, a, b, games, workers=None, seed=SEED, opening=0,
+         out=None):
+    ''' (str, dict, (str, dict), (str, dict), int, int, int, int, file)
+        -> list of dict
+
+    Return the records of games games of game between a and b, as made by
+    play_game, in order. If workers is given, play them in a pool of that
+    many processes. Write each record to out, if given, as a line of JSON
+    as soon as its game is over.
+    '''
+    records = [None] * games
+    if workers:
+        # a pool of its own, not one of parallel_search's, which the
+        # strategies may be using for their searches
+        with ProcessPoolExecutor(workers) as pool:
+            futures = {pool.submit(_play_game_in_worker, game, options, a, b,
+                                   i, seed, opening): i for i in range(games)}
+            try:
+                for future in as_completed(futures):
+                    records[futures[future]] = _written(future.result(), out)
+            finally:
+                for future in futures:  # stop what is left after an error
+                    future.cancel()
+    else:
+        for i in range(games):
+            records[i] = _written(play_game(game, options, a, b, i, seed,
+                                            opening), out)
+    return records
+
+
+def _play_game_in_worker(*args):
+    ''' (...) -> dict
+
+    Return play_game(*args), run in a worker process of play, shutting
+    down any pool the strategies started for their searches, so that the
+    worker can exit.
+    '''
+    try:
+        return play_game(*args)
+    finally:
+        parallel_search.shutdown()
+
+
+def _written(record, out):
+    ''' (dict, file) -> dict
+
+    Write record to out, unless out is None, as a line of JSON, and
+    return it.
+    '''
+    if out is not None:
+        out.write(json.dumps(record) + '\n')
+        out.flush()
+    return record
+
+
+def wilson_interval(successes, trials, z=Z_95):
+    ''' (int, int, float) -> (float, float)
+
+    Return the Wilson score interval of the rate of successes in trials.
+
+    >>> ['{:.3f}'.format(x) for x in wilson_interval(60, 100)]
+    ['0.502', '0.691']
+    >>> wilson_interval(0, 0)
+    (0.0, 1.0)
+    '''
+    if trials == 0:
+        return 0.0, 1.0
+    p = successes / trials
+    centre = p + z * z / (2 * trials)
+    spread = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials ** 2))
+    scale = 1 + z * z / trials
+    return max(0.0, (centre - spread) / scale), min(1.0, (centre + spread) /
+                                                    scale)
+
+
+def summary(records):
+    ''' (list of dict) -> str
+
+    Return the number of wins and draws in records, all of one match as
+    made by play, with their rates and 95% confidence intervals.
+    '''
+    n = len(records)
+    first = records[0]
+    lines = ['{} vs {}, {}, {} games'.format(first['a'], first['b'],
+                                             first['game'], n)]
+    for label, winner in (('a ' + first['a'], 'a'), ('b ' + first['b'], 'b'),
+                          ('draws', None)):
+        count = sum(1 for r in records if r['winner'] == winner)
+        low, high = wilson_interval(count, n)
+        lines.append('  {}: {}{}, {:.1%} [{:.1%}, {:.1%}]'.format(
+            label, count, ' wins' if winner else '', count / n, low, high))
+    return '\n'.join(lines)
+
+
+def parse_options(pairs):
+    ''' (list of str) -> dict
+
+    Return the keyword arguments given as name=value by pairs. Values are
+    Python literals, or strings if they do not parse as one.
+
+    >>> parse_options(['board_size=4', 'time_limit=0.5', 'path=a.tb'])
+    {'board_size': 4, 'time_limit': 0.5, 'path': 'a.tb'}
+    '''
+    options = {}
+    for pair in pairs or []:
+        name, _, value = pair.partition('=')
+        try:
+            options[name] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            options[name] = value
+    return options
+
+
+def main(argv=None):
+    ''' (list of str) -> int
+
+    Play the match the command line argv asks for, and return the exit
+    status.
+    '''
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-a', required=True, choices=STRATEGIES,
+                        help='strategy of side a')
+    parser.add_argument('-b', required=True, choices=STRATEGIES,
+                        help='strategy of side b')
+    parser.add_argument('--a-option', action='append', metavar='NAME=VALUE',
+                        help='keyword argument of strategy a')
+    parser.add_argument('--b-option', action='append', metavar='NAME=VALUE',
+                        help='keyword argument of strategy b')
+    parser.add_argument('--game', choices=GAMES, default='subtract_square')
+    parser.add_argument('--option', action='append', metavar='NAME=VALUE',
+                        help='keyword argument of the starting state')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--workers', type=int,
+                        help='processes to play in, by default just this one')
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--opening', type=int, default=0,
+                        help='random moves to start each game with')
+    parser.add_argument('--out', default='tournament.jsonl',
+                        help='file to write a line per game to')
+    args = parser.parse_args(argv)
+    with open(args.out, 'w') as out:
+        records = play(args.game, parse_options(args.option),
+                       (args.a, parse_options(args.a_option)),
+                       (args.b, parse_options(args.b_option)), args.games,
+                       args.workers, args.seed, args.opening, out)
+    print(summary(records))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
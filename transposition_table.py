@@ -0,0 +1,197 @@
+from array import array
+
+
+class TranspositionTable:
+    ''' A fixed-size cache of scores keyed by GameState.hash_key.
+
+    The slots are preallocated arrays, grouped in buckets of two: a
+    depth-preferred slot, replaced only by an entry searched at least as
+    deep, and an always-replace slot that takes every other entry.
+
+    Each entry has a key, a score, the depth searched to find the score, a
+    flag telling whether the score is EXACT or only a LOWER or UPPER bound
+    on the true score, and the index of the best move found, or -1.
+
+    slots: int       -- number of entries the table can hold
+    hits: int        -- number of lookups that found their key
+    misses: int      -- number of lookups that did not
+    overwrites: int  -- number of stores that evicted a different key
+    SLOT_BYTES: int  -- class constant, bytes of memory used by each slot
+    EXACT, LOWER, UPPER: int  -- class constants for the kinds of score
+    '''
+    SLOT_BYTES = 8 + 8 + 4 + 1 + 4  # key, score, depth, flag, move
+    DEFAULT_ENTRIES = 1 << 20
+    EXACT, LOWER, UPPER = 0, 1, 2
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        ''' (TranspositionTable, int, int) -> NoneType
+
+        Create an empty TranspositionTable holding at most max_entries
+        entries and using at most max_bytes bytes for its slots, or
+        DEFAULT_ENTRIES entries if neither is given.
+
+        >>> TranspositionTable(max_entries=1000).slots
+        1000
+        >>> TranspositionTable(max_bytes=1000).slots
+        40
+        '''
+        if max_entries is None and max_bytes is None:
+            max_entries = TranspositionTable.DEFAULT_ENTRIES
+        slots = max_entries
+        if max_bytes is not None:
+            by_bytes = max_bytes // TranspositionTable.SLOT_BYTES
+            if slots is None or by_bytes < slots:
+                slots = by_bytes
+        self.buckets = max(slots // 2, 1)
+        self.slots = 2 * self.buckets
+        self.keys = array('Q', bytes(8 * self.slots))
+        self.scores = array('d', bytes(8 * self.slots))
+        self.depths = array('i', [-1]) * self.slots  # -1 marks an empty slot
+        self.flags = array('b', bytes(self.slots))
+        self.moves = array('i', [-1]) * self.slots
+        self.hits, self.misses, self.overwrites = 0, 0, 0
+
+    def __len__(self):
+        ''' (TranspositionTable) -> int
+
+        Return the number of occupied slots in self.
+
+        >>> t = TranspositionTable(max_entries=8)
+        >>> t[3] = 1.0
+        >>> len(t)
+        1
+        '''
+        return self.slots - self.depths.count(-1)
+
+    def __contains__(self, key):
+        ''' (TranspositionTable, int) -> bool
+
+        Return whether key is stored in self, without counting a lookup.
+        '''
+        return self._find(key) >= 0
+
+    def __getitem__(self, key):
+        ''' (TranspositionTable, int) -> float
+
+        Return the score stored for key, raising KeyError if there is none.
+        '''
+        score = self.get(key)
+        if score is None:
+            raise KeyError(key)
+        return score
+
+    def __setitem__(self, key, score):
+        ''' (TranspositionTable, int, float) -> NoneType
+
+        Store score for key at depth 0.
+        '''
+        self.store(key, score, 0)
+
+    def _find(self, key):
+        ''' (TranspositionTable, int) -> int
+
+        Return the slot holding key, or -1 if key is not stored.
+        '''
+        i = 2 * (key % self.buckets)
+        if self.keys[i] == key and self.depths[i] >= 0:
+            return i
+        elif self.keys[i + 1] == key and self.depths[i + 1] >= 0:
+            return i + 1
+        return -1
+
+    def get(self, key, default=None):
+        ''' (TranspositionTable, int, object) -> float
+
+        Return the EXACT score stored for key, or default if there is none.
+
+        >>> t = TranspositionTable(max_entries=8)
+        >>> t.store(5, -1.0, 2)
+        >>> t.get(5), t.get(6)
+        (-1.0, None)
+        >>> t.hits, t.misses
+        (1, 1)
+        '''
+        i = self._find(key)
+        if i < 0 or self.flags[i] != TranspositionTable.EXACT:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return self.scores[i]
+
+    def probe(self, key):
+        ''' (TranspositionTable, int) -> (float, int, int, int)
+
+        Return the score, depth, flag and best move index stored for key,
+        or None if there are none.
+
+        >>> t = TranspositionTable(max_entries=8)
+        >>> t.store(5, 0.0, 3, TranspositionTable.LOWER, 7)
+        >>> t.probe(5)
+        (0.0, 3, 1, 7)
+        '''
+        i = self._find(key)
+        if i < 0:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.scores[i], self.depths[i], self.flags[i], self.moves[i]
+
+    def depth(self, key):
+        ''' (TranspositionTable, int) -> int
+
+        Return the depth stored with key, or -1 if key is not stored.
+        '''
+        i = self._find(key)
+        return self.depths[i] if i >= 0 else -1
+
+    def store(self, key, score, depth, flag=EXACT, move=-1):
+        ''' (TranspositionTable, int, float, int, int, int) -> NoneType
+
+        Store score for key, found by a search of the given depth, with its
+        flag and the index of the best move found. It replaces key where it
+        is already stored, and otherwise goes to the depth-preferred slot of
+        its bucket if that slot holds an entry no deeper than depth, and to
+        the always-replace slot if not.
+
+        >>> t = TranspositionTable(max_entries=2)
+        >>> t.store(1, 1.0, 5)
+        >>> t.store(2, 0.0, 3)
+        >>> t.store(3, -1.0, 1)
+        >>> 1 in t, 2 in t, 3 in t, t.overwrites
+        (True, False, True, 1)
+
+        A key is never kept in both slots of its bucket:
+
+        >>> t = TranspositionTable(max_entries=2)
+        >>> t.store(2, 0.0, 5)
+        >>> t.store(1, 1.0, 1)
+        >>> t.store(2, 0.0, 0)
+        >>> t.store(1, 2.0, 3)
+        >>> list(t.keys), list(t.depths), len(t), t.get(1)
+        ([2, 1], [0, 3], 2, 2.0)
+        '''
+        i = 2 * (key % self.buckets)
+        if self.keys[i + 1] == key and self.depths[i + 1] >= 0:
+            i += 1
+        elif not (self.keys[i] == key or depth >= self.depths[i]):
+            i += 1
+        if self.depths[i] >= 0 and self.keys[i] != key:
+            self.overwrites += 1
+        self.keys[i] = key
+        self.scores[i] = score
+        self.depths[i] = depth
+        self.flags[i] = flag
+        self.moves[i] = move
+
+    def clear(self):
+        ''' (TranspositionTable) -> NoneType
+
+        Remove every entry from self and reset its counters.
+        '''
+        self.depths = array('i', [-1]) * self.slots
+        self.hits, self.misses, self.overwrites = 0, 0, 0
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()